@@ -0,0 +1,92 @@
+"""
+Runs the API benchmark scenarios and stores the results per commit.
+
+    python -m benchmarks --seed 1000000              # seed, then run everything
+    python -m benchmarks --scenarios role,client-list --concurrency 8
+    BENCH_DATABASE=postgresql python -m benchmarks --compare <revision>
+"""
+import argparse
+import os
+import sys
+import time
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__.split("\n")[1])
+    parser.add_argument("--database", choices=("sqlite", "postgresql"), default=os.environ.get("BENCH_DATABASE", "sqlite"))
+    parser.add_argument("--seed", type=int, default=0, help="Insert this many synthetic appointments first.")
+    parser.add_argument("--clients", type=int, default=20000, help="Synthetic clients to create when seeding.")
+    parser.add_argument("--staff", type=int, default=200, help="Synthetic staff to create when seeding.")
+    parser.add_argument("--scenarios", default="", help="Comma-separated scenarios to run (default: all).")
+    parser.add_argument("--requests", type=int, default=500, help="Timed requests per scenario.")
+    parser.add_argument("--concurrency", type=int, default=4, help="Threads sending requests.")
+    parser.add_argument("--warmup", type=int, default=20, help="Untimed requests per scenario.")
+    parser.add_argument("--firebase-latency", type=float, default=0.0, help="Milliseconds added to each Firebase call.")
+    parser.add_argument("--compare", metavar="REVISION_OR_FILE", help="Compare with a saved run.")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Change counted as a regression (fraction).")
+    parser.add_argument("--no-save", action="store_true", help="Do not store the results.")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    options = parse_args(argv)
+    os.environ["BENCH_DATABASE"] = options.database
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "benchmarks.settings")
+
+    import django
+    django.setup()
+
+    from django.core.management import call_command
+
+    from benchmarks.fake_firebase import FakeFirebase
+    from benchmarks.runner import compare, describe_run, load_results, run_scenario, save_results
+    from benchmarks.scenarios import SCENARIOS, BenchData
+    from src.healthcare.models import Appointment
+    from src.healthcare.seeding import create_bench_users, seed_appointments
+
+    names = [name.strip() for name in options.scenarios.split(",") if name.strip()] or list(SCENARIOS)
+    unknown = set(names) - set(SCENARIOS)
+    if unknown:
+        sys.exit(f"Unknown scenarios: {', '.join(sorted(unknown))} (choose from {', '.join(SCENARIOS)})")
+
+    call_command("migrate", verbosity=0)
+    if options.seed:
+        clients, staff = create_bench_users(options.clients, options.staff)
+        started = time.perf_counter()
+        for created in seed_appointments(options.seed, clients, staff):
+            print(f"\rSeeded {created}/{options.seed}", end="", flush=True)
+        print(f"\nSeeding took {time.perf_counter() - started:.1f}s")
+
+    results = describe_run(options.database, Appointment.objects.count(), {
+        key: getattr(options, key) for key in ("requests", "concurrency", "warmup", "firebase_latency")
+    })
+    print(f"{options.database}: {results['appointments']} appointments, revision {results['revision']}")
+
+    with FakeFirebase(latency=options.firebase_latency / 1000).installed():
+        try:
+            data = BenchData()
+        except ValueError as e:
+            sys.exit(str(e))
+        for name in names:
+            result = run_scenario(
+                SCENARIOS[name], data, options.requests, concurrency=options.concurrency, warmup=options.warmup
+            )
+            results["scenarios"][name] = result
+            latency = result["latency_ms"]
+            print(
+                f"  {name:<12} {result['throughput']:>8} req/s  p50 {latency['p50']:>7} ms  p95 {latency['p95']:>7} ms"
+                f"  p99 {latency['p99']:>7} ms  {result['queries']['mean']:>5} queries/req  {result['errors']} errors"
+            )
+
+    if not options.no_save:
+        print(f"Saved {save_results(results)}")
+    if options.compare:
+        try:
+            baseline = load_results(options.compare, options.database)
+        except FileNotFoundError as e:
+            sys.exit(str(e))
+        print("\n".join(compare(results, baseline, options.threshold)))
+
+
+if __name__ == "__main__":
+    main()
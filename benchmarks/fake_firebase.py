@@ -0,0 +1,54 @@
+import time
+from contextlib import contextmanager
+from types import SimpleNamespace
+from unittest import mock
+
+from firebase_admin import auth
+
+TOKEN_PREFIX = "bench:"
+
+
+def bench_token(user):
+    """
+    ID token the fake verifier accepts for ``user``; its UID is the username.
+    """
+    return f"{TOKEN_PREFIX}{user.username}"
+
+
+class FakeFirebase:
+    """
+    Local stand-in for the Firebase Admin calls the API makes. Tokens of the
+    form ``bench:<uid>`` verify; ``latency`` (seconds) is added to every call
+    to mimic the round trip to Google.
+    """
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = 0
+
+    def _call(self):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def verify_id_token(self, id_token, app=None, check_revoked=False, clock_skew_seconds=0):
+        self._call()
+        if not id_token.startswith(TOKEN_PREFIX):
+            raise auth.InvalidIdTokenError("Not a benchmark token.")
+        uid = id_token[len(TOKEN_PREFIX):]
+        now = int(time.time())
+        return {"uid": uid, "sub": uid, "email": f"{uid}@example.com", "iat": now, "exp": now + 3600}
+
+    def get_user(self, uid, app=None):
+        self._call()
+        return SimpleNamespace(
+            uid=uid, email=f"{uid}@example.com", email_verified=True, disabled=False, tokens_valid_after_timestamp=0
+        )
+
+    @contextmanager
+    def installed(self):
+        """
+        Patches ``firebase_admin.auth`` for the duration of the block.
+        """
+        with mock.patch.multiple(auth, verify_id_token=self.verify_id_token, get_user=self.get_user):
+            yield self
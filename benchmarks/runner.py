@@ -0,0 +1,168 @@
+import json
+import platform
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from time import perf_counter
+
+import django
+import numpy as np
+from django.db import connection
+from django.test import Client
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+PERCENTILES = (50, 90, 95, 99)
+
+
+class QueryCounter:
+    """
+    Database execute wrapper counting the queries of the current thread's
+    connection.
+    """
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def _run_requests(scenario, data, indices):
+    client = Client()
+    counter = QueryCounter()
+    latencies, queries, errors = [], [], 0
+    with connection.execute_wrapper(counter):
+        for i in indices:
+            counter.count = 0
+            started = perf_counter()
+            response = scenario(client, data, i)
+            latencies.append(perf_counter() - started)
+            queries.append(counter.count)
+            errors += response.status_code >= 400
+    return latencies, queries, errors
+
+
+def _run_in_thread(scenario, data, indices):
+    try:
+        return _run_requests(scenario, data, indices)
+    finally:
+        connection.close()  # Each worker thread opened its own connection
+
+
+def run_scenario(scenario, data, requests, concurrency=1, warmup=0):
+    """
+    Sends ``requests`` requests through Django's full request handling
+    (middleware included, no network) from ``concurrency`` threads, after
+    ``warmup`` untimed ones. Returns throughput, latency percentiles (ms),
+    queries per request and the error count.
+    """
+    if warmup:
+        _run_requests(scenario, data, range(-warmup, 0))
+
+    started = perf_counter()
+    if concurrency == 1:
+        latencies, queries, errors = _run_requests(scenario, data, range(requests))
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            chunks = list(pool.map(
+                lambda n: _run_in_thread(scenario, data, range(n, requests, concurrency)), range(concurrency)
+            ))
+        latencies = [value for chunk in chunks for value in chunk[0]]
+        queries = [value for chunk in chunks for value in chunk[1]]
+        errors = sum(chunk[2] for chunk in chunks)
+    elapsed = perf_counter() - started
+
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": errors,
+        "throughput": round(requests / elapsed, 1),
+        "latency_ms": {
+            **{f"p{p}": round(float(v), 2) for p, v in zip(PERCENTILES, np.percentile(latencies_ms, PERCENTILES))},
+            "mean": round(float(latencies_ms.mean()), 2),
+            "max": round(float(latencies_ms.max()), 2),
+        },
+        "queries": {"mean": round(float(np.mean(queries)), 2), "max": int(max(queries))},
+    }
+
+
+def git_revision():
+    """
+    Short commit hash of the working tree, suffixed "-dirty" when it has
+    uncommitted changes; "unknown" outside a git checkout.
+    """
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True)
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return f"{commit}-dirty" if dirty.stdout.strip() else commit
+
+
+def save_results(results, directory=RESULTS_DIR):
+    """
+    Writes a run to ``<directory>/<revision>-<database>.json``; a rerun on
+    the same revision and database replaces the earlier file.
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"{results['revision']}-{results['database']}.json"
+    path.write_text(json.dumps(results, indent=2) + "\n")
+    return path
+
+
+def load_results(reference, database, directory=RESULTS_DIR):
+    """
+    Loads a saved run from a file path, or by revision (a prefix is enough)
+    for the given database.
+    """
+    path = Path(reference)
+    if not path.is_file():
+        matches = sorted(directory.glob(f"{reference}*-{database}.json"), key=lambda p: p.stat().st_mtime)
+        if not matches:
+            raise FileNotFoundError(f"No saved {database} results for {reference!r} in {directory}")
+        path = matches[-1]
+    return json.loads(path.read_text())
+
+
+def describe_run(database, appointments, options):
+    return {
+        "revision": git_revision(),
+        "database": database,
+        "recorded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "appointments": appointments,
+        "python": platform.python_version(),
+        "django": django.get_version(),
+        "options": options,
+        "scenarios": {},
+    }
+
+
+def compare(current, baseline, threshold=0.1):
+    """
+    Lines comparing each scenario's p50/p95 latency, throughput and queries
+    per request with ``baseline``, marking changes for the worse beyond
+    ``threshold`` (a fraction).
+    """
+    lines = [f"Compared with {baseline['revision']} ({baseline['recorded_at']}):"]
+    for name, result in current["scenarios"].items():
+        before = baseline["scenarios"].get(name)
+        if before is None:
+            lines.append(f"  {name:<12} no baseline")
+            continue
+        cells = []
+        for label, now, then, higher_is_worse in (
+            ("p50", result["latency_ms"]["p50"], before["latency_ms"]["p50"], True),
+            ("p95", result["latency_ms"]["p95"], before["latency_ms"]["p95"], True),
+            ("req/s", result["throughput"], before["throughput"], False),
+            ("queries", result["queries"]["mean"], before["queries"]["mean"], True),
+        ):
+            change = (now - then) / then if then else 0.0
+            worse = change > threshold if higher_is_worse else change < -threshold
+            cells.append(f"{label} {then:g} -> {now:g} ({change:+.0%}){' REGRESSION' if worse else ''}")
+        lines.append(f"  {name:<12} " + ", ".join(cells))
+    return lines
@@ -0,0 +1,97 @@
+import json
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.utils import timezone
+
+from benchmarks.fake_firebase import bench_token
+from src.healthcare.models import Appointment
+from src.healthcare.seeding import BENCH_USER_PREFIX
+
+
+class BenchData:
+    """
+    The synthetic users and appointments scenarios act on: up to ``sample``
+    upcoming appointments of seeded clients (with their owners) and the
+    seeded staff who have appointments.
+    """
+
+    def __init__(self, sample=200):
+        upcoming = (
+            Appointment.objects.filter(
+                user__username__startswith=BENCH_USER_PREFIX, appointment_date__gte=timezone.now() + timedelta(days=1)
+            )
+            .order_by("id")
+            .values_list("id", "user_id", "appointment_date", "time", "duration")[:sample]
+        )
+        self.appointments = list(upcoming)
+        users = User.objects.in_bulk({row[1] for row in self.appointments})
+        self.owners = [users[row[1]] for row in self.appointments]
+        staff_ids = (
+            Appointment.objects.filter(staff__username__startswith=BENCH_USER_PREFIX)
+            .values_list("staff_id", flat=True)
+            .distinct()[:sample]
+        )
+        self.staff = list(User.objects.filter(pk__in=list(staff_ids)))
+        if not self.appointments or not self.staff:
+            raise ValueError("No benchmark data; seed it first (python -m benchmarks --seed N).")
+
+    def client_user(self, i):
+        return self.owners[i % len(self.owners)]
+
+    def staff_user(self, i):
+        return self.staff[i % len(self.staff)]
+
+
+def _auth(user):
+    return {"Authorization": f"Bearer {bench_token(user)}"}
+
+
+def login(client, data, i):
+    return client.post("/api/auth/login/", headers=_auth(data.client_user(i)))
+
+
+def role(client, data, i):
+    return client.get("/api/auth/role/", headers=_auth(data.client_user(i)))
+
+
+def client_list(client, data, i):
+    return client.get("/api/appointments/", headers=_auth(data.client_user(i)))
+
+
+def staff_list(client, data, i):
+    return client.get("/api/appointments/", headers=_auth(data.staff_user(i)))
+
+
+def create(client, data, i):
+    day = timezone.localdate() + timedelta(days=30 + i % 300)
+    payload = {"title": f"Benchmark booking {i}", "appointment_date": day.isoformat(), "time": "10:00", "duration": 30}
+    return client.post(
+        "/api/appointments/", json.dumps(payload), content_type="application/json", headers=_auth(data.client_user(i))
+    )
+
+
+def update(client, data, i):
+    pk, _, appointment_date, time, duration = data.appointments[i % len(data.appointments)]
+    payload = {
+        "title": f"Rescheduled {i}",
+        "appointment_date": timezone.localtime(appointment_date).date().isoformat(),
+        "time": time.strftime("%H:%M"),
+        "duration": duration,
+    }
+    return client.put(
+        f"/api/appointments/{pk}/", json.dumps(payload), content_type="application/json",
+        headers=_auth(data.client_user(i)),
+    )
+
+
+# Scenario name -> request function(client, data, i). Writes come last, so
+# the read scenarios of a run see the same data.
+SCENARIOS = {
+    "login": login,
+    "role": role,
+    "client-list": client_list,
+    "staff-list": staff_list,
+    "create": create,
+    "update": update,
+}
@@ -0,0 +1,29 @@
+"""
+Project settings for the benchmark suite, on the database named by
+BENCH_DATABASE: "sqlite" (a file next to this module, or BENCH_SQLITE_PATH)
+or "postgresql" (the DATABASE_* connection the project normally uses).
+"""
+import os
+
+BENCH_DATABASE = os.environ.get("BENCH_DATABASE", "sqlite")
+if BENCH_DATABASE == "sqlite":
+    # config.settings reads the PostgreSQL connection unconditionally
+    for name in ("DATABASE_NAME", "DATABASE_USER", "DATABASE_PASSWORD", "DATABASE_HOST"):
+        os.environ.setdefault(name, "")
+
+from config.settings import *  # noqa: E402,F401,F403
+from config.settings import ALLOWED_HOSTS, BASE_DIR  # noqa: E402
+
+if BENCH_DATABASE == "sqlite":
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": os.environ.get("BENCH_SQLITE_PATH", str(BASE_DIR / "benchmarks" / "bench.sqlite3")),
+            "OPTIONS": {"timeout": 30},  # Concurrent writers wait for the lock
+        }
+    }
+elif BENCH_DATABASE != "postgresql":
+    raise ValueError(f"BENCH_DATABASE must be 'sqlite' or 'postgresql', not {BENCH_DATABASE!r}")
+
+DEBUG = False  # Django keeps every query in memory when DEBUG is on
+ALLOWED_HOSTS = [*ALLOWED_HOSTS, "testserver"]  # django.test.Client's host
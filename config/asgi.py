@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
 
 application = get_asgi_application()
+
+# Load the Firebase signing keys before the first request needs them
+from firebase.verifier import preload_certificates  # noqa: E402
+
+preload_certificates()
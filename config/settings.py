@@ -11,9 +11,10 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
 from pathlib import Path
-from decouple import config
+from decouple import Csv, config
 from dotenv import load_dotenv
 import os
+from src.core.log import parse_levels
 
 load_dotenv()  # Load variables from .env
 
@@ -50,12 +51,16 @@ INSTALLED_APPS = [
     "src.healthcare",
     "src.core",
     "src.users",
+    "src.tasks",
     "rest_framework",
     "corsheaders",
     'django_extensions',
 ]
 
 MIDDLEWARE = [
+    "src.middleware.request_id.RequestIdMiddleware",
+    "src.middleware.profiling.ProfilingMiddleware",
+    "src.middleware.metrics.MetricsMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.security.SecurityMiddleware",
@@ -128,6 +133,27 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# Local memory by default; point CACHE_BACKEND/CACHE_LOCATION at a shared
+# backend (e.g. django.core.cache.backends.redis.RedisCache) across workers.
+
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='healthcare-backend'),
+    }
+}
+
+PROFILE_CACHE_ALIAS = 'default'
+PROFILE_CACHE_TIMEOUT = config('PROFILE_CACHE_TIMEOUT', default=300, cast=int)  # Seconds
+
+# Version counters behind the ETags of appointment, profile and role reads
+# (src/core/conditional.py); must be shared by every worker.
+VERSION_CACHE_ALIAS = 'default'
+VERSION_CACHE_TIMEOUT = config('VERSION_CACHE_TIMEOUT', default=86400, cast=int)  # Seconds
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -169,13 +195,144 @@ STATIC_URL = "static/"
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+# DRF authentication chain, tried in order on every API request. Firebase
+# bearer tokens only by default; append e.g.
+# rest_framework.authentication.SessionAuthentication for the browsable API.
+API_AUTHENTICATION_CLASSES = config(
+    'API_AUTHENTICATION_CLASSES', default='firebase.firebase_auth.FirebaseAuthentication', cast=Csv()
+)
+
 REST_FRAMEWORK = {
-    'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework.authentication.SessionAuthentication',
-        'rest_framework.authentication.BasicAuthentication',
-        'firebase.firebase_auth.FirebaseAuthentication',
-    ),
+    'DEFAULT_AUTHENTICATION_CLASSES': tuple(API_AUTHENTICATION_CLASSES),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
 }
+
+# Serve the hot GET endpoints (appointment list/detail, role, profile detail)
+# from async views. Enable when running under an ASGI server (config/asgi.py).
+ASYNC_VIEWS = config('ASYNC_VIEWS', default=False, cast=bool)
+FIREBASE_VERIFY_THREADS = config('FIREBASE_VERIFY_THREADS', default=32, cast=int)  # Async views' token verification pool
+
+# Cursor pagination for list endpoints (src/core/pagination.py)
+API_PAGE_SIZE = config('API_PAGE_SIZE', default=50, cast=int)
+API_MAX_PAGE_SIZE = config('API_MAX_PAGE_SIZE', default=200, cast=int)  # Upper bound for ?page_size=
+
+# Upper bound on operations per POST /api/appointments/bulk/ request
+BULK_APPOINTMENT_MAX_OPERATIONS = config('BULK_APPOINTMENT_MAX_OPERATIONS', default=1000, cast=int)
+
+# Background tasks (src/tasks). Queued in the database and run by
+# `python manage.py run_tasks`; use src.tasks.brokers.ImmediateBroker to run
+# them in-process after commit instead.
+TASKS_BROKER = config('TASKS_BROKER', default='src.tasks.brokers.DatabaseBroker')
+TASKS_CONCURRENCY = config('TASKS_CONCURRENCY', default=4, cast=int)  # Worker threads
+TASKS_MAX_ATTEMPTS = config('TASKS_MAX_ATTEMPTS', default=3, cast=int)
+TASKS_RETRY_DELAY = config('TASKS_RETRY_DELAY', default=30, cast=int)  # Seconds, doubled per attempt
+TASKS_LOCK_TIMEOUT = config('TASKS_LOCK_TIMEOUT', default=600, cast=int)  # Seconds before a running task is reclaimed
+
+# Appointment change feed (src/healthcare/changes.py). Watermarks trail the
+# clock by CHANGE_FEED_LAG seconds, which must exceed the longest write
+# transaction; tombstones of deleted and reassigned appointments are kept
+# for CHANGE_FEED_RETENTION_DAYS (`python manage.py prune_tombstones`).
+CHANGE_FEED_LAG = config('CHANGE_FEED_LAG', default=5, cast=int)  # Seconds
+CHANGE_FEED_RETENTION_DAYS = config('CHANGE_FEED_RETENTION_DAYS', default=30, cast=int)
+
+# Appointment event stream (src/core/events.py), served at
+# /api/appointments/events/ with ASYNC_VIEWS. LocalBackend reaches only the
+# process that made the change; run several ASGI processes with
+# src.core.events.RedisBackend (needs the redis package).
+EVENTS_BACKEND = config('EVENTS_BACKEND', default='src.core.events.LocalBackend')
+EVENTS_REDIS_URL = config('EVENTS_REDIS_URL', default='redis://localhost:6379/0')
+EVENTS_QUEUE_SIZE = config('EVENTS_QUEUE_SIZE', default=100, cast=int)  # Pending events per stream before a resync
+EVENTS_MAX_CONNECTIONS_PER_USER = config('EVENTS_MAX_CONNECTIONS_PER_USER', default=3, cast=int)  # Per process
+EVENTS_HEARTBEAT = config('EVENTS_HEARTBEAT', default=15, cast=int)  # Seconds between keepalive comments
+EVENTS_MAX_AGE = config('EVENTS_MAX_AGE', default=900, cast=int)  # Seconds before a stream ends and reconnects
+
+# Appointment counts per day, staff member and status (src/healthcare/summary.py),
+# kept up to date on write; run `python manage.py reconcile_appointment_summary`
+# periodically to repair drift from writes that bypass the model
+# (e.g. QuerySet.update(), or staff deletions clearing appointments' staff).
+SUMMARY_MAX_DAYS = config('SUMMARY_MAX_DAYS', default=366, cast=int)  # Longest range per summary request
+
+# Appointment exports (src/healthcare/export.py). Rows read and encoded per
+# chunk; Parquet files get one row group per chunk.
+EXPORT_CHUNK_SIZE = config('EXPORT_CHUNK_SIZE', default=5000, cast=int)
+
+# Free-slot search (src/healthcare/availability.py). Slots are offered on a
+# grid of AVAILABILITY_SLOT_STEP minutes within the daily bookable hours.
+AVAILABILITY_DAY_START = config('AVAILABILITY_DAY_START', default='09:00')
+AVAILABILITY_DAY_END = config('AVAILABILITY_DAY_END', default='17:00')
+AVAILABILITY_SLOT_STEP = config('AVAILABILITY_SLOT_STEP', default=15, cast=int)  # Minutes
+AVAILABILITY_MAX_DAYS = config('AVAILABILITY_MAX_DAYS', default=62, cast=int)
+AVAILABILITY_MAX_STAFF = config('AVAILABILITY_MAX_STAFF', default=50, cast=int)
+AVAILABILITY_CACHE_ALIAS = 'default'
+AVAILABILITY_CACHE_TIMEOUT = config('AVAILABILITY_CACHE_TIMEOUT', default=3600, cast=int)  # Seconds
+
+# Verified Firebase ID token cache (firebase/token_cache.py)
+FIREBASE_TOKEN_CACHE_SIZE = config('FIREBASE_TOKEN_CACHE_SIZE', default=4096, cast=int)
+FIREBASE_TOKEN_CACHE_MARGIN = config('FIREBASE_TOKEN_CACHE_MARGIN', default=60, cast=int)  # Seconds before `exp`
+
+# Firebase revocation checks (firebase/revocation.py): "remote" asks Firebase on
+# every verification, "local" uses a replicated set refreshed in the background.
+FIREBASE_REVOCATION_MODE = config('FIREBASE_REVOCATION_MODE', default='remote')
+FIREBASE_REVOCATION_REFRESH_INTERVAL = config('FIREBASE_REVOCATION_REFRESH_INTERVAL', default=300, cast=int)  # Seconds
+
+# Verify ID token signatures offline against cached Google certificates
+# (firebase/verifier.py) instead of through firebase_admin.
+FIREBASE_LOCAL_VERIFICATION = config('FIREBASE_LOCAL_VERIFICATION', default=False, cast=bool)
+FIREBASE_PROJECT_ID = config('FIREBASE_PROJECT_ID', default=None)  # Defaults to the Firebase app's project
+
+# Request metrics (src/core/metrics.py): per-view histograms of wall time,
+# database queries and time, Firebase time and serializer time, served in
+# Prometheus format at /metrics. Each process keeps its own histograms.
+METRICS_ENABLED = config('METRICS_ENABLED', default=True, cast=bool)
+METRICS_SERVER_TIMING = config('METRICS_SERVER_TIMING', default=DEBUG, cast=bool)  # Add a Server-Timing header
+METRICS_TOKEN = config('METRICS_TOKEN', default='')  # Bearer token required by /metrics; 404 while unset
+
+# Request profiling (src/middleware/profiling.py). Off unless PROFILING_ENABLED;
+# then a sampled fraction of requests, and requests with a signed X-Profile
+# header (`python manage.py profiles --token`), run under cProfile. Captures
+# go to a ring buffer of PROFILING_MAX_FILES files; see `manage.py profiles`.
+PROFILING_ENABLED = config('PROFILING_ENABLED', default=False, cast=bool)
+PROFILING_SAMPLE_RATE = config('PROFILING_SAMPLE_RATE', default=0.0, cast=float)  # 0.0-1.0
+PROFILING_SLOW_MS = config('PROFILING_SLOW_MS', default=0, cast=int)  # Keep sampled profiles at least this slow
+PROFILING_SECRET = config('PROFILING_SECRET', default='')  # Signs X-Profile; header disabled when empty
+PROFILING_TOKEN_MAX_AGE = config('PROFILING_TOKEN_MAX_AGE', default=3600, cast=int)  # Seconds
+PROFILING_DIR = config('PROFILING_DIR', default=str(BASE_DIR / 'profiles'))
+PROFILING_MAX_FILES = config('PROFILING_MAX_FILES', default=200, cast=int)
+
+# Logging (src/core/log.py). Records go through a bounded queue to a background
+# writer thread and carry the X-Request-ID of the request that produced them.
+# LOG_LEVELS overrides per logger, e.g. "src.healthcare=DEBUG,firebase=WARNING";
+# DEBUG records are kept at LOG_DEBUG_SAMPLE_RATE (0.0-1.0).
+LOG_LEVEL = config('LOG_LEVEL', default='INFO')
+LOG_LEVELS = parse_levels(config('LOG_LEVELS', default=''))
+LOG_FORMAT = config('LOG_FORMAT', default='json')  # "json" or "text"
+LOG_DEBUG_SAMPLE_RATE = config('LOG_DEBUG_SAMPLE_RATE', default=1.0, cast=float)
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "filters": {
+        "request_id": {"()": "src.core.log.RequestIdFilter"},
+        "sample_debug": {"()": "src.core.log.SamplingFilter", "rate": LOG_DEBUG_SAMPLE_RATE},
+    },
+    "formatters": {
+        "json": {"()": "src.core.log.JsonFormatter"},
+        "text": {"format": "%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s"},
+    },
+    "handlers": {
+        "console": {
+            "class": "src.core.log.QueueStreamHandler",
+            "filters": ["sample_debug", "request_id"],
+            "formatter": LOG_FORMAT,
+        },
+    },
+    "root": {"handlers": ["console"], "level": "WARNING"},
+    "loggers": {
+        "django": {"level": "INFO"},
+        "django.db.backends": {"level": "WARNING"},  # SQL at DEBUG is per-query; enable explicitly
+        **{name: {"level": LOG_LEVEL} for name in ("src", "firebase")},
+        **{name: {"level": level} for name, level in LOG_LEVELS.items()},
+    },
+}
@@ -20,12 +20,14 @@ from django.contrib import admin  # Add this line
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from src.core.metrics import metrics_view
 
 urlpatterns = [
     path("admin/", admin.site.urls), # Admin panel
     path("api/", include("src.healthcare.urls")), # Healthcare app endpoints
     path('api/auth/', include('src.authentication.urls')),  # Authentication endpoints
     path('api/users/', include('src.users.urls')), 
+    path("metrics", metrics_view),  # Prometheus scrape endpoint
     path("", lambda request: HttpResponse("Welcome to the Healthcare Appointments API!")),
 ]
 
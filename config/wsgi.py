@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
 
 application = get_wsgi_application()
+
+# Load the Firebase signing keys before the first request needs them
+from firebase.verifier import preload_certificates  # noqa: E402
+
+preload_certificates()
@@ -1,8 +1,9 @@
-import firebase_admin
-from firebase_admin import auth, credentials, initialize_app
+from firebase_admin import credentials, initialize_app
 from rest_framework.authentication import BaseAuthentication
 from rest_framework.exceptions import AuthenticationFailed
-from django.contrib.auth.models import User
+from firebase.token_cache import averify_id_token, verify_id_token
+from src.core.identity import NOT_REGISTERED_MESSAGE, FirebaseIdentity
+from src.users.cache import aget_profile_by_uid, get_profile_by_uid
 import os
 
 # Initialize Firebase Admin
@@ -10,21 +11,55 @@ cred = credentials.Certificate(os.getenv("FIREBASE_ADMIN_SDK_PATH"))
 initialize_app(cred)
 
 class FirebaseAuthentication(BaseAuthentication):
+    """
+    Verifies the Firebase ID token once per request and exposes the result
+    as a FirebaseIdentity on ``request.auth``.
+
+    The UID is resolved through the profile cache, so a request with a
+    cached token and profile does not touch the database. Users are not
+    created here: a UID without an account must sign in through LoginView
+    first. Requests without a Bearer token are left to the next class in
+    DEFAULT_AUTHENTICATION_CLASSES. Async views (src.core.async_views) use
+    ``aauthenticate``, which applies the same checks without blocking.
+    """
+
     def authenticate(self, request):
-        auth_header = request.headers.get('Authorization')
-        
-        if not auth_header:
+        token = self.get_token(request)
+        if token is None:
             return None
 
         try:
-            token = auth_header.split(' ')[1]
-            decoded_token = auth.verify_id_token(token)
+            decoded_token = verify_id_token(token, check_revoked=True)
             uid = decoded_token['uid']
         except Exception as e:
             raise AuthenticationFailed(f'Firebase Authentication failed: {str(e)}')
+        return self.resolve(decoded_token, get_profile_by_uid(uid))
+
+    async def aauthenticate(self, request):
+        token = self.get_token(request)
+        if token is None:
+            return None
 
         try:
-            user, created = User.objects.get_or_create(username=uid)
-            return (user, None)
+            decoded_token = await averify_id_token(token, check_revoked=True)
+            uid = decoded_token['uid']
         except Exception as e:
-            raise AuthenticationFailed(f'User creation failed: {str(e)}')
+            raise AuthenticationFailed(f'Firebase Authentication failed: {str(e)}')
+        return self.resolve(decoded_token, await aget_profile_by_uid(uid))
+
+    def get_token(self, request):
+        auth_header = request.headers.get('Authorization', '')
+        if not auth_header.startswith('Bearer '):
+            return None
+        return auth_header.split(' ')[1]
+
+    def resolve(self, decoded_token, profile):
+        """
+        The ``(user, identity)`` pair for a verified token and the profile
+        of its UID.
+        """
+        if profile is None:
+            raise AuthenticationFailed(NOT_REGISTERED_MESSAGE)
+        if not profile.user.is_active:
+            raise AuthenticationFailed('User inactive or deleted.')
+        return (profile.user, FirebaseIdentity(decoded_token, profile.user, profile))
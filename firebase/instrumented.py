@@ -0,0 +1,29 @@
+from functools import wraps
+
+from firebase_admin import auth as firebase_auth
+
+from src.core.metrics import timed
+
+
+class InstrumentedAuth:
+    """
+    Stand-in for the ``firebase_admin.auth`` module that records the time
+    spent in its functions as the request's "firebase" component. Classes
+    (the error types) are passed through. Attributes are looked up on the
+    module at call time, so patching ``firebase_admin.auth`` still applies.
+    """
+
+    def __getattr__(self, name):
+        attr = getattr(firebase_auth, name)
+        if not callable(attr) or isinstance(attr, type):
+            return attr
+
+        @wraps(attr)
+        def call(*args, **kwargs):
+            with timed("firebase"):
+                return attr(*args, **kwargs)
+
+        return call
+
+
+auth = InstrumentedAuth()
@@ -0,0 +1,165 @@
+import logging
+import threading
+import time
+
+from django.conf import settings
+from firebase.instrumented import auth
+
+logger = logging.getLogger(__name__)
+
+# Firebase ID tokens live for one hour; a revocation older than that cannot
+# affect any token that still passes the expiry check.
+ID_TOKEN_LIFETIME = 3600
+
+
+class RevocationRegistry:
+    """
+    Locally replicated view of revoked and disabled Firebase users.
+
+    A background thread periodically lists the project's users through the
+    Firebase admin client and keeps the UIDs whose ``tokens_valid_after``
+    falls within the token lifetime, plus every disabled UID. Request-time
+    checks are then a dictionary lookup with no I/O.
+
+    ``client`` only needs a ``list_users()`` method returning a page with
+    ``iterate_all()``, so a fake can stand in for ``firebase_admin.auth``.
+    """
+
+    def __init__(self, client=None, interval=300, max_staleness=None, clock=time.time):
+        self.client = client or auth
+        self.interval = interval
+        self.max_staleness = max_staleness or interval * 3
+        self.clock = clock
+        self.last_refreshed = None
+        self._valid_after = {}  # uid -> seconds since the epoch
+        self._disabled = frozenset()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def ready(self):
+        """
+        True while the replicated set is fresh enough to replace the
+        remote revocation check.
+        """
+        return (
+            self.last_refreshed is not None
+            and self.clock() - self.last_refreshed <= self.max_staleness
+        )
+
+    def refresh(self):
+        """
+        Rebuilds the revoked/disabled sets from Firebase. Local invalidations
+        newer than what Firebase reports are kept.
+        """
+        now = self.clock()
+        valid_after = {}
+        disabled = set()
+        for user in self.client.list_users().iterate_all():
+            if user.disabled:
+                disabled.add(user.uid)
+            revoked_at = (user.tokens_valid_after_timestamp or 0) / 1000
+            if revoked_at > now - ID_TOKEN_LIFETIME:
+                valid_after[user.uid] = revoked_at
+
+        with self._lock:
+            for uid, revoked_at in self._valid_after.items():
+                if revoked_at > max(valid_after.get(uid, 0), now - ID_TOKEN_LIFETIME):
+                    valid_after[uid] = revoked_at
+            # Swap whole objects so readers never need the lock
+            self._valid_after = valid_after
+            self._disabled = frozenset(disabled)
+            self.last_refreshed = now
+        logger.info(
+            "Revocation registry refreshed: %d revoked, %d disabled",
+            len(valid_after), len(disabled),
+        )
+
+    def check(self, claims):
+        """
+        Raises the same errors as ``verify_id_token(check_revoked=True)``
+        if the token's user is disabled or its tokens were revoked.
+        """
+        uid = claims.get("uid")
+        if uid in self._disabled:
+            raise auth.UserDisabledError("The user record is disabled.")
+        revoked_at = self._valid_after.get(uid)
+        if revoked_at is not None and claims.get("iat", 0) < revoked_at:
+            raise auth.RevokedIdTokenError("The Firebase ID token has been revoked.")
+
+    def mark_revoked(self, uid, valid_after=None):
+        """
+        Invalidation hook: rejects tokens of ``uid`` issued before
+        ``valid_after`` (defaults to now) without waiting for a refresh.
+        """
+        # Firebase truncates tokens_valid_after to whole seconds
+        valid_after = int(self.clock()) if valid_after is None else valid_after
+        with self._lock:
+            current = dict(self._valid_after)
+            current[uid] = max(current.get(uid, 0), valid_after)
+            self._valid_after = current
+
+    def mark_disabled(self, uid, disabled=True):
+        with self._lock:
+            if disabled:
+                self._disabled = self._disabled | {uid}
+            else:
+                self._disabled = self._disabled - {uid}
+
+    def start(self):
+        """
+        Starts the background refresh thread once per process. Runs on
+        every verification, so a running thread is detected without the lock.
+        """
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, name="firebase-revocation-refresh", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while True:
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception("Revocation registry refresh failed")
+            if self._stop.wait(self.interval):
+                return
+
+
+revocation_registry = RevocationRegistry(
+    interval=getattr(settings, "FIREBASE_REVOCATION_REFRESH_INTERVAL", 300),
+)
+
+
+def local_revocation_enabled():
+    return getattr(settings, "FIREBASE_REVOCATION_MODE", "remote") == "local"
+
+
+
+def revoke_refresh_tokens(uid):
+    """
+    Signs ``uid`` out everywhere. Their ID tokens are rejected in this
+    process straight away; other processes catch up on their next
+    registry refresh.
+    """
+    auth.revoke_refresh_tokens(uid)
+    revocation_registry.mark_revoked(uid)
+
+
+def set_user_disabled(uid, disabled=True):
+    """
+    Disables (or re-enables) ``uid`` in Firebase and applies the change to
+    this process's registry straight away.
+    """
+    auth.update_user(uid, disabled=disabled)
+    revocation_registry.mark_disabled(uid, disabled=disabled)
@@ -0,0 +1,148 @@
+import hashlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from asgiref.sync import sync_to_async
+from cachetools import TLRUCache
+from django.conf import settings
+from firebase.instrumented import auth
+
+from firebase.revocation import local_revocation_enabled, revocation_registry
+from firebase.verifier import check_revoked_remotely, get_verifier, local_verification_enabled
+
+
+def _token_key(token):
+    # Never keep raw ID tokens in memory longer than the request needs them
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+class VerifiedTokenCache:
+    """
+    Bounded LRU cache of verified Firebase ID token claims.
+
+    Entries are keyed on a SHA-256 digest of the token and expire at the
+    token's ``exp`` minus a safety margin, so a cached token is never
+    accepted after Firebase itself would reject it.
+    """
+
+    def __init__(self, maxsize=4096, margin=60, timer=time.time):
+        self.margin = margin
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._cache = TLRUCache(maxsize=maxsize, ttu=self._expires_at, timer=timer)
+
+    def _expires_at(self, key, value, now):
+        claims, _ = value
+        return claims.get("exp", 0) - self.margin
+
+    def get(self, token, check_revoked=False):
+        """
+        Returns a copy of the cached claims, or None on a miss. An entry
+        verified without a revocation check does not satisfy a request
+        that needs one.
+        """
+        with self._lock:
+            entry = self._cache.get(_token_key(token))
+            if entry is not None and (entry[1] or not check_revoked):
+                self.hits += 1
+                return dict(entry[0])
+            self.misses += 1
+            return None
+
+    def set(self, token, claims, check_revoked=False):
+        with self._lock:
+            self._cache[_token_key(token)] = (dict(claims), check_revoked)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._cache),
+                "maxsize": self._cache.maxsize,
+            }
+
+
+token_cache = VerifiedTokenCache(
+    maxsize=getattr(settings, "FIREBASE_TOKEN_CACHE_SIZE", 4096),
+    margin=getattr(settings, "FIREBASE_TOKEN_CACHE_MARGIN", 60),
+)
+
+
+def _verify(token, check_revoked):
+    if not local_verification_enabled():
+        return auth.verify_id_token(token, check_revoked=check_revoked)
+    claims = get_verifier().verify(token)
+    if check_revoked:
+        check_revoked_remotely(claims)
+    return claims
+
+
+@lru_cache(maxsize=None)
+def _verify_executor():
+    return ThreadPoolExecutor(
+        max_workers=getattr(settings, "FIREBASE_VERIFY_THREADS", 32), thread_name_prefix="firebase-verify"
+    )
+
+
+def _revocation_checks(check_revoked):
+    """
+    Returns ``(check_locally, check_remotely)`` for a verification.
+    """
+    check_locally = check_revoked and local_revocation_enabled()
+    if check_locally:
+        revocation_registry.start()
+        check_locally = revocation_registry.ready
+    return check_locally, check_revoked and not check_locally
+
+
+def verify_id_token(token, check_revoked=False):
+    """
+    Drop-in replacement for ``firebase_admin.auth.verify_id_token`` that
+    serves repeat verifications of the same token from ``token_cache``.
+
+    With ``FIREBASE_REVOCATION_MODE = "local"`` the revocation check is
+    answered from the replicated revocation registry instead of a call to
+    Firebase, falling back to the remote check until the registry is fresh.
+    With ``FIREBASE_LOCAL_VERIFICATION`` signatures are checked offline
+    against the certificates held by ``firebase.verifier``.
+    """
+    check_locally, check_remotely = _revocation_checks(check_revoked)
+    claims = token_cache.get(token, check_revoked=check_remotely)
+    if claims is None:
+        claims = _verify(token, check_remotely)
+        token_cache.set(token, claims, check_revoked=check_remotely)
+    if check_locally:
+        revocation_registry.check(claims)
+    return claims
+
+
+async def averify_id_token(token, check_revoked=False):
+    """
+    Async variant of verify_id_token for async views. Cache hits and local
+    revocation checks are answered on the event loop; only a cache miss
+    runs in a worker thread, outside the thread-sensitive executor, so
+    slow calls to Firebase do not queue behind each other. Misses share a
+    pool of FIREBASE_VERIFY_THREADS threads: they wait on the network, so
+    the pool is sized for concurrency rather than CPU count.
+    """
+    check_locally, check_remotely = _revocation_checks(check_revoked)
+    claims = token_cache.get(token, check_revoked=check_remotely)
+    if claims is None:
+        claims = await sync_to_async(_verify, thread_sensitive=False, executor=_verify_executor())(
+            token, check_remotely
+        )
+        token_cache.set(token, claims, check_revoked=check_remotely)
+    if check_locally:
+        revocation_registry.check(claims)
+    return claims
+
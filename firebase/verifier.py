@@ -0,0 +1,218 @@
+import logging
+import re
+import threading
+import time
+
+import firebase_admin
+import jwt
+import requests
+from cryptography import x509
+from django.conf import settings
+from firebase.instrumented import auth
+
+logger = logging.getLogger(__name__)
+
+CERTIFICATES_URL = (
+    "https://www.googleapis.com/robot/v1/metadata/x509/securetoken@system.gserviceaccount.com"
+)
+ISSUER_PREFIX = "https://securetoken.google.com/"
+
+_MAX_AGE = re.compile(r"max-age=(\d+)")
+
+
+def fetch_certificates(url=CERTIFICATES_URL, timeout=10):
+    """
+    Downloads Google's token-signing certificates. Returns the
+    ``{kid: pem}`` mapping and its ``Cache-Control`` max-age in seconds.
+    """
+    response = requests.get(url, timeout=timeout)
+    response.raise_for_status()
+    match = _MAX_AGE.search(response.headers.get("Cache-Control", ""))
+    max_age = int(match.group(1)) if match else 3600
+    return response.json(), max_age
+
+
+class CertificateStore:
+    """
+    Parsed public keys for Google's token-signing certificates.
+
+    Keys are parsed once per download. Server processes preload them at
+    boot (see preload_certificates); elsewhere the first key lookup loads
+    them. Either way a background refresh then runs a little before each
+    ``Cache-Control`` expiry, so requests never wait on the certificate
+    endpoint once the store is warm, and processes that never verify a
+    token (management commands) never fetch. ``fetch`` can be replaced
+    with a function serving locally generated certificates.
+    """
+
+    def __init__(self, fetch=fetch_certificates, refresh_margin=300, retry_interval=30, clock=time.time):
+        self.fetch = fetch
+        self.refresh_margin = refresh_margin
+        self.retry_interval = retry_interval
+        self.clock = clock
+        self.expires_at = 0
+        self._keys = {}
+        self._lock = threading.Lock()
+        self._last_attempt = 0
+        self._timer = None
+
+    def load(self):
+        """
+        Fetches and parses the certificates, replacing the current keys.
+        """
+        with self._lock:
+            self._last_attempt = self.clock()
+            certificates, max_age = self.fetch()
+            self._keys = {
+                kid: x509.load_pem_x509_certificate(pem.encode("utf-8")).public_key()
+                for kid, pem in certificates.items()
+            }
+            self.expires_at = self.clock() + max_age
+        logger.info("Loaded %d Firebase signing keys (max-age %ss)", len(certificates), max_age)
+        return max_age
+
+    def get_key(self, kid):
+        """
+        Returns the public key for ``kid``. Unknown key ids trigger a
+        synchronous reload, rate limited to one per ``retry_interval``.
+        """
+        key = self._keys.get(kid)
+        if key is None and self.clock() - self._last_attempt >= self.retry_interval:
+            try:
+                self.load()
+            except Exception:
+                logger.exception("Could not reload Firebase signing keys")
+            key = self._keys.get(kid)
+        if self._timer is None:
+            self.start()
+        return key
+
+    def preload(self):
+        """
+        Loads the keys now, before any request needs them, and starts the
+        background refresh. A failed load is logged and retried by the
+        refresh.
+        """
+        try:
+            self.load()
+        except Exception:
+            logger.exception("Could not preload Firebase signing keys")
+        self.start()
+
+    def start(self):
+        """
+        Keeps the store refreshed in a background thread, starting right
+        away if no keys are loaded yet. Calling it again does nothing.
+        """
+        with self._lock:
+            if self._timer is None:
+                self._schedule(max(self.expires_at - self.refresh_margin - self.clock(), 0))
+
+    def stop(self):
+        if self._timer is not None:
+            self._timer.cancel()
+
+    def _refresh(self):
+        try:
+            max_age = self.load()
+            delay = max(max_age - self.refresh_margin, self.retry_interval)
+        except Exception:
+            # Keep serving the previous keys; Google publishes new keys
+            # well before retiring old ones.
+            logger.exception("Firebase signing key refresh failed")
+            delay = self.retry_interval
+        self._schedule(delay)
+
+    def _schedule(self, delay):
+        self._timer = threading.Timer(delay, self._refresh)
+        self._timer.daemon = True
+        self._timer.start()
+
+
+class LocalTokenVerifier:
+    """
+    Verifies Firebase ID tokens offline with PyJWT, applying the same
+    checks as ``firebase_admin.auth.verify_id_token`` and raising the same
+    exception types.
+    """
+
+    def __init__(self, project_id, store, clock_skew=0):
+        self.project_id = project_id
+        self.store = store
+        self.clock_skew = clock_skew
+
+    def verify(self, token):
+        try:
+            header = jwt.get_unverified_header(token)
+        except jwt.PyJWTError as e:
+            raise auth.InvalidIdTokenError(f"Could not decode ID token header: {e}", cause=e)
+        if header.get("alg") != "RS256":
+            raise auth.InvalidIdTokenError('ID token has incorrect "alg" header, expected "RS256".')
+
+        key = self.store.get_key(header.get("kid"))
+        if key is None:
+            raise auth.InvalidIdTokenError('ID token has a "kid" header that does not match a known key.')
+
+        try:
+            claims = jwt.decode(
+                token,
+                key,
+                algorithms=["RS256"],
+                audience=self.project_id,
+                issuer=ISSUER_PREFIX + self.project_id,
+                leeway=self.clock_skew,
+                options={"require": ["exp", "iat", "aud", "iss", "sub"]},
+            )
+        except jwt.ExpiredSignatureError as e:
+            raise auth.ExpiredIdTokenError("Token expired", e)
+        except jwt.PyJWTError as e:
+            raise auth.InvalidIdTokenError(f"Invalid ID token: {e}", cause=e)
+
+        subject = claims.get("sub")
+        if not isinstance(subject, str) or not subject or len(subject) > 128:
+            raise auth.InvalidIdTokenError('ID token has an invalid "sub" claim.')
+        if claims.get("auth_time", 0) > time.time() + self.clock_skew:
+            raise auth.InvalidIdTokenError('ID token has an "auth_time" in the future.')
+        claims["uid"] = subject
+        return claims
+
+
+certificate_store = CertificateStore()
+
+_verifier = None
+
+
+def local_verification_enabled():
+    return getattr(settings, "FIREBASE_LOCAL_VERIFICATION", False)
+
+
+def preload_certificates():
+    """
+    Warms the signing keys at boot. Called from the WSGI and ASGI entry
+    points only, so management commands such as migrate never fetch.
+    """
+    if local_verification_enabled():
+        certificate_store.preload()
+
+
+def get_verifier():
+    """
+    Returns the process-wide verifier for the initialized Firebase app.
+    """
+    global _verifier
+    if _verifier is None:
+        project_id = getattr(settings, "FIREBASE_PROJECT_ID", None) or firebase_admin.get_app().project_id
+        _verifier = LocalTokenVerifier(project_id, certificate_store)
+    return _verifier
+
+
+def check_revoked_remotely(claims):
+    """
+    Same revocation check ``verify_id_token(check_revoked=True)`` runs
+    after its own signature check.
+    """
+    user = auth.get_user(claims["uid"])
+    if user.disabled:
+        raise auth.UserDisabledError("The user record is disabled.")
+    if claims.get("iat", 0) * 1000 < user.tokens_valid_after_timestamp:
+        raise auth.RevokedIdTokenError("The Firebase ID token has been revoked.")
@@ -1,15 +1,26 @@
+from django.conf import settings
 from django.urls import path
+from src.core.async_views import async_get
 from .views import ( 
     LoginView,
+    LogoutView,
     VerifyFirebaseTokenView,
     RoleView,
     get_user_profile,
-
+    get_user_profile_async,
+    role_async,
 )
 
+role = RoleView.as_view()
+profile_detail = get_user_profile
+if settings.ASYNC_VIEWS:
+    role = async_get(role_async, role)
+    profile_detail = async_get(get_user_profile_async, profile_detail)
+
 urlpatterns = [
     path('login/', LoginView.as_view(), name='login'), # Login
+    path('logout/', LogoutView.as_view(), name='logout'), # Revoke the user's sessions
     path('verify-token/', VerifyFirebaseTokenView.as_view(), name='verify-token'), # Token verification
-    path("role/", RoleView.as_view(), name="role"), # Role endpoint
-    path("profile/detail/", get_user_profile, name="get_user_profile"),
+    path("role/", role, name="role"), # Role endpoint
+    path("profile/detail/", profile_detail, name="get_user_profile"),
 ]
\ No newline at end of file
@@ -1,16 +1,53 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, permissions
-from firebase_admin import auth as firebase_auth
 from django.contrib.auth.models import User
 from rest_framework.permissions import AllowAny, IsAuthenticated
-from rest_framework.exceptions import AuthenticationFailed, NotFound
+from rest_framework.exceptions import AuthenticationFailed, NotFound, PermissionDenied
 from rest_framework.decorators import api_view, permission_classes
 from .serializers import LoginSerializer, FirebaseTokenSerializer
 from src.users.models import Profile
 import time
-from src.core.utils import validate_token
+from src.core.utils import aget_request_identity, get_request_identity
+from src.core.async_views import async_api_view
+from src.core.conditional import aprofile_etag, finish_conditional, not_modified, profile_etag
+from firebase.revocation import revoke_refresh_tokens
+from firebase.token_cache import verify_id_token
+from src.users.email_sync import firebase_claims
 from django.http import JsonResponse
+import logging
+
+logger = logging.getLogger(__name__)
+
+def identity_error(exc):
+    logger.info("Firebase token rejected: %s", exc.detail)
+    return JsonResponse({"error": str(exc.detail)}, status=403)
+
+def profile_not_found(identity):
+    logger.info("No profile found for UID %s", identity.uid)
+    return JsonResponse({"error": "User profile not found"}, status=404)
+
+def profile_detail_response(identity):
+    """
+    Body of get_user_profile and its async variant.
+    """
+    profile = identity.profile
+    if profile is None:
+        return profile_not_found(identity)
+    return JsonResponse({
+        "first_name": profile.first_name,
+        "last_name": profile.last_name,
+        "email": profile.email,
+        "phone_number": profile.phone_number,
+        "role": profile.role,
+        "profile_completed": profile.profile_completed
+    })
+
+def role_response(request, profile, etag):
+    """
+    Body of RoleView and its async variant.
+    """
+    return not_modified(request, etag) or finish_conditional(JsonResponse({"role": profile.role}), etag)
 
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
@@ -18,63 +55,44 @@ def get_user_profile(request):
     """
     Returns the profile of the authenticated user.
     """
-    auth_header = request.headers.get("Authorization")
-    print(f"Authorization Header: {auth_header}")  # Debugging
-    
-    if not auth_header or not auth_header.startswith("Bearer "):
-        print("Missing or invalid Authorization header")
-        return JsonResponse({"error": "Missing or invalid Authorization header"}, status=403)
-
-    token = auth_header.split("Bearer ")[1]
-    print(f"Received Firebase Token: {token}")  # Debugging
+    try:
+        identity = get_request_identity(request)
+    except PermissionDenied as e:
+        return identity_error(e)
+    return profile_detail_response(identity)
 
+@async_api_view(permission_classes=[IsAuthenticated])
+async def get_user_profile_async(request):
+    """
+    Async variant of get_user_profile.
+    """
     try:
-        decoded_token = firebase_auth.verify_id_token(token)
-        uid = decoded_token["uid"]
-        print(f"Firebase UID: {uid}")
-
-        # Fetch user profile
-        profile = Profile.objects.get(firebase_uid=uid)
-        print(f"Profile found for UID: {uid}")
-
-        return JsonResponse({
-            "first_name": profile.first_name,
-            "last_name": profile.last_name,
-            "email": profile.email,
-            "phone_number": profile.phone_number,
-            "role": profile.role,
-            "profile_completed": profile.profile_completed
-        })
-    except Profile.DoesNotExist:
-        print(f"No profile found for UID: {uid}")
-        return JsonResponse({"error": "User profile not found"}, status=404)
-    except Exception as e:
-        print(f"Error verifying Firebase token: {e}")
-        return JsonResponse({"error": "Invalid Firebase token"}, status=403)
+        identity = await aget_request_identity(request)
+    except PermissionDenied as e:
+        return identity_error(e)
+    return profile_detail_response(identity)
 
 class LoginView(APIView):
     """
     API view to validate Firebase token, create Django User and Profile if needed, and return user details.
+    This is the only place accounts are created, so it verifies the token itself
+    instead of going through the authentication classes, which reject unknown UIDs.
     """
+    authentication_classes = []
     permission_classes = [AllowAny]
 
     def post(self, request, *args, **kwargs):
-        # Log the incoming request headers
-        print("Request Headers:", request.headers)
-
         # Extract the token from the Authorization header
         auth_header = request.headers.get('Authorization')
         if not auth_header or not auth_header.startswith("Bearer "):
-            print("Authorization header missing or invalid.")
+            logger.info("Login rejected: Authorization header missing or invalid")
             raise AuthenticationFailed("Authorization header missing or invalid.")
         
         token = auth_header.split(" ")[1]  # Extract the token
-        print("Firebase Token:", token)
 
         try:
             # Verify the Firebase token
-            decoded_token = firebase_auth.verify_id_token(token) 
-            print("Decoded Token:", decoded_token)  # **Debug: Print decoded token**
+            decoded_token = verify_id_token(token) 
 
             # Allowing a clock skew of 60 seconds during token verification
             current_time = time.time()
@@ -90,21 +108,19 @@ class LoginView(APIView):
             if not email:
                 raise AuthenticationFailed("Email not found in Firebase token.")
 
-            print("UID:", user_id, "Email:", email)  # Debug: Print UID and email
-            
             # Check if the user already exists
-            user, created = User.objects.get_or_create(
-                username=user_id,
-                defaults={'email': email}
-            )
-            print(f"User {'created' if created else 'exists'}: {user.username}")
+            with firebase_claims(decoded_token):
+                user, created = User.objects.get_or_create(
+                    username=user_id,
+                    defaults={'email': email}
+                )
+            logger.debug("Login for UID %s (user %s)", user_id, "created" if created else "exists")
             
             # Create a profile if it doesn't exist
             profile, profile_created = Profile.objects.get_or_create(
                 user=user,
                 defaults={'role': 'client'}
             )
-            print(f"Profile {'created' if profile_created else 'exists'}: {profile.role}")
             
             # Return success response
             return Response({
@@ -115,9 +131,25 @@ class LoginView(APIView):
             })
 
         except Exception as e:
-            print("Error during authentication:", str(e))  # Debug: Print errors
+            logger.info("Login failed: %s", e)
             raise AuthenticationFailed(f"Firebase Authentication failed: {str(e)}")
         
+class LogoutView(APIView):
+    """
+    Signs the authenticated user out of every device by revoking their
+    Firebase refresh tokens. ID tokens already issued are rejected from
+    the next request on.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        try:
+            identity = get_request_identity(request)
+        except PermissionDenied as e:
+            return identity_error(e)
+        revoke_refresh_tokens(identity.uid)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
 class VerifyFirebaseTokenView(APIView):
     """
     View to verify the Firebase token.
@@ -132,7 +164,7 @@ class VerifyFirebaseTokenView(APIView):
         token = serializer.validated_data.get("token")
 
         try:
-            decoded_token = firebase_auth.verify_id_token(token)
+            decoded_token = verify_id_token(token)
             firebase_uid = decoded_token.get("uid")
 
             # Check if the user exists in the Django database
@@ -149,32 +181,29 @@ class VerifyFirebaseTokenView(APIView):
         
 class RoleView(APIView):
     """
-    View to retrieve the role of the authenticated user.
+    View to retrieve the role of the authenticated user. Answers 304 to a
+    matching If-None-Match.
     """
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
-        auth_header = request.headers.get("Authorization")
-
-        if not auth_header or not auth_header.startswith("Bearer "):
-            return Response({"error": "Missing or invalid Authorization header"}, status=403)
-
-        token = auth_header.split("Bearer ")[1]
-        print(f"Received Firebase Token: {token}")  # Debugging
-
         try:
-            decoded_token = firebase_auth.verify_id_token(token)
-            uid = decoded_token["uid"]
-            print(f"Firebase UID: {uid}")
-
-            # Fetch user profile from database
-            try:
-                profile = Profile.objects.get(firebase_uid=uid)
-                return Response({"role": profile.role})
-            except Profile.DoesNotExist:
-                print("No profile found for this Firebase UID.")
-                return Response({"error": "User profile not found"}, status=404)
-
-        except Exception as e:
-            print(f"Error verifying Firebase token: {e}")
-            return Response({"error": "Invalid Firebase token"}, status=403)
+            identity = get_request_identity(request)
+        except PermissionDenied as e:
+            return identity_error(e)
+        if identity.profile is None:
+            return profile_not_found(identity)
+        return role_response(request, identity.profile, profile_etag(request, identity.profile))
+
+@async_api_view(permission_classes=[permissions.IsAuthenticated])
+async def role_async(request):
+    """
+    Async variant of RoleView.
+    """
+    try:
+        identity = await aget_request_identity(request)
+    except PermissionDenied as e:
+        return identity_error(e)
+    if identity.profile is None:
+        return profile_not_found(identity)
+    return role_response(request, identity.profile, await aprofile_etag(request, identity.profile))
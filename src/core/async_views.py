@@ -0,0 +1,93 @@
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import APIException, AuthenticationFailed, NotAuthenticated, PermissionDenied
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+
+def api_error(exc):
+    """
+    Renders a DRF exception the way DRF's exception handler would.
+    """
+    data = exc.detail if isinstance(exc.detail, (list, dict)) else {"detail": exc.detail}
+    status = exc.status_code
+    if isinstance(exc, (NotAuthenticated, AuthenticationFailed)):
+        # DRF answers 403 when the first authentication class sends no
+        # WWW-Authenticate header, which is the case for this API
+        status = 403
+    return JsonResponse(data, status=status, safe=False)
+
+
+async def authenticate(request):
+    """
+    Runs the request's authenticators like DRF's Request does on first
+    access to ``request.user``. Authenticators with an ``aauthenticate``
+    coroutine run on the event loop, others in a thread.
+    """
+    for authenticator in request.authenticators:
+        if hasattr(authenticator, "aauthenticate"):
+            user_auth = await authenticator.aauthenticate(request)
+        else:
+            user_auth = await sync_to_async(authenticator.authenticate)(request)
+        if user_auth is not None:
+            request._authenticator = authenticator
+            request.user, request.auth = user_auth
+            return
+    request._not_authenticated()
+
+
+def check_permissions(request, permissions):
+    """
+    Same checks, and errors, as APIView.check_permissions.
+    """
+    for permission in permissions:
+        if not permission.has_permission(request, None):
+            if request.authenticators and not request.successful_authenticator:
+                raise NotAuthenticated()
+            raise PermissionDenied(getattr(permission, "message", None))
+
+
+def async_api_view(handler=None, *, permission_classes=None):
+    """
+    Wraps an async view the way @api_view wraps a sync one: the handler
+    receives a DRF Request authenticated by DEFAULT_AUTHENTICATION_CLASSES
+    and checked against ``permission_classes`` (default
+    DEFAULT_PERMISSION_CLASSES), and DRF exceptions become JSON error
+    responses. Async and sync views therefore accept the same callers.
+    """
+    def decorate(handler):
+        @wraps(handler)
+        async def view(request, *args, **kwargs):
+            try:
+                request = Request(request, authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES])
+                await authenticate(request)
+                check_permissions(
+                    request,
+                    [permission() for permission in permission_classes or api_settings.DEFAULT_PERMISSION_CLASSES],
+                )
+                return await handler(request, *args, **kwargs)
+            except APIException as exc:
+                return api_error(exc)
+
+        return view
+
+    return decorate(handler) if handler is not None else decorate
+
+
+def async_get(async_view, sync_view):
+    """
+    Serves GET with ``async_view`` and every other method with the
+    synchronous ``sync_view``, so one URL can be async on its hot read path
+    while writes keep using the DRF view.
+    """
+    run_sync_view = sync_to_async(sync_view)
+
+    async def view(request, *args, **kwargs):
+        if request.method == "GET":
+            return await async_view(request, *args, **kwargs)
+        return await run_sync_view(request, *args, **kwargs)
+
+    return csrf_exempt(view)
@@ -0,0 +1,125 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.cache import get_conditional_response, patch_vary_headers
+
+# Version counter scopes. A counter changes whenever data rendered by the
+# endpoints that read it changes, so an ETag built from counters can be
+# checked without loading any rows.
+APPOINTMENTS_OF_USER = "appointments:user"  # Appointments a client booked
+APPOINTMENTS_OF_STAFF = "appointments:staff"  # Appointments assigned to a staff member
+ALL_APPOINTMENTS = "appointments:all"  # Every appointment (admin lists); key 0
+PROFILE = "profile"  # A user's profile, including their role
+
+
+def _cache():
+    return caches[getattr(settings, "VERSION_CACHE_ALIAS", "default")]
+
+
+def _timeout():
+    return getattr(settings, "VERSION_CACHE_TIMEOUT", 86400)
+
+
+def _key(scope, key):
+    return f"version:{scope}:{key}"
+
+
+def _seed():
+    # Counters start from the clock, so one that was evicted and re-created
+    # never repeats a value an earlier ETag was built from
+    return time.time_ns()
+
+
+def get_versions(counters):
+    """
+    Current values of ``(scope, key)`` counters, in order, creating missing
+    ones. One cache round trip when all exist.
+    """
+    cache = _cache()
+    keys = [_key(scope, key) for scope, key in counters]
+    found = cache.get_many(keys)
+    for missing in set(keys) - set(found):
+        cache.add(missing, _seed(), _timeout())
+        found[missing] = cache.get(missing)
+    return [found[key] for key in keys]
+
+
+async def aget_versions(counters):
+    """
+    Async variant of get_versions.
+    """
+    cache = _cache()
+    keys = [_key(scope, key) for scope, key in counters]
+    found = await cache.aget_many(keys)
+    for missing in set(keys) - set(found):
+        await cache.aadd(missing, _seed(), _timeout())
+        found[missing] = await cache.aget(missing)
+    return [found[key] for key in keys]
+
+
+def _bump(keys):
+    cache = _cache()
+    for key in keys:
+        try:
+            cache.incr(key)
+        except ValueError:  # Not cached (yet, or any more)
+            cache.set(key, _seed(), _timeout())
+
+
+def bump_versions(counters):
+    """
+    Advances ``(scope, key)`` counters now and again once the surrounding
+    transaction commits, so a reader between the two cannot pair the new
+    version with the pre-commit rows.
+    """
+    keys = {_key(scope, key) for scope, key in counters if key is not None}
+    if not keys:
+        return
+    _bump(keys)
+    transaction.on_commit(lambda: _bump(keys))
+
+
+def make_etag(request, *parts):
+    """
+    Weak ETag over the parts that determine a response (version values, the
+    user, the role), the query string and the rendered format.
+    """
+    renderer = getattr(request, "accepted_renderer", None)
+    parts += (request.get_full_path(), renderer.format if renderer is not None else "json")
+    digest = hashlib.blake2b("|".join(map(str, parts)).encode(), digest_size=12).hexdigest()
+    return f'W/"{digest}"'
+
+
+def profile_etag(request, profile):
+    """
+    ETag of a response rendered from ``profile`` alone.
+    """
+    (version,) = get_versions([(PROFILE, profile.user_id)])
+    return make_etag(request, PROFILE, profile.user_id, version)
+
+
+async def aprofile_etag(request, profile):
+    (version,) = await aget_versions([(PROFILE, profile.user_id)])
+    return make_etag(request, PROFILE, profile.user_id, version)
+
+
+def not_modified(request, etag):
+    """
+    The 304 response when the request's If-None-Match matches ``etag``,
+    else None.
+    """
+    response = get_conditional_response(request, etag=etag)
+    return finish_conditional(response, etag) if response is not None else None
+
+
+def finish_conditional(response, etag):
+    """
+    Sets the ETag and the headers that make clients revalidate it per user.
+    """
+    response["ETag"] = etag
+    response["Cache-Control"] = "private, no-cache"
+    patch_vary_headers(response, ("Authorization",))
+    return response
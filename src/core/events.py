@@ -0,0 +1,256 @@
+import asyncio
+import json
+import logging
+import threading
+from collections import Counter, defaultdict
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+# Queued in place of events a subscriber fell too far behind to receive;
+# the stream tells the client to resynchronise and closes
+RESYNC = object()
+
+
+class TooManySubscriptions(Exception):
+    pass
+
+
+class Subscription:
+    """
+    One listener's bounded queue of events from its channels, read on the
+    event loop it subscribed from.
+    """
+
+    def __init__(self, hub, user_id, channels, maxsize, loop):
+        self.hub = hub
+        self.user_id = user_id
+        self.channels = channels
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize)
+        self.overflowed = False
+
+    def put(self, event):
+        # Runs on self.loop
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Rather than block publishers or grow without bound, drop the
+            # backlog; the client refetches what it missed
+            self.overflowed = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC)
+
+    async def get(self, timeout=None):
+        """
+        The next event, or RESYNC; TimeoutError after ``timeout`` seconds
+        without one.
+        """
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+    def close(self):
+        self.hub.unsubscribe(self)
+
+
+class Hub:
+    """
+    In-process publish/subscribe. Publishing goes through ``backend``,
+    which delivers the event back to the dispatch() of every process's hub
+    (LocalBackend: this one only). Publishers may be on any thread;
+    subscribers are asyncio tasks.
+    """
+
+    def __init__(self, backend_class=None, queue_size=100, max_per_user=3):
+        self.queue_size = queue_size
+        self.max_per_user = max_per_user
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+        self._per_user = Counter()
+        self.backend = (backend_class or LocalBackend)(self)
+
+    def subscribe(self, user_id, channels):
+        """
+        Subscribes the running event loop to ``channels``. Raises
+        TooManySubscriptions when ``user_id`` already holds the maximum.
+        """
+        subscription = Subscription(self, user_id, tuple(channels), self.queue_size, asyncio.get_running_loop())
+        with self._lock:
+            if self._per_user[user_id] >= self.max_per_user:
+                raise TooManySubscriptions(user_id)
+            self._per_user[user_id] += 1
+            for channel in subscription.channels:
+                self._subscribers[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            removed = False
+            for channel in subscription.channels:
+                subscribers = self._subscribers.get(channel)
+                if subscribers and subscription in subscribers:
+                    subscribers.discard(subscription)
+                    removed = True
+                    if not subscribers:
+                        del self._subscribers[channel]
+            if removed:
+                self._per_user[subscription.user_id] -= 1
+                if self._per_user[subscription.user_id] <= 0:
+                    del self._per_user[subscription.user_id]
+
+    def subscriber_count(self):
+        with self._lock:
+            return sum(self._per_user.values())
+
+    def publish(self, channel, event):
+        self.backend.publish(channel, event)
+
+    def dispatch(self, channel, event):
+        """
+        Hands ``event`` to this process's subscribers of ``channel``.
+        """
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.put, event)
+            except RuntimeError:  # The subscriber's loop has closed
+                self.unsubscribe(subscription)
+
+    def close(self):
+        self.backend.close()
+
+
+class LocalBackend:
+    """
+    Delivers events to the publishing process's subscribers only. Enough
+    for a single ASGI process.
+    """
+
+    def __init__(self, hub):
+        self.hub = hub
+
+    def publish(self, channel, event):
+        self.hub.dispatch(channel, event)
+
+    def close(self):
+        pass
+
+
+class RedisBackend:
+    """
+    Fans events out to every process through Redis pub/sub
+    (EVENTS_REDIS_URL). Needs the redis package.
+    """
+
+    prefix = "events:"
+
+    def __init__(self, hub):
+        try:
+            import redis
+        except ImportError:
+            raise ImproperlyConfigured("src.core.events.RedisBackend requires the redis package.")
+        self.hub = hub
+        self.client = redis.Redis.from_url(settings.EVENTS_REDIS_URL)
+        self.pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        self.pubsub.psubscribe(**{f"{self.prefix}*": self.on_message})
+        self.thread = self.pubsub.run_in_thread(sleep_time=1.0, daemon=True)
+
+    def publish(self, channel, event):
+        try:
+            self.client.publish(self.prefix + channel, json.dumps(event))
+        except Exception:
+            # Events are notifications; a missed one is caught up on resync
+            logger.exception("Could not publish event to %s", channel)
+
+    def on_message(self, message):
+        channel = message["channel"].decode()[len(self.prefix):]
+        self.hub.dispatch(channel, json.loads(message["data"]))
+
+    def close(self):
+        self.thread.stop()
+        self.pubsub.close()
+
+
+@lru_cache(maxsize=None)
+def _load_hub(backend_path):
+    return Hub(
+        import_string(backend_path),
+        queue_size=settings.EVENTS_QUEUE_SIZE,
+        max_per_user=settings.EVENTS_MAX_CONNECTIONS_PER_USER,
+    )
+
+
+def get_hub():
+    return _load_hub(settings.EVENTS_BACKEND)
+
+
+def publish_on_commit(messages):
+    """
+    Publishes ``(channel, event)`` pairs once the surrounding transaction
+    commits, so subscribers never hear of rows they cannot read yet.
+    """
+    messages = list(messages)
+    if messages:
+        transaction.on_commit(lambda: _publish(messages))
+
+
+def _publish(messages):
+    hub = get_hub()
+    for channel, event in messages:
+        hub.publish(channel, event)
+
+
+class EventStream:
+    """
+    Server-Sent Events body for a StreamingHttpResponse: the
+    subscription's events, a comment line every ``heartbeat`` seconds to
+    keep idle proxies from closing the connection, and an end after
+    ``max_age`` seconds so clients reconnect (re-authenticating) with a
+    fresh token. Unsubscribes when the response closes.
+    """
+
+    def __init__(self, subscription, heartbeat=15, max_age=None, retry=5):
+        self.subscription = subscription
+        self.heartbeat = heartbeat
+        self.max_age = max_age
+        self.retry = retry
+
+    def __aiter__(self):
+        return self.events()
+
+    async def events(self):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_age if self.max_age else None
+        try:
+            yield f"retry: {self.retry * 1000}\n\n"
+            while deadline is None or loop.time() < deadline:
+                timeout = self.heartbeat if deadline is None else min(self.heartbeat, deadline - loop.time())
+                try:
+                    event = await self.subscription.get(timeout)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if event is RESYNC:
+                    yield format_event("resync", {})
+                    return
+                yield format_event(event["type"], event)
+        finally:
+            self.close()
+
+    def close(self):
+        self.subscription.close()
+
+
+def format_event(name, data):
+    """
+    One Server-Sent Events message.
+    """
+    return f"event: {name}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
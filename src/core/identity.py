@@ -0,0 +1,61 @@
+from src.users.cache import get_profile_by_user_id
+
+# Firebase users get a Django account only through LoginView
+NOT_REGISTERED_MESSAGE = "No account for this Firebase user; sign in through /api/auth/login/ first."
+
+
+class FirebaseIdentity:
+    """
+    Verified Firebase identity for a single request.
+
+    Built once by FirebaseAuthentication and exposed as ``request.auth``, so
+    views, permissions and helpers can read the decoded claims, the Django
+    user and the profile without verifying the token or querying again.
+    """
+
+    def __init__(self, claims, user, profile=None):
+        self.claims = claims
+        self.user = user
+        self.profile = profile
+
+    @property
+    def uid(self):
+        return self.claims.get("uid")
+
+    @property
+    def email(self):
+        return self.claims.get("email")
+
+    @property
+    def role(self):
+        return self.profile.role if self.profile else None
+
+    def __repr__(self):
+        return f"<FirebaseIdentity uid={self.uid} role={self.role}>"
+
+
+def get_identity(request):
+    """
+    Returns the identity already attached to the request, or None.
+    Never verifies a token.
+    """
+    identity = getattr(request, "_firebase_identity", None)
+    if identity is not None:
+        return identity
+    auth = getattr(request, "auth", None)
+    if isinstance(auth, FirebaseIdentity):
+        return auth
+    return None
+
+
+def get_request_profile(request):
+    """
+    Returns the profile of the authenticated user, preferring the identity
+    built during authentication and falling back to the profile cache.
+    """
+    identity = get_identity(request)
+    if identity is not None:
+        return identity.profile
+    if not request.user.is_authenticated:
+        return None
+    return get_profile_by_user_id(request.user.pk)
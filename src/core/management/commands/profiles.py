@@ -0,0 +1,48 @@
+import pstats
+from io import StringIO
+
+from django.core.management.base import BaseCommand, CommandError
+
+from src.core.profiling import get_profile_store, make_profile_token, path_slug
+
+SORT_KEYS = ("cumulative", "tottime", "calls", "ncalls", "time")
+
+
+class Command(BaseCommand):
+    help = "Summarises request profiles captured by ProfilingMiddleware (see src/middleware/profiling.py)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--path", default="", help="Only profiles whose request path contains this text.")
+        parser.add_argument("--last", type=int, default=0, help="Only the N most recent matching profiles.")
+        parser.add_argument("--sort", choices=SORT_KEYS, default="cumulative", help="Sort order of the summary.")
+        parser.add_argument("--limit", type=int, default=30, help="Functions to show.")
+        parser.add_argument("--list", action="store_true", help="List the stored profiles instead.")
+        parser.add_argument("--token", action="store_true", help="Print a signed X-Profile header value.")
+
+    def handle(self, *args, **options):
+        if options["token"]:
+            try:
+                self.stdout.write(make_profile_token())
+            except ValueError as e:
+                raise CommandError(str(e))
+            return
+
+        store = get_profile_store()
+        needle = path_slug(options["path"])
+        paths = [path for path in store.paths() if needle in path.name.split("_", 2)[2]]
+        if options["last"]:
+            paths = paths[-options["last"]:]
+        if not paths:
+            raise CommandError(f"No profiles found in {store.directory}.")
+
+        if options["list"]:
+            for path in paths:
+                self.stdout.write(path.name)
+            return
+
+        self.stdout.write(f"{len(paths)} profile(s) from {store.directory}")
+        # pstats writes in fragments; self.stdout would end each one with a newline
+        report = StringIO()
+        stats = pstats.Stats(*map(str, paths), stream=report)
+        stats.strip_dirs().sort_stats(options["sort"]).print_stats(options["limit"])
+        self.stdout.write(report.getvalue())
@@ -0,0 +1,235 @@
+import hmac
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+
+from django.conf import settings
+from django.http import Http404, HttpResponse, HttpResponseForbidden
+from rest_framework import serializers
+
+# Timings of the request being handled, set by MetricsMiddleware. Copied into
+# sync_to_async threads with the rest of the context.
+_request_timings = ContextVar("request_timings", default=None)
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)  # Seconds
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+# Label values past this many series per metric are folded into one
+OVERFLOW_LABEL = "<other>"
+
+
+class RequestTimings:
+    """
+    Time spent per component (``db``, ``firebase``, ``serializer``) while
+    handling one request, plus its number of database queries.
+    """
+    __slots__ = ("durations", "queries")
+
+    def __init__(self):
+        self.durations = defaultdict(float)
+        self.queries = 0
+
+    def add(self, name, seconds):
+        self.durations[name] += seconds
+
+
+def current_timings():
+    return _request_timings.get()
+
+
+@contextmanager
+def collect_timings():
+    """
+    Collects the timings of everything run inside the block, including
+    work handed to sync_to_async threads.
+    """
+    timings = RequestTimings()
+    token = _request_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _request_timings.reset(token)
+
+
+@contextmanager
+def timed(name):
+    """
+    Adds the time spent in the block to the current request's ``name``
+    component. Outside a request it only costs a context variable lookup.
+    """
+    timings = _request_timings.get()
+    if timings is None:
+        yield
+        return
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, perf_counter() - start)
+
+
+def instrument_queries(execute, sql, params, many, context):
+    """
+    Database execute wrapper counting the current request's queries and
+    the time spent in them.
+    """
+    timings = _request_timings.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    start = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.queries += 1
+        timings.add("db", perf_counter() - start)
+
+
+class Histogram:
+    """
+    Prometheus-style histogram with fixed bucket bounds, kept in memory.
+    Each observation is a bisect and two increments under a lock, and the
+    number of label combinations is capped at ``max_series``.
+    """
+
+    def __init__(self, name, help_text, labelnames, buckets, max_series=1000):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self.max_series = max_series
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                if len(self._series) >= self.max_series:
+                    labels = (OVERFLOW_LABEL,) * len(self.labelnames)
+                series = self._series.setdefault(labels, [[0] * (len(self.buckets) + 1), 0.0])
+            series[0][index] += 1
+            series[1] += value
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = [(labels, list(counts), total) for labels, (counts, total) in self._series.items()]
+        for labels, counts, total in sorted(series):
+            base = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, labels))
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{base},le="{bound}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{base}}} {total}")
+            lines.append(f"{self.name}_count{{{base}}} {cumulative}")
+        return "\n".join(lines)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.histograms = {}
+
+    def histogram(self, name, help_text, labelnames, buckets):
+        if name not in self.histograms:
+            self.histograms[name] = Histogram(name, help_text, labelnames, buckets)
+        return self.histograms[name]
+
+    def clear(self):
+        for histogram in self.histograms.values():
+            histogram.clear()
+
+    def render(self):
+        return "\n".join(h.render() for h in self.histograms.values()) + "\n"
+
+
+registry = MetricsRegistry()
+
+request_duration = registry.histogram(
+    "http_request_duration_seconds", "Wall time per request.", ("view", "method", "status"), DURATION_BUCKETS
+)
+request_queries = registry.histogram(
+    "http_request_db_queries", "Database queries per request.", ("view", "method"), QUERY_COUNT_BUCKETS
+)
+component_duration = {
+    name: registry.histogram(
+        f"http_request_{name}_seconds", f"Time per request spent in {description}.", ("view", "method"), DURATION_BUCKETS
+    )
+    for name, description in (
+        ("db", "database queries"),
+        ("firebase", "Firebase Admin calls"),
+        ("serializer", "serializers"),
+    )
+}
+
+
+def observe_request(view, method, status, seconds, timings):
+    request_duration.observe((view, method, str(status)), seconds)
+    request_queries.observe((view, method), timings.queries)
+    for name, histogram in component_duration.items():
+        histogram.observe((view, method), timings.durations.get(name, 0.0))
+
+
+def server_timing(seconds, timings):
+    """
+    ``Server-Timing`` header value for a request, durations in milliseconds.
+    """
+    entries = [f"total;dur={seconds * 1000:.1f}"]
+    if timings.queries:
+        entries.append(f'db;dur={timings.durations["db"] * 1000:.1f};desc="{timings.queries} queries"')
+    for name in ("firebase", "serializer"):
+        if name in timings.durations:
+            entries.append(f"{name};dur={timings.durations[name] * 1000:.1f}")
+    return ", ".join(entries)
+
+
+def metrics_view(request):
+    """
+    Prometheus text exposition of this process's request metrics, for
+    scrapers sending METRICS_TOKEN as a bearer token. Not found while no
+    token is configured.
+    """
+    token = getattr(settings, "METRICS_TOKEN", "")
+    if not token:
+        raise Http404
+    if not hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}"):
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+class TimedListSerializer(serializers.ListSerializer):
+    @property
+    def data(self):
+        with timed("serializer"):
+            return super().data
+
+    def is_valid(self, *args, **kwargs):
+        with timed("serializer"):
+            return super().is_valid(*args, **kwargs)
+
+
+class TimedSerializerMixin:
+    """
+    Records ``data`` and ``is_valid`` as serializer time. For ``many=True``
+    set ``list_serializer_class = TimedListSerializer`` on the Meta.
+    """
+
+    @property
+    def data(self):
+        with timed("serializer"):
+            return super().data
+
+    def is_valid(self, *args, **kwargs):
+        with timed("serializer"):
+            return super().is_valid(*args, **kwargs)
@@ -0,0 +1,158 @@
+import base64
+import json
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def keyset_filter(fields, values, descending=False):
+    """
+    Lexicographic "strictly after ``values``" predicate over ``fields``,
+    with a leading range on the first field so an index on it is used.
+    """
+    op = "lt" if descending else "gt"
+    bound = Q(**{f"{fields[0]}__{op}e": values[0]})
+    after = Q()
+    for i, name in enumerate(fields):
+        term = Q(**{f"{name}__{op}": values[i]})
+        for prior, value in zip(fields[:i], values[:i]):
+            term &= Q(**{prior: value})
+        after |= term
+    return bound & after
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination over a composite keyset.
+
+    Rows are ordered by ``ordering`` (non-nullable fields ending in a
+    unique one, all ascending or all descending) and each page is fetched
+    with a ``WHERE (a, b, c) > (x, y, z)`` style predicate instead of
+    OFFSET, so deep pages cost the same as the first. Cursors are opaque
+    base64 tokens holding the boundary row's key.
+    """
+
+    ordering = ("id",)
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    invalid_cursor_message = "Invalid cursor"
+
+    def get_page_size(self, request):
+        page_size = getattr(settings, "API_PAGE_SIZE", 50)
+        max_page_size = getattr(settings, "API_MAX_PAGE_SIZE", 200)
+        try:
+            requested = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return page_size
+        return min(max(requested, 1), max_page_size)
+
+    def get_ordering(self, request, queryset, view):
+        if hasattr(view, "get_keyset_ordering"):
+            return view.get_keyset_ordering()
+        return getattr(view, "keyset_ordering", self.ordering)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        page = self.get_page_queryset(queryset, request, view)
+        return self.set_page(list(page))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """
+        paginate_queryset for async views; fetches the page with the async ORM.
+        """
+        page = self.get_page_queryset(queryset, request, view)
+        return self.set_page([row async for row in page])
+
+    def get_page_queryset(self, queryset, request, view=None):
+        """
+        Returns the (unevaluated) query for the requested page plus one row.
+        """
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        ordering = self.get_ordering(request, queryset, view)
+        self.fields = [field.lstrip("-") for field in ordering]
+        self.descending = ordering[0].startswith("-")
+        self.model_fields = [queryset.model._meta.get_field(name) for name in self.fields]
+
+        self.cursor = self.decode_cursor(request)
+        self.reverse = bool(self.cursor and self.cursor["reverse"])
+        # Walking backwards flips the sort and the comparison
+        descending = self.descending != self.reverse
+        prefix = "-" if descending else ""
+        queryset = queryset.order_by(*(prefix + name for name in self.fields))
+        if self.cursor:
+            queryset = queryset.filter(self.keyset_filter(self.cursor["values"], descending))
+        return queryset[: self.page_size + 1]
+
+    def set_page(self, rows):
+        has_more = len(rows) > self.page_size
+        rows = rows[: self.page_size]
+        if self.reverse:
+            rows.reverse()
+
+        self.has_next = has_more if not self.reverse else True
+        self.has_previous = has_more if self.reverse else self.cursor is not None
+        self.first_row = rows[0] if rows else None
+        self.last_row = rows[-1] if rows else None
+        return rows
+
+    def keyset_filter(self, values, descending):
+        return keyset_filter(self.fields, values, descending)
+
+    def encode_cursor(self, row, reverse):
+        values = [field.value_to_string(row) for field in self.model_fields]
+        payload = json.dumps({"v": values, "r": reverse}, separators=(",", ":"))
+        return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+    def decode_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(token.encode("ascii")))
+            values = [
+                field.to_python(value) for field, value in zip(self.model_fields, payload["v"], strict=True)
+            ]
+            return {"values": values, "reverse": bool(payload.get("r"))}
+        except (TypeError, ValueError, KeyError, UnicodeEncodeError, DjangoValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_next_link(self):
+        if not self.has_next or self.last_row is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.last_row, False))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        url = self.request.build_absolute_uri()
+        if self.first_row is None:
+            return remove_query_param(url, self.cursor_query_param)
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.first_row, True))
+
+    def get_paginated_data(self, data):
+        return OrderedDict([
+            ("next", self.get_next_link()),
+            ("previous", self.get_previous_link()),
+            ("results", data),
+        ])
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
@@ -1,18 +1,28 @@
 from rest_framework.permissions import BasePermission
 from rest_framework import permissions
 from src.core.utils import validate_token
+from src.core.identity import get_request_profile
+import logging
+
+logger = logging.getLogger(__name__)
+
+def _has_role(request, role):
+    if not request.user.is_authenticated:
+        return False
+    profile = get_request_profile(request)
+    return profile is not None and profile.role == role
 
 class IsAdminUser(BasePermission):
     def has_permission(self, request, view):
-        return request.user.is_authenticated and request.user.profile.role == 'admin'
+        return _has_role(request, 'admin')
 
 class IsStaffUser(BasePermission):
     def has_permission(self, request, view):
-        return request.user.is_authenticated and request.user.profile.role == 'staff'
+        return _has_role(request, 'staff')
 
 class IsClientUser(BasePermission):
     def has_permission(self, request, view):
-        return request.user.is_authenticated and request.user.profile.role == 'client'
+        return _has_role(request, 'client')
 
 # Custom permission to handle role-based access
 class IsAdminOrOwner(permissions.BasePermission):
@@ -25,19 +35,14 @@ class IsAdminOrOwner(permissions.BasePermission):
 
     def has_object_permission(self, request, view, obj):
         try:
-            print(f"Before Token Validation - Request User: {request.user}")  # Debug log
-
-            profile = validate_token(request)  # Validate the token and fetch the profile
+            profile = validate_token(request)  # Reads the identity built during authentication
             if not profile:
-                print("Profile not found for the request.")
+                logger.debug("No profile for the request; denying object access")
                 return False
             
 
             role = profile.role
-            print(f"Role in Permission Check: {role}")
-            print(f"After Token Validation - Request User: {request.user}")  # Debug log
-
-            print(f"Object User: {obj.user}, Request User: {request.user}")
+            logger.debug("Object permission check: role=%s user=%s", role, request.user.pk)
             if role == 'admin':
                 return True
             elif role == 'staff':
@@ -45,6 +50,6 @@ class IsAdminOrOwner(permissions.BasePermission):
             elif role == 'client':
                 return obj.user == request.user
             return False
-        except Exception as e:
-            print("Error in IsAdminOrOwner:", str(e))
+        except Exception:
+            logger.exception("Error in IsAdminOrOwner")
             return False
\ No newline at end of file
@@ -0,0 +1,85 @@
+import os
+import re
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core import signing
+
+# Request header that forces a profile of that request. Its value comes from
+# `python manage.py profiles --token` and is signed with PROFILING_SECRET.
+PROFILE_HEADER = "X-Profile"
+PROFILE_ID_HEADER = "X-Profile-Id"
+
+_SIGNING_SALT = "src.core.profiling"
+_TOKEN_VALUE = "profile"
+
+
+def _signer():
+    return signing.TimestampSigner(key=settings.PROFILING_SECRET, salt=_SIGNING_SALT)
+
+
+def make_profile_token():
+    if not settings.PROFILING_SECRET:
+        raise ValueError("PROFILING_SECRET is not set")
+    return _signer().sign(_TOKEN_VALUE)
+
+
+def is_valid_profile_token(value):
+    """
+    True for an unexpired token signed with PROFILING_SECRET.
+    """
+    if not settings.PROFILING_SECRET:
+        return False
+    try:
+        return _signer().unsign(value, max_age=settings.PROFILING_TOKEN_MAX_AGE) == _TOKEN_VALUE
+    except signing.BadSignature:
+        return False
+
+
+def path_slug(path):
+    return re.sub(r"[^A-Za-z0-9]+", "-", path).strip("-")[:80]
+
+
+class ProfileStore:
+    """
+    Bounded on-disk ring buffer of cProfile captures. Files are named
+    ``<time_ns>_<method>_<path>_<ms>ms.prof``, so name order is capture
+    order, and the oldest are deleted once there are more than
+    ``max_files``.
+    """
+
+    suffix = ".prof"
+
+    def __init__(self, directory, max_files=200):
+        self.directory = Path(directory)
+        self.max_files = max_files
+
+    def paths(self):
+        """
+        Stored profiles, oldest first.
+        """
+        if not self.directory.is_dir():
+            return []
+        return sorted(self.directory.glob(f"*{self.suffix}"))
+
+    def save(self, profiler, method, path, seconds):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        name = f"{time.time_ns()}_{method}_{path_slug(path) or 'root'}_{round(seconds * 1000)}ms{self.suffix}"
+        # Write under a name `paths()` ignores, so readers never see partial files
+        partial = self.directory / f".{name}.tmp"
+        profiler.dump_stats(partial)
+        os.replace(partial, self.directory / name)
+        self.prune()
+        return name
+
+    def prune(self):
+        for stale in self.paths()[: -self.max_files or None]:
+            try:
+                stale.unlink()
+            except FileNotFoundError:
+                pass  # Removed by another process
+
+
+def get_profile_store():
+    return ProfileStore(settings.PROFILING_DIR, settings.PROFILING_MAX_FILES)
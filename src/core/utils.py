@@ -1,22 +1,36 @@
 from rest_framework.exceptions import PermissionDenied
 from firebase_admin import auth as firebase_auth
-from src.users.models import Profile
-from django.core.exceptions import MultipleObjectsReturned
+from asgiref.sync import sync_to_async
+from firebase.token_cache import verify_id_token
+from src.users.cache import get_profile_by_uid
+from src.core.identity import FirebaseIdentity, get_identity
 from django.utils import timezone
 from datetime import datetime
 from rest_framework.exceptions import ValidationError
 from rest_framework import serializers
+import logging
+
+logger = logging.getLogger(__name__)
+
+def get_request_identity(request):
+    """
+    Returns the FirebaseIdentity for the request, verifying the token only
+    if authentication did not already attach one (e.g. session auth).
+    The result is cached on the request, so later calls are free.
+    """
+    identity = get_identity(request)
+    if identity is not None:
+        return identity
 
-def validate_token(request):
     # Ensure Authorization header exists
     auth_header = request.headers.get("Authorization")
     if not auth_header:
-        print("Authorization header is missing")
+        logger.debug("Authorization header is missing")
         raise PermissionDenied("Missing Authorization header")
 
     # Ensure header starts with "Bearer"
     if not auth_header.startswith("Bearer "):
-        print("Invalid Authorization header format")
+        logger.debug("Invalid Authorization header format")
         raise PermissionDenied("Invalid Authorization header format")
 
     # Extract token
@@ -24,37 +38,55 @@ def validate_token(request):
 
     # Validate token
     try:
-        decoded_token = firebase_auth.verify_id_token(token, check_revoked=True)
-        print("Decoded Token:", decoded_token)  # Debugging
-        firebase_uid = decoded_token.get("uid")
-        if not firebase_uid:
-            raise PermissionDenied("Firebase UID not found in token")
-
-        # Fetch user profile
-        try:
-            profile = Profile.objects.get(firebase_uid=firebase_uid)
-        except Profile.DoesNotExist:
-            print(f"No Profile found for UID: {firebase_uid}")
-            raise PermissionDenied(f"Profile not found for UID: {firebase_uid}")
-        except MultipleObjectsReturned:
-            print(f"Multiple profiles found for UID: {firebase_uid}")
-            raise PermissionDenied("Multiple profiles found for the same UID. Please contact support.")
-        
-        # Assign the corresponding user to the request
-        request.user = profile.user  # Set the authenticated user for the request
-        print(f"Request User Set Inside validate_token: {request.user}")  # Debugging
-
-        print(f"Validated Profile: {profile.user.username} - {profile.role}")  # Debugging
-        return profile
-    except firebase_auth.InvalidIdTokenError:
-        raise PermissionDenied("Invalid Firebase token")
+        decoded_token = verify_id_token(token, check_revoked=True)
     except firebase_auth.ExpiredIdTokenError:
         raise PermissionDenied("Expired Firebase token")
     except firebase_auth.RevokedIdTokenError:
         raise PermissionDenied("Revoked Firebase token")
-    except Exception as e:
-        print("Unexpected validation error:", str(e))
+    except firebase_auth.InvalidIdTokenError:
+        raise PermissionDenied("Invalid Firebase token")
+    except Exception:
+        logger.exception("Unexpected error during token validation")
         raise PermissionDenied("Unexpected error during token validation")
+
+    firebase_uid = decoded_token.get("uid")
+    if not firebase_uid:
+        raise PermissionDenied("Firebase UID not found in token")
+
+    profile = get_profile_by_uid(firebase_uid)
+    user = profile.user if profile else None
+    identity = FirebaseIdentity(decoded_token, user, profile)
+    request._firebase_identity = identity
+    return identity
+
+
+async def aget_request_identity(request):
+    """
+    Async variant of get_request_identity. async_api_view has already run
+    FirebaseAuthentication, so this only reaches the database or Firebase
+    for requests authenticated some other way (e.g. session auth).
+    """
+    identity = get_identity(request)
+    if identity is not None:
+        return identity
+    return await sync_to_async(get_request_identity)(request)
+
+
+def validate_token(request):
+    """
+    Returns the Profile of the request's verified Firebase identity and
+    sets ``request.user`` to its user.
+    """
+    identity = get_request_identity(request)
+    profile = identity.profile
+    if profile is None:
+        logger.info("No profile found for UID %s", identity.uid)
+        raise PermissionDenied(f"Profile not found for UID: {identity.uid}")
+
+    # Assign the corresponding user to the request
+    if request.user != profile.user:
+        request.user = profile.user  # Set the authenticated user for the request
+    return profile
     
 def parse_and_validate_date(date_str):
     """
@@ -1,14 +1,32 @@
 from django.contrib import admin
+from firebase.revocation import set_user_disabled
 from .models import Profile, Appointment
 
 @admin.register(Profile)
 class ProfileAdmin(admin.ModelAdmin):
     list_display = ('user', 'role', 'firebase_uid')  # Columns to display
+    list_select_related = ('user',)  # Avoid a query per row for `user`
     search_fields = ('user__username', 'role', 'firebase_uid')  # Enable search
     list_filter = ('role',)  # Add filter options
+    actions = ('disable_in_firebase', 'enable_in_firebase')
+
+    @admin.action(description="Disable selected users in Firebase")
+    def disable_in_firebase(self, request, queryset):
+        self._set_disabled(request, queryset, True)
+
+    @admin.action(description="Re-enable selected users in Firebase")
+    def enable_in_firebase(self, request, queryset):
+        self._set_disabled(request, queryset, False)
+
+    def _set_disabled(self, request, queryset, disabled):
+        uids = [uid for uid in queryset.values_list('firebase_uid', flat=True) if uid]
+        for uid in uids:
+            set_user_disabled(uid, disabled=disabled)
+        self.message_user(request, f"{'Disabled' if disabled else 'Re-enabled'} {len(uids)} Firebase user(s).")
 
 @admin.register(Appointment)
 class AppointmentAdmin(admin.ModelAdmin):
     list_display = ("id", "appointment_date", "title", "user", "staff", "status")  # Columns to display
+    list_select_related = ("user", "staff")  # Avoid two queries per row
     search_fields = ('title', 'user__username')  # Enable search
     list_filter = ("appointment_date",)  # Add filter options
@@ -0,0 +1,206 @@
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils import timezone
+
+from src.healthcare.scheduling import CANCELLED, MAX_DURATION_MINUTES
+
+# Free time is cached per (staff, day) as a 2 x n array of epoch seconds:
+# row 0 holds interval starts, row 1 interval ends, sorted and disjoint.
+EMPTY = np.empty((2, 0), dtype=np.int64)
+
+
+def _cache():
+    return caches[getattr(settings, "AVAILABILITY_CACHE_ALIAS", "default")]
+
+
+def _timeout():
+    return getattr(settings, "AVAILABILITY_CACHE_TIMEOUT", 3600)
+
+
+def _key(staff_id, day):
+    return f"availability:{staff_id}:{day.isoformat()}"
+
+
+def _parse_time(value):
+    return value if isinstance(value, time) else time.fromisoformat(value)
+
+
+def working_hours(day):
+    """
+    Returns the (open, close) epoch seconds of ``day``'s bookable hours.
+    """
+    tz = timezone.get_current_timezone()
+    opens = timezone.make_aware(datetime.combine(day, _parse_time(settings.AVAILABILITY_DAY_START)), tz)
+    closes = timezone.make_aware(datetime.combine(day, _parse_time(settings.AVAILABILITY_DAY_END)), tz)
+    return int(opens.timestamp()), int(closes.timestamp())
+
+
+def merge_intervals(starts, ends):
+    """
+    Merges intervals sorted by start into disjoint ones, without a Python
+    loop: an interval opens a new group unless it starts before the running
+    maximum of the ends before it.
+    """
+    if not len(starts):
+        return EMPTY
+    running_end = np.maximum.accumulate(ends)
+    opens_group = np.empty(len(starts), dtype=bool)
+    opens_group[0] = True
+    opens_group[1:] = starts[1:] > running_end[:-1]
+    first = np.flatnonzero(opens_group)
+    return np.stack([starts[first], np.maximum.reduceat(ends, first)])
+
+
+def free_intervals(busy, opens, closes):
+    """
+    Complement of the merged ``busy`` intervals within [opens, closes).
+    """
+    lo = np.searchsorted(busy[1], opens, side="right")
+    hi = np.searchsorted(busy[0], closes, side="left")
+    starts = np.clip(busy[0, lo:hi], opens, closes)
+    ends = np.clip(busy[1, lo:hi], opens, closes)
+    free = np.stack([np.concatenate(([opens], ends)), np.concatenate((starts, [closes]))])
+    return free[:, free[1] > free[0]]
+
+
+def busy_intervals(queryset, staff_ids, start, end):
+    """
+    Merged busy intervals per staff member between two datetimes, from a
+    single query ordered by the (staff, starts_at) index.
+    """
+    rows = (
+        queryset.filter(
+            staff_id__in=staff_ids,
+            starts_at__gt=start - timedelta(minutes=MAX_DURATION_MINUTES),
+            starts_at__lt=end,
+        )
+        .exclude(status=CANCELLED)
+        .order_by("staff_id", "starts_at")
+        .values_list("staff_id", "starts_at", "ends_at")
+    )
+    grouped = {staff_id: ([], []) for staff_id in staff_ids}
+    for staff_id, starts_at, ends_at in rows:
+        grouped[staff_id][0].append(starts_at.timestamp())
+        grouped[staff_id][1].append(ends_at.timestamp())
+    return {
+        staff_id: merge_intervals(np.array(starts, dtype=np.int64), np.array(ends, dtype=np.int64))
+        for staff_id, (starts, ends) in grouped.items()
+    }
+
+
+def get_free_intervals(queryset, staff_ids, days):
+    """
+    Returns {(staff_id, day): free intervals}. Cached days are reused; all
+    missing ones are computed from one query.
+    """
+    keys = {(staff_id, day): _key(staff_id, day) for staff_id in staff_ids for day in days}
+    cached = _cache().get_many(keys.values())
+    free = {pair: cached[key] for pair, key in keys.items() if key in cached}
+    missing = [pair for pair in keys if pair not in free]
+    if not missing:
+        return free
+
+    missing_staff = sorted({staff_id for staff_id, _ in missing})
+    first = working_hours(min(day for _, day in missing))[0]
+    last = working_hours(max(day for _, day in missing))[1]
+    busy = busy_intervals(
+        queryset,
+        missing_staff,
+        datetime.fromtimestamp(first, dt_timezone.utc),
+        datetime.fromtimestamp(last, dt_timezone.utc),
+    )
+    hours = {day: working_hours(day) for day in {day for _, day in missing}}
+    computed = {}
+    for staff_id, day in missing:
+        computed[(staff_id, day)] = free_intervals(busy[staff_id], *hours[day])
+    _cache().set_many({keys[pair]: value for pair, value in computed.items()}, _timeout())
+    free.update(computed)
+    return free
+
+
+def _labels(grid, opens):
+    """
+    Local "HH:MM" labels for one day's candidate start times.
+    """
+    if not len(grid):
+        return []
+    tz = timezone.get_current_timezone()
+    local_open = timezone.localtime(datetime.fromtimestamp(opens, dt_timezone.utc), tz)
+    local_last = timezone.localtime(datetime.fromtimestamp(int(grid[-1]), dt_timezone.utc), tz)
+    if local_open.utcoffset() != local_last.utcoffset():
+        # A DST change inside working hours; convert each start time
+        return [
+            timezone.localtime(datetime.fromtimestamp(int(start), dt_timezone.utc), tz).strftime("%H:%M")
+            for start in grid
+        ]
+    minutes = (grid - opens) // 60 + local_open.hour * 60 + local_open.minute
+    return [f"{m // 60:02d}:{m % 60:02d}" for m in minutes.tolist()]
+
+
+def find_open_slots(queryset, staff_ids, days, duration, step, now=None):
+    """
+    Start times on a ``step``-minute grid from the opening hour where a
+    ``duration``-minute booking fits in the staff member's free time.
+    Returns a list of {"staff", "date", "slots"} dicts.
+
+    The grid for the whole range is built once and tested against each
+    staff member's free intervals with a single searchsorted.
+    """
+    now = int((now or timezone.now()).timestamp())
+    free = get_free_intervals(queryset, staff_ids, days)
+    hours = [working_hours(day) for day in days]
+    grids = [np.arange(opens, closes - duration * 60 + 1, step * 60, dtype=np.int64) for opens, closes in hours]
+    grid = np.concatenate(grids) if grids else np.empty(0, dtype=np.int64)
+    labels = np.array(
+        [label for day_grid, (opens, _) in zip(grids, hours) for label in _labels(day_grid, opens)], dtype=object
+    )
+    bounds = np.cumsum([0] + [len(day_grid) for day_grid in grids])
+    future = grid > now
+
+    results = []
+    for staff_id in staff_ids:
+        # Days are disjoint, so their free intervals concatenate in order
+        intervals = np.concatenate([free[(staff_id, day)] for day in days], axis=1) if days else EMPTY
+        containing = np.searchsorted(intervals[0], grid, side="right") - 1
+        fits = future & (containing >= 0)
+        fits[fits] = intervals[1, containing[fits]] >= grid[fits] + duration * 60
+        for i, day in enumerate(days):
+            day_fits = fits[bounds[i]:bounds[i + 1]]
+            results.append({
+                "staff": staff_id,
+                "date": day.isoformat(),
+                "slots": labels[bounds[i]:bounds[i + 1]][day_fits].tolist(),
+            })
+    return results
+
+
+def appointment_days(starts_at, ends_at):
+    """
+    Local calendar days an appointment window touches.
+    """
+    if starts_at is None or ends_at is None:
+        return []
+    first = timezone.localdate(starts_at)
+    last = timezone.localdate(ends_at - timedelta(microseconds=1))
+    return [first + timedelta(days=i) for i in range((last - first).days + 1)]
+
+
+def invalidate_availability(slots):
+    """
+    Drops cached free time for each ``(staff_id, starts_at, ends_at)`` now
+    and again once the surrounding transaction commits.
+    """
+    keys = {
+        _key(staff_id, day)
+        for staff_id, starts_at, ends_at in slots
+        if staff_id is not None
+        for day in appointment_days(starts_at, ends_at)
+    }
+    if not keys:
+        return
+    _cache().delete_many(keys)
+    transaction.on_commit(lambda: _cache().delete_many(keys))
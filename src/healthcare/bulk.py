@@ -0,0 +1,255 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import serializers
+
+from src.healthcare.models import Appointment, apply_appointment_changes
+from src.healthcare.scheduling import (
+    CANCELLED,
+    DEFAULT_DURATION_MINUTES,
+    MAX_DURATION_MINUTES,
+    OVERLAP_MESSAGE,
+    appointment_window,
+    find_batch_conflicts,
+    overlap_guard,
+)
+from src.users.models import Profile
+
+CREATE, UPDATE, CANCEL = "create", "update", "cancel"
+
+
+class BulkAppointmentDataSerializer(serializers.Serializer):
+    """
+    Field-level validation for one operation's payload. Related users are
+    plain ids here and resolved for the whole batch at once.
+    """
+    title = serializers.CharField(max_length=225)
+    appointment_date = serializers.DateTimeField()
+    time = serializers.TimeField()
+    duration = serializers.IntegerField(min_value=1, max_value=MAX_DURATION_MINUTES, required=False)
+    status = serializers.CharField(max_length=50, required=False)
+    user = serializers.IntegerField(required=False)
+    staff = serializers.IntegerField(required=False, allow_null=True)
+
+
+class BulkOperationSerializer(serializers.Serializer):
+    op = serializers.ChoiceField(choices=[CREATE, UPDATE, CANCEL])
+    id = serializers.IntegerField(required=False)
+    data = serializers.DictField(required=False, default=dict)
+
+    def validate(self, attrs):
+        if attrs["op"] != CREATE and "id" not in attrs:
+            raise serializers.ValidationError({"id": "This field is required."})
+        if attrs["op"] != CANCEL:
+            data = BulkAppointmentDataSerializer(data=attrs["data"], partial=attrs["op"] == UPDATE)
+            data.is_valid(raise_exception=True)
+            attrs["data"] = data.validated_data
+        return attrs
+
+
+class BulkAppointmentProcessor:
+    """
+    Validates a batch of create/update/cancel operations in a few set-based
+    passes and writes them with bulk_create/bulk_update in one transaction.
+
+    ``appointments`` is the caller's role-scoped queryset; updates and
+    cancellations may only target rows in it.
+    """
+
+    def __init__(self, profile, appointments):
+        self.profile = profile
+        self.appointments = appointments
+        self.results = []
+
+    def error(self, index, errors):
+        result = self.results[index]
+        result["status"] = "error"
+        result.setdefault("errors", {}).update(errors)
+
+    def process(self, operations, atomic=True):
+        """
+        Returns ``(results, written)``. With ``atomic`` nothing is written
+        if any operation fails validation.
+        """
+        self.results = [{"index": i, "op": None} for i in range(len(operations))]
+        valid = self.validate_fields(operations)
+        self.resolve_targets(valid)
+        self.resolve_users(valid)
+        self.check_times(valid)
+        self.check_conflicts(valid)
+
+        ok = [(i, op) for i, op in valid if self.results[i].get("status") != "error"]
+        if atomic and len(ok) != len(operations):
+            for i, _ in ok:
+                self.results[i]["status"] = "skipped"
+            return self.results, False
+
+        self.write(ok)
+        return self.results, True
+
+    def validate_fields(self, operations):
+        valid = []
+        for i, operation in enumerate(operations):
+            serializer = BulkOperationSerializer(data=operation)
+            self.results[i]["op"] = operation.get("op") if isinstance(operation, dict) else None
+            if serializer.is_valid():
+                valid.append((i, serializer.validated_data))
+            else:
+                self.error(i, serializer.errors)
+        return valid
+
+    def resolve_targets(self, valid):
+        """
+        Loads every appointment referenced by an update or cancel in one query.
+        """
+        ids = [op["id"] for _, op in valid if op["op"] != CREATE]
+        targets = self.appointments.in_bulk(ids)
+        seen = set()
+        for i, op in valid:
+            if op["op"] == CREATE:
+                continue
+            if op["id"] in seen:
+                self.error(i, {"id": "Appointment appears more than once in this batch."})
+            elif op["id"] not in targets:
+                self.error(i, {"id": "Appointment not found."})
+            else:
+                op["instance"] = targets[op["id"]]
+            seen.add(op["id"])
+
+    def resolve_users(self, valid):
+        """
+        Applies the creation rules and checks referenced users and staff
+        with one query each.
+        """
+        role = self.profile.role
+        user_ids, staff_ids = set(), set()
+        for i, op in valid:
+            data = op.get("data", {})
+            if op["op"] == CREATE:
+                if role == "client":
+                    if data.get("user") not in (None, self.profile.user_id):
+                        self.error(i, {"user": "Clients can only create their own appointments."})
+                    data["user"] = self.profile.user_id
+                elif role != "admin":
+                    self.error(i, {"op": "Only clients and admins can create appointments."})
+                elif data.get("user") is None:
+                    self.error(i, {"user": "This field is required."})
+            elif "user" in data and role != "admin":
+                self.error(i, {"user": "Only admins can reassign an appointment's client."})
+            if data.get("user") is not None:
+                user_ids.add(data["user"])
+            if data.get("staff") is not None:
+                staff_ids.add(data["staff"])
+
+        existing_users = set(User.objects.filter(pk__in=user_ids).values_list("pk", flat=True))
+        staff_users = set(
+            Profile.objects.filter(user_id__in=staff_ids, role="staff").values_list("user_id", flat=True)
+        )
+        for i, op in valid:
+            data = op.get("data", {})
+            if data.get("user") is not None and data["user"] not in existing_users:
+                self.error(i, {"user": "User not found."})
+            if data.get("staff") is not None and data["staff"] not in staff_users:
+                self.error(i, {"staff": "Staff member not found."})
+
+    def check_times(self, valid):
+        """
+        Same rule as validate_future_date_time, evaluated against a single
+        ``now`` for the whole batch.
+        """
+        now = timezone.now()
+        for i, op in valid:
+            if op["op"] == CANCEL or self.results[i].get("status") == "error":
+                continue
+            data = op["data"]
+            instance = op.get("instance")
+            date = data.get("appointment_date", instance.appointment_date if instance else None)
+            time = data.get("time", instance.time if instance else None)
+            starts_at, _ = appointment_window(date, time, DEFAULT_DURATION_MINUTES)
+            if ("appointment_date" in data or "time" in data) and starts_at <= now:
+                self.error(i, {"non_field_errors": ["The appointment date and time must be in the future."]})
+
+    def check_conflicts(self, valid):
+        """
+        Checks every booking's staff schedule with one query for the whole
+        batch, including overlaps between operations in the batch. Rows the
+        batch updates or cancels are judged by their new values only.
+        """
+        candidates, targets = [], set()
+        for i, op in valid:
+            if self.results[i].get("status") == "error":
+                continue
+            instance = op.get("instance")
+            if instance is not None:
+                targets.add(instance.pk)
+            if op["op"] == CANCEL:
+                continue
+            data = op["data"]
+            staff_id = data["staff"] if "staff" in data else getattr(instance, "staff_id", None)
+            status = data.get("status", getattr(instance, "status", None))
+            if staff_id is None or status == CANCELLED:
+                continue
+            starts_at, ends_at = appointment_window(
+                data.get("appointment_date", getattr(instance, "appointment_date", None)),
+                data.get("time", getattr(instance, "time", None)),
+                data.get("duration", getattr(instance, "duration", DEFAULT_DURATION_MINUTES)),
+            )
+            candidates.append((i, staff_id, starts_at, ends_at))
+
+        for i in find_batch_conflicts(Appointment.objects.exclude(pk__in=targets), candidates):
+            self.error(i, {"time": OVERLAP_MESSAGE})
+
+    @transaction.atomic
+    def write(self, operations):
+        now = timezone.now()
+        creates, updates, update_fields = [], [], {"updated_at"}
+        for i, op in operations:
+            if op["op"] == CREATE:
+                data = op["data"]
+                creates.append((i, Appointment(
+                    title=data["title"],
+                    appointment_date=data["appointment_date"],
+                    time=data["time"],
+                    duration=data.get("duration", DEFAULT_DURATION_MINUTES),
+                    status=data.get("status", "pending"),
+                    user_id=data["user"],
+                    staff_id=data.get("staff"),
+                    created_at=now,
+                    updated_at=now,
+                )))
+                continue
+
+            instance = op["instance"]
+            if op["op"] == CANCEL:
+                instance.status = CANCELLED
+                update_fields.add("status")
+            else:
+                for field, value in op["data"].items():
+                    attname = {"user": "user_id", "staff": "staff_id"}.get(field, field)
+                    setattr(instance, attname, value)
+                    update_fields.add(field)
+                update_fields.update(("starts_at", "ends_at"))
+            # bulk_update() does not apply auto_now
+            instance.updated_at = now
+            updates.append((i, instance))
+
+        # bulk_create()/bulk_update() skip save(), which keeps the time window in sync
+        for _, appointment in creates + updates:
+            appointment.update_window()
+        with overlap_guard():
+            # Updates first, so bookings moved out of a slot free it for the creates
+            if updates:
+                Appointment.objects.bulk_update([appointment for _, appointment in updates], sorted(update_fields))
+            Appointment.objects.bulk_create([appointment for _, appointment in creates])
+        # No post_save signals are sent for bulk writes
+        apply_appointment_changes(
+            created=[appointment for _, appointment in creates],
+            updated=[appointment for _, appointment in updates],
+        )
+
+        for i, appointment in creates:
+            self.results[i].update(status="created", id=appointment.pk)
+        for i, appointment in updates:
+            status = "cancelled" if self.results[i]["op"] == CANCEL else "updated"
+            self.results[i].update(status=status, id=appointment.pk)
+        return [appointment for _, appointment in creates + updates]
@@ -0,0 +1,92 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from src.healthcare.models import AppointmentTombstone
+
+
+def tombstones_for_profile(profile):
+    """
+    Tombstones of the appointments that left the profile's role-scoped list.
+    """
+    tombstones = AppointmentTombstone.objects.all()
+    if profile.role == "admin":
+        return tombstones.filter(deleted=True)  # Reassignments keep rows in the admin list
+    elif profile.role == "staff":
+        return tombstones.filter(staff_id=profile.user_id)
+    elif profile.role == "client":
+        return tombstones.filter(user_id=profile.user_id)
+    return tombstones.none()
+
+
+def encode_watermark(moment):
+    return moment.isoformat()
+
+
+def decode_watermark(value):
+    """
+    The datetime of a watermark this module issued; ValueError when
+    malformed.
+    """
+    moment = parse_datetime(value)
+    if moment is None or timezone.is_naive(moment):
+        raise ValueError(value)
+    return moment
+
+
+def _page(queryset, field, since, upper, limit):
+    rows = queryset.filter(**{f"{field}__lte": upper}).order_by(field, "id")
+    if since is not None:
+        rows = rows.filter(**{f"{field}__gt": since})
+    return rows, list(rows[: limit + 1])
+
+
+def _cut(queryset, rows, field, cutoff, limit):
+    # A page ends after a timestamp, never inside one, so rows sharing the
+    # cutoff time beyond the fetched ones are added
+    truncated = len(rows) > limit
+    rows = [row for row in rows if getattr(row, field) <= cutoff]
+    if truncated and rows and getattr(rows[-1], field) == cutoff:
+        rows += queryset.filter(**{field: cutoff, "id__gt": rows[-1].id})
+    return rows
+
+
+def changes_since(appointments, tombstones, since, limit):
+    """
+    Appointments from ``appointments`` updated, and ids from
+    ``tombstones`` removed, after ``since`` (None for a full sync) and up
+    to a watermark.
+
+    The watermark trails the clock by CHANGE_FEED_LAG seconds, so rows
+    stamped just before it by transactions that have not committed yet are
+    not skipped. When more than ``limit`` rows changed, the watermark is
+    pulled back to the last complete timestamp of the page and
+    ``has_more`` is set. Clients apply ``deleted`` before ``changed``.
+    """
+    upper = timezone.now() - timedelta(seconds=settings.CHANGE_FEED_LAG)
+    if since is not None and since >= upper:
+        return {"changed": [], "deleted": [], "watermark": since, "has_more": False}
+
+    appointments, changed = _page(appointments, "updated_at", since, upper, limit)
+    if since is None:
+        tombstones, removed = tombstones.none(), []  # Nothing to delete on a full sync
+    else:
+        tombstones, removed = _page(tombstones, "removed_at", since, upper, limit)
+
+    cutoff = upper
+    if len(changed) > limit:
+        cutoff = min(cutoff, changed[limit - 1].updated_at)
+    if len(removed) > limit:
+        cutoff = min(cutoff, removed[limit - 1].removed_at)
+    if len(changed) > limit or len(removed) > limit:
+        changed = _cut(appointments, changed, "updated_at", cutoff, limit)
+        removed = _cut(tombstones, removed, "removed_at", cutoff, limit)
+
+    return {
+        "changed": changed,
+        "deleted": list(dict.fromkeys(tombstone.appointment_id for tombstone in removed)),
+        "watermark": cutoff,
+        "has_more": cutoff < upper,
+    }
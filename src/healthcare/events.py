@@ -0,0 +1,53 @@
+from src.core.conditional import ALL_APPOINTMENTS, APPOINTMENTS_OF_STAFF, APPOINTMENTS_OF_USER
+from src.core.events import publish_on_commit
+
+CREATED, UPDATED, DELETED = "created", "updated", "deleted"
+
+
+def appointment_channel(scope, key):
+    """
+    Event channel of the appointment list a version counter scope covers.
+    """
+    return f"{scope}:{key}"
+
+
+def channels_for_profile(profile):
+    if profile.role == "admin":
+        return [appointment_channel(ALL_APPOINTMENTS, 0)]
+    elif profile.role == "staff":
+        return [appointment_channel(APPOINTMENTS_OF_STAFF, profile.user_id)]
+    elif profile.role == "client":
+        return [appointment_channel(APPOINTMENTS_OF_USER, profile.user_id)]
+    return []
+
+
+def appointment_messages(appointment, kind):
+    """
+    ``(channel, event)`` pairs telling each list the appointment is in, or
+    left since it was loaded, what happened to it. Events carry the id and
+    status only; clients fetch the rows from the change feed.
+    """
+    event = {"type": kind, "id": appointment.pk, "status": appointment.status}
+    if appointment.updated_at is not None:
+        event["updated_at"] = appointment.updated_at.isoformat()
+    channels = {
+        appointment_channel(ALL_APPOINTMENTS, 0),
+        appointment_channel(APPOINTMENTS_OF_USER, appointment.user_id),
+    }
+    if appointment.staff_id is not None:
+        channels.add(appointment_channel(APPOINTMENTS_OF_STAFF, appointment.staff_id))
+    messages = [(channel, event) for channel in sorted(channels)]
+
+    loaded = (
+        (APPOINTMENTS_OF_USER, getattr(appointment, "_loaded_user_id", None)),
+        (APPOINTMENTS_OF_STAFF, getattr(appointment, "_loaded_staff_window", (None,))[0]),
+    )
+    left = {appointment_channel(scope, key) for scope, key in loaded if key is not None} - channels
+    removed = {"type": DELETED, "id": appointment.pk}
+    return messages + [(channel, removed) for channel in sorted(left)]
+
+
+def publish_appointment_events(appointments, kind):
+    publish_on_commit(
+        message for appointment in appointments for message in appointment_messages(appointment, kind)
+    )
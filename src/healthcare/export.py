@@ -0,0 +1,205 @@
+import csv
+import io
+import json
+from datetime import date, datetime, time
+
+import pandas
+import pyarrow
+import pyarrow.parquet
+from asgiref.sync import sync_to_async
+from django.utils import timezone
+
+# Exported columns; user and staff are usernames, as the API renders them
+EXPORT_COLUMNS = (
+    "id", "title", "appointment_date", "time", "duration", "starts_at", "ends_at",
+    "status", "user", "staff", "created_at", "updated_at",
+)
+_COLUMN_FIELDS = {"user": "user__username", "staff": "staff__username"}
+_DATETIME_COLUMNS = ("appointment_date", "starts_at", "ends_at", "created_at", "updated_at")
+
+
+def export_chunks(queryset, chunk_size):
+    """
+    Lists of up to ``chunk_size`` row tuples (EXPORT_COLUMNS order), read
+    through a server-side cursor where the database supports one, so only
+    one chunk is in memory at a time.
+    """
+    rows = (
+        queryset.order_by("id")
+        .values_list(*(_COLUMN_FIELDS.get(column, column) for column in EXPORT_COLUMNS))
+        .iterator(chunk_size=chunk_size)
+    )
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _text(value, tz):
+    if isinstance(value, datetime):
+        return value.astimezone(tz).isoformat()
+    if isinstance(value, (date, time)):
+        return value.isoformat()
+    return value
+
+
+class Encoder:
+    """
+    Turns chunks of export rows into bytes: begin(), encode() per chunk,
+    then end().
+    """
+
+    content_type = "application/octet-stream"
+    extension = "bin"
+
+    def __init__(self):
+        # Resolved once; looking it up per value dominates the encoding time
+        self.tz = timezone.get_current_timezone()
+
+    def begin(self):
+        return b""
+
+    def encode(self, chunk):
+        raise NotImplementedError
+
+    def end(self):
+        return b""
+
+
+class CsvEncoder(Encoder):
+    content_type = "text/csv; charset=utf-8"
+    extension = "csv"
+
+    def begin(self):
+        return self.encode([EXPORT_COLUMNS])
+
+    def encode(self, chunk):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        tz = self.tz
+        for row in chunk:
+            writer.writerow([_text(value, tz) for value in row])
+        return buffer.getvalue().encode("utf-8")
+
+
+class NdjsonEncoder(Encoder):
+    content_type = "application/x-ndjson"
+    extension = "ndjson"
+
+    def encode(self, chunk):
+        tz = self.tz
+        lines = (
+            json.dumps({column: _text(value, tz) for column, value in zip(EXPORT_COLUMNS, row)},
+                       ensure_ascii=False, separators=(",", ":"))
+            for row in chunk
+        )
+        return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+class _StreamSink:
+    """
+    Write-only file that hands back what was written since the last
+    drain(), while reporting the total position Parquet offsets need.
+    """
+
+    def __init__(self):
+        self.parts = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def writable(self):
+        return True
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b"".join(self.parts)
+        self.parts = []
+        return data
+
+
+class ParquetEncoder(Encoder):
+    """
+    Each chunk becomes a pandas DataFrame and one Parquet row group,
+    streamed out as soon as it is written. pandas cannot append row groups
+    to an open file itself, so the row groups are written with pyarrow.
+    """
+
+    content_type = "application/vnd.apache.parquet"
+    extension = "parquet"
+
+    def __init__(self):
+        super().__init__()
+        timestamp = pyarrow.timestamp("us", tz="UTC")
+        types = {
+            "id": pyarrow.int64(),
+            "time": pyarrow.time64("us"),
+            "duration": pyarrow.int64(),
+            **{column: timestamp for column in _DATETIME_COLUMNS},
+        }
+        # An explicit schema keeps every row group's types the same, even
+        # when a chunk's column is all null
+        self.schema = pyarrow.schema([(column, types.get(column, pyarrow.string())) for column in EXPORT_COLUMNS])
+        self.sink = _StreamSink()
+        self.writer = None
+
+    def begin(self):
+        self.writer = pyarrow.parquet.ParquetWriter(
+            pyarrow.PythonFile(self.sink, mode="w"), self.schema, compression="snappy"
+        )
+        return self.sink.drain()
+
+    def encode(self, chunk):
+        frame = pandas.DataFrame.from_records(chunk, columns=EXPORT_COLUMNS)
+        table = pyarrow.Table.from_pandas(frame, schema=self.schema, preserve_index=False)
+        self.writer.write_table(table)
+        return self.sink.drain()
+
+    def end(self):
+        self.writer.close()
+        return self.sink.drain()
+
+
+ENCODERS = {"csv": CsvEncoder, "ndjson": NdjsonEncoder, "parquet": ParquetEncoder}
+
+
+def export_stream(queryset, encoder, chunk_size):
+    """
+    The encoded export as byte strings, one per chunk of rows.
+    """
+    header = encoder.begin()
+    if header:
+        yield header
+    for chunk in export_chunks(queryset, chunk_size):
+        yield encoder.encode(chunk)
+    footer = encoder.end()
+    if footer:
+        yield footer
+
+
+async def aexport_stream(queryset, encoder, chunk_size):
+    """
+    export_stream for ASGI responses: each chunk is read and encoded on
+    the request's database thread, so a sync iterator is never buffered
+    whole by the handler.
+    """
+    parts = export_stream(queryset, encoder, chunk_size)
+    next_part = sync_to_async(next, thread_sensitive=True)
+    while (part := await next_part(parts, None)) is not None:
+        yield part
@@ -0,0 +1,84 @@
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+from src.core.utils import parse_and_validate_date
+
+# Allowed ?ordering= values and the keyset each one pages by. Every keyset
+# ends in the primary key so page boundaries are unique.
+ORDERINGS = {
+    "appointment_date": ("appointment_date", "time", "id"),
+    "created_at": ("created_at", "id"),
+    "updated_at": ("updated_at", "id"),
+}
+DEFAULT_ORDERING = "appointment_date"
+
+
+def get_keyset_ordering(params):
+    """
+    Translates ``?ordering=[-]field`` into a keyset for KeysetPagination.
+    """
+    value = params.get("ordering") or DEFAULT_ORDERING
+    descending = value.startswith("-")
+    fields = ORDERINGS.get(value.lstrip("-"))
+    if fields is None:
+        raise ValidationError({"ordering": f"Must be one of: {', '.join(ORDERINGS)} (prefix with '-' to reverse)."})
+    if descending:
+        return tuple("-" + field for field in fields)
+    return fields
+
+
+def _start_of_day(date):
+    return timezone.make_aware(datetime.combine(date, time.min), timezone.get_current_timezone())
+
+
+def _parse_date(params, name):
+    try:
+        return parse_and_validate_date(params[name])
+    except ValidationError:
+        raise ValidationError({name: "Date must be in MM-DD-YYYY or YYYY-MM-DD format."})
+
+
+class AppointmentFilterBackend(BaseFilterBackend):
+    """
+    Filters appointments in SQL from query parameters:
+
+    - ``status``: one status or a comma-separated list
+    - ``from`` / ``to``: inclusive appointment date range
+    - ``staff``: staff user id, or ``none`` for unassigned appointments
+
+    Every predicate is on a column covered by the appointment indexes.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        params = request.query_params
+
+        if params.get("status"):
+            statuses = [status.strip() for status in params["status"].split(",") if status.strip()]
+            if len(statuses) == 1:
+                queryset = queryset.filter(status=statuses[0])
+            else:
+                queryset = queryset.filter(status__in=statuses)
+
+        start = end = None
+        if params.get("from"):
+            start = _parse_date(params, "from")
+            queryset = queryset.filter(appointment_date__gte=_start_of_day(start))
+        if params.get("to"):
+            end = _parse_date(params, "to")
+            queryset = queryset.filter(appointment_date__lt=_start_of_day(end + timedelta(days=1)))
+        if start and end and start > end:
+            raise ValidationError({"to": "Must be on or after 'from'."})
+
+        staff = params.get("staff")
+        if staff:
+            if staff.lower() == "none":
+                queryset = queryset.filter(staff__isnull=True)
+            elif staff.isdigit():
+                queryset = queryset.filter(staff_id=int(staff))
+            else:
+                raise ValidationError({"staff": "Must be a staff user id or 'none'."})
+
+        return queryset
@@ -0,0 +1,97 @@
+import statistics
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from src.core.pagination import keyset_filter
+from src.healthcare.models import Appointment
+from src.healthcare.seeding import BENCH_USER_PREFIX, create_bench_users, delete_bench_data, seed_appointments
+
+KEYSET_ORDER = ("appointment_date", "time", "id")
+
+
+class Command(BaseCommand):
+    help = (
+        "Seeds synthetic appointments and reports the query plan and latency of "
+        "the role-scoped appointment list queries."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seed", type=int, default=0, help="Insert this many synthetic appointments first.")
+        parser.add_argument("--clients", type=int, default=20000, help="Synthetic clients to create when seeding.")
+        parser.add_argument("--staff", type=int, default=200, help="Synthetic staff to create when seeding.")
+        parser.add_argument("--repeat", type=int, default=20, help="Timed runs per query.")
+        parser.add_argument("--page-size", type=int, default=50)
+        parser.add_argument("--no-plans", action="store_true", help="Skip printing query plans.")
+        parser.add_argument("--cleanup", action="store_true", help="Delete the synthetic data and exit.")
+
+    def handle(self, *args, **options):
+        if options["cleanup"]:
+            deleted, _ = delete_bench_data()
+            self.stdout.write(f"Deleted {deleted} rows.")
+            return
+
+        if options["seed"]:
+            self.seed(options)
+
+        client = Appointment.objects.filter(user__username__startswith=BENCH_USER_PREFIX).values_list("user_id", flat=True).first()
+        staff = Appointment.objects.exclude(staff=None).values_list("staff_id", flat=True).first()
+        if client is None or staff is None:
+            raise CommandError("No appointments to benchmark; run with --seed N first.")
+
+        total = Appointment.objects.count()
+        self.stdout.write(f"{connection.vendor}: {total} appointments\n")
+        for label, queryset in self.scenarios(client, staff, options["page_size"]):
+            self.report(label, queryset, options)
+
+    def seed(self, options):
+        clients, staff = create_bench_users(options["clients"], options["staff"])
+        started = time.perf_counter()
+        for created in seed_appointments(options["seed"], clients, staff):
+            self.stdout.write(f"\rSeeded {created}/{options['seed']}", ending="")
+            self.stdout.flush()
+        self.stdout.write(f"\nSeeding took {time.perf_counter() - started:.1f}s")
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE healthcare_appointment")
+
+    def scenarios(self, client, staff, page_size):
+        """
+        The queries AppointmentListCreateView issues for each role, plus the
+        status/date and deep-page access patterns.
+        """
+        ordered = Appointment.objects.order_by(*KEYSET_ORDER)
+        deep = ordered.values_list(*KEYSET_ORDER)[Appointment.objects.count() // 2]
+        after_deep = ordered.filter(keyset_filter(KEYSET_ORDER, deep))
+        today = timezone.now()
+        return [
+            ("client list (user = ?)", ordered.filter(user_id=client)[:page_size]),
+            ("staff list (staff = ?)", ordered.filter(staff_id=staff)[:page_size]),
+            ("admin list (first page)", ordered[:page_size]),
+            ("admin list (page at row N/2)", after_deep[:page_size]),
+            (
+                "status + date range",
+                ordered.filter(status="confirmed", appointment_date__range=(today, today + timedelta(days=30)))[:page_size],
+            ),
+            ("pending, upcoming", ordered.filter(status="pending", appointment_date__gte=today)[:page_size]),
+        ]
+
+    def report(self, label, queryset, options):
+        self.stdout.write(self.style.MIGRATE_HEADING(label))
+        if not options["no_plans"]:
+            explain = {"analyze": True} if connection.vendor == "postgresql" else {}
+            self.stdout.write(queryset.explain(**explain))
+
+        timings = []
+        for _ in range(options["repeat"]):
+            started = time.perf_counter()
+            list(queryset.all())
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        self.stdout.write(
+            f"  median {statistics.median(timings):.2f} ms  p95 {p95:.2f} ms  max {timings[-1]:.2f} ms\n"
+        )
@@ -0,0 +1,43 @@
+import sys
+from types import SimpleNamespace
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.exceptions import ValidationError
+
+from src.healthcare.export import ENCODERS, export_stream
+from src.healthcare.filters import AppointmentFilterBackend
+from src.healthcare.models import Appointment
+
+
+class Command(BaseCommand):
+    help = "Streams appointments to a CSV, NDJSON or Parquet file (or stdout) with flat memory use."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", dest="export_format", choices=list(ENCODERS), default="csv")
+        parser.add_argument("--output", default="-", help="File to write; '-' for stdout.")
+        parser.add_argument("--chunk-size", type=int, default=settings.EXPORT_CHUNK_SIZE, help="Rows per read.")
+        parser.add_argument("--status", help="One status or a comma-separated list.")
+        parser.add_argument("--from", dest="from", help="First appointment date (YYYY-MM-DD).")
+        parser.add_argument("--to", help="Last appointment date (YYYY-MM-DD).")
+        parser.add_argument("--staff", help="Staff user id, or 'none' for unassigned appointments.")
+
+    def handle(self, *args, **options):
+        if options["chunk_size"] < 1:
+            raise CommandError("--chunk-size must be at least 1.")
+        # The same filters as the list endpoint's query parameters
+        params = {name: options[name] for name in ("status", "from", "to", "staff") if options[name]}
+        try:
+            queryset = AppointmentFilterBackend().filter_queryset(
+                SimpleNamespace(query_params=params), Appointment.objects.all(), None
+            )
+        except ValidationError as e:
+            raise CommandError(e.detail)
+
+        output = sys.stdout.buffer if options["output"] == "-" else open(options["output"], "wb")
+        try:
+            for part in export_stream(queryset, ENCODERS[options["export_format"]](), options["chunk_size"]):
+                output.write(part)
+        finally:
+            if output is not sys.stdout.buffer:
+                output.close()
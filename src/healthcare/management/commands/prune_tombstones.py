@@ -0,0 +1,32 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from src.healthcare.models import AppointmentTombstone
+
+
+class Command(BaseCommand):
+    help = (
+        "Deletes appointment tombstones older than the change feed retention; "
+        "clients with older watermarks are told to sync from scratch."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days", type=int, default=settings.CHANGE_FEED_RETENTION_DAYS, help="Keep tombstones this many days."
+        )
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options["days"])
+        expired = AppointmentTombstone.objects.filter(removed_at__lt=cutoff)
+        total = 0
+        # In batches, so a large backlog does not hold one long transaction
+        while True:
+            ids = list(expired.values_list("id", flat=True)[: options["batch_size"]])
+            if not ids:
+                break
+            total += AppointmentTombstone.objects.filter(id__in=ids).delete()[0]
+        self.stdout.write(f"Deleted {total} tombstones.")
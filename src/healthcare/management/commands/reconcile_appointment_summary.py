@@ -0,0 +1,37 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from src.core.utils import parse_and_validate_date
+from src.healthcare.summary import reconcile_summaries
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares the daily appointment summary with the appointments table and "
+        "corrects rows that drifted. Run periodically (e.g. nightly from cron)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--from", dest="start", help="First day to check (YYYY-MM-DD); default: the earliest.")
+        parser.add_argument("--to", dest="end", help="Last day to check (YYYY-MM-DD); default: the latest.")
+        parser.add_argument("--days", type=int, help="Check this many days either side of today instead.")
+        parser.add_argument("--chunk-days", type=int, default=31, help="Days reconciled per transaction.")
+
+    def handle(self, *args, **options):
+        if options["chunk_days"] < 1:
+            raise CommandError("--chunk-days must be at least 1.")
+        start, end = options["start"], options["end"]
+        try:
+            start = parse_and_validate_date(start) if start else None
+            end = parse_and_validate_date(end) if end else None
+        except ValidationError:
+            raise CommandError("Dates must be in YYYY-MM-DD or MM-DD-YYYY format.")
+        if options["days"] is not None:
+            today = timezone.localdate()
+            start, end = today - timedelta(days=options["days"]), today + timedelta(days=options["days"])
+
+        corrected = reconcile_summaries(start, end, chunk_days=options["chunk_days"])
+        self.stdout.write(f"Corrected {corrected} summary rows.")
@@ -0,0 +1,158 @@
+# Generated by Django 5.1.4 on 2026-10-18 17:49
+
+from datetime import datetime, timedelta
+
+import django.core.validators
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+# Frozen copies of src.healthcare.scheduling as of this migration, so later
+# edits there cannot change what it did
+CANCELLED = "cancelled"
+EXCLUSION_CONSTRAINT = "appt_staff_no_overlap"
+POSTGRES_OVERLAP_SQL = [
+    """
+    ALTER TABLE healthcare_appointment
+    ADD COLUMN slot tstzrange
+    GENERATED ALWAYS AS (tstzrange(starts_at, ends_at, '[)')) STORED
+    """,
+    f"""
+    ALTER TABLE healthcare_appointment
+    ADD CONSTRAINT {EXCLUSION_CONSTRAINT}
+    EXCLUDE USING gist (int8range(staff_id, staff_id, '[]') WITH &&, slot WITH &&)
+    WHERE (staff_id IS NOT NULL AND status <> '{CANCELLED}')
+    """,
+]
+POSTGRES_OVERLAP_REVERSE_SQL = [
+    f"ALTER TABLE healthcare_appointment DROP CONSTRAINT IF EXISTS {EXCLUSION_CONSTRAINT}",
+    "ALTER TABLE healthcare_appointment DROP COLUMN IF EXISTS slot",
+]
+MAX_LISTED_OVERLAPS = 20
+
+
+def appointment_window(appointment_date, time, duration):
+    if isinstance(appointment_date, datetime) and timezone.is_aware(appointment_date):
+        appointment_date = timezone.localtime(appointment_date).date()
+    starts_at = timezone.make_aware(
+        datetime.combine(appointment_date, time), timezone.get_current_timezone()
+    )
+    return starts_at, starts_at + timedelta(minutes=duration)
+
+
+def populate_windows(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        # Same arithmetic as appointment_window(), set-based
+        schema_editor.execute(
+            """
+            UPDATE healthcare_appointment SET
+                starts_at = ((appointment_date AT TIME ZONE %(tz)s)::date + time) AT TIME ZONE %(tz)s,
+                ends_at = ((appointment_date AT TIME ZONE %(tz)s)::date + time) AT TIME ZONE %(tz)s
+                    + duration * interval '1 minute'
+            """,
+            {"tz": settings.TIME_ZONE},
+        )
+        return
+
+    Appointment = apps.get_model("healthcare", "Appointment")
+    batch = []
+    for appointment in Appointment.objects.only(
+        "appointment_date", "time", "duration"
+    ).iterator(chunk_size=2000):
+        appointment.starts_at, appointment.ends_at = appointment_window(
+            appointment.appointment_date, appointment.time, appointment.duration
+        )
+        batch.append(appointment)
+        if len(batch) == 2000:
+            Appointment.objects.bulk_update(batch, ["starts_at", "ends_at"])
+            batch = []
+    Appointment.objects.bulk_update(batch, ["starts_at", "ends_at"])
+
+
+def add_overlap_constraint(apps, schema_editor):
+    """
+    PostgreSQL only. Fails, listing the conflicting bookings, when existing
+    appointments already overlap; cancel or move them and migrate again.
+    """
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT a.staff_id, a.id, a.starts_at, a.ends_at, b.id, b.starts_at, b.ends_at
+            FROM healthcare_appointment a
+            JOIN healthcare_appointment b
+              ON a.staff_id = b.staff_id AND a.id < b.id
+             AND a.starts_at < b.ends_at AND b.starts_at < a.ends_at
+            WHERE a.status <> %s AND b.status <> %s
+            ORDER BY a.staff_id, a.starts_at, a.id, b.id
+            LIMIT %s
+            """,
+            [CANCELLED, CANCELLED, MAX_LISTED_OVERLAPS + 1],
+        )
+        overlaps = cursor.fetchall()
+    if overlaps:
+        def window(starts_at, ends_at):
+            return f"{timezone.localtime(starts_at):%Y-%m-%d %H:%M}-{timezone.localtime(ends_at):%H:%M}"
+
+        lines = [
+            f"  staff {staff_id}: appointment {a_id} ({window(a_start, a_end)}) "
+            f"overlaps appointment {b_id} ({window(b_start, b_end)})"
+            for staff_id, a_id, a_start, a_end, b_id, b_start, b_end in overlaps[:MAX_LISTED_OVERLAPS]
+        ]
+        if len(overlaps) > MAX_LISTED_OVERLAPS:
+            lines.append(f"  ... and more; only the first {MAX_LISTED_OVERLAPS} are listed")
+        raise RuntimeError(
+            f"Cannot add the {EXCLUSION_CONSTRAINT} constraint: these active appointments "
+            "overlap bookings of the same staff member. Cancel or move one of each pair, "
+            "then run migrate again.\n" + "\n".join(lines)
+        )
+    for statement in POSTGRES_OVERLAP_SQL:
+        schema_editor.execute(statement)
+
+
+def remove_overlap_constraint(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for statement in POSTGRES_OVERLAP_REVERSE_SQL:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("healthcare", "0003_appointment_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="appointment",
+            name="duration",
+            field=models.PositiveIntegerField(
+                default=30,
+                validators=[
+                    django.core.validators.MinValueValidator(1),
+                    django.core.validators.MaxValueValidator(480),
+                ],
+            ),
+        ),
+        migrations.AddField(
+            model_name="appointment",
+            name="ends_at",
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="appointment",
+            name="starts_at",
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="appointment",
+            index=models.Index(
+                fields=["staff", "starts_at"], name="appt_staff_start_idx"
+            ),
+        ),
+        migrations.RunPython(populate_windows, migrations.RunPython.noop),
+        migrations.RunPython(add_overlap_constraint, remove_overlap_constraint),
+    ]
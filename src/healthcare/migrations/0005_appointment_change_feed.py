@@ -0,0 +1,67 @@
+# Generated by Django 5.1.4 on 2026-10-18 18:17
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("healthcare", "0004_appointment_duration_and_window"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AppointmentTombstone",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("appointment_id", models.BigIntegerField()),
+                ("user_id", models.IntegerField(null=True)),
+                ("staff_id", models.IntegerField(null=True)),
+                ("deleted", models.BooleanField(default=False)),
+                ("removed_at", models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="appointment",
+            index=models.Index(
+                fields=["user", "updated_at"], name="appt_user_updated_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="appointment",
+            index=models.Index(
+                fields=["staff", "updated_at"], name="appt_staff_updated_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="appointment",
+            index=models.Index(fields=["updated_at"], name="appt_updated_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="appointmenttombstone",
+            index=models.Index(
+                fields=["user_id", "removed_at"], name="tomb_user_removed_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="appointmenttombstone",
+            index=models.Index(
+                fields=["staff_id", "removed_at"], name="tomb_staff_removed_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="appointmenttombstone",
+            index=models.Index(fields=["removed_at"], name="tomb_removed_idx"),
+        ),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 5.1.4 on 2026-10-18 18:22
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+
+def populate_summary(apps, schema_editor):
+    # One GROUP BY over the existing appointments; the same counts
+    # src.healthcare.summary.actual_counts computes per range
+    Appointment = apps.get_model("healthcare", "Appointment")
+    AppointmentDailySummary = apps.get_model("healthcare", "AppointmentDailySummary")
+    rows = (
+        Appointment.objects.filter(starts_at__isnull=False)
+        .annotate(day=TruncDate("starts_at", tzinfo=timezone.get_current_timezone()))
+        .values_list("day", "staff_id", "status")
+        .annotate(count=Count("id"))
+        .order_by()
+    )
+    AppointmentDailySummary.objects.bulk_create(
+        (
+            AppointmentDailySummary(
+                day=day, staff_id=staff_id or 0, status=status, count=count
+            )
+            for day, staff_id, status, count in rows.iterator()
+        ),
+        batch_size=2000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("healthcare", "0005_appointment_change_feed"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AppointmentDailySummary",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField()),
+                ("staff_id", models.IntegerField()),
+                ("status", models.CharField(max_length=50)),
+                ("count", models.IntegerField(default=0)),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["staff_id", "day"], name="summary_staff_day_idx"
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("day", "staff_id", "status"),
+                        name="summary_day_staff_status_uniq",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(populate_summary, migrations.RunPython.noop),
+    ]
@@ -1,66 +1,91 @@
+from collections import Counter
 from django.db import models
+from django.core.validators import MaxValueValidator, MinValueValidator
 from django.utils.timezone import now
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from src.users.models import Profile
-from firebase_admin import auth as firebase_auth
-import firebase_admin
+from src.users.cache import invalidate_profile
+from src.users.email_sync import claims_email, has_placeholder_email, placeholder_email
+from src.users.tasks import refresh_profile_completion, sync_firebase_email
+from src.healthcare.scheduling import DEFAULT_DURATION_MINUTES, MAX_DURATION_MINUTES, appointment_window
+from src.healthcare.availability import invalidate_availability
+from src.healthcare.events import CREATED, DELETED, UPDATED, publish_appointment_events
+from src.core.conditional import ALL_APPOINTMENTS, APPOINTMENTS_OF_STAFF, APPOINTMENTS_OF_USER, bump_versions
 import logging
 
 logger = logging.getLogger(__name__)
 
-# Signal to automatically create or update the Profile model whenever a User is created or saved
+# Signal to automatically create or update the Profile model whenever a User is created or saved.
+# Neither receiver calls Firebase: the email comes from the verified token claims of the
+# current request (see src.users.email_sync.firebase_claims) or is synced by a background task.
 @receiver(post_save, sender=User)
 def create_user_profile(sender, instance, created, **kwargs):
     """
     Create a profile for a new user if it doesn't already exist.
     """
     if created:
-        try:
-            # Retrieve the Firebase user data using the UID stored in username
-            firebase_user = firebase_auth.get_user(instance.username)
-            email = firebase_user.email  # Get the real email from Firebase
-        except firebase_admin.auth.UserNotFoundError:
-            print(f"Firebase user not found for UID: {instance.username}")
-            email = instance.email  # Fallback to Django's email field
-
+        email = claims_email(instance)
+        if not email:
+            # Not in the token claims; fetch the real email from Firebase in the background
+            sync_firebase_email.enqueue(instance.username)
+            email = instance.email
         if not email or email == "default@example.com":
-            raise ValueError("Missing email during user creation!")
+            email = placeholder_email(instance.username)
 
         profile = Profile.objects.create(
             user=instance,
-            email=email,  # Ensure it stores the real email
+            email=email,
             firebase_uid=instance.username,
             role='client',
             profile_completed=False
         )
 
-        print(f"Profile created for {email}")
+        logger.debug("Profile created for user %s", instance.pk)
 
 @receiver(post_save, sender=User)
-def save_user_profile(sender, instance, **kwargs):  
+def save_user_profile(sender, instance, created, **kwargs):
     """
-    Ensure profile is saved when the user is updated and mark profile as complete.
+    Keep the profile's email in sync when the user is updated and queue the
+    profile-completion check. Firebase is only asked for the email while
+    the profile still has a placeholder.
     """
-    if hasattr(instance, 'profile'):  
-        profile = instance.profile
+    if created or not hasattr(instance, 'profile'):
+        return  # create_user_profile just built it
+    profile = instance.profile
 
-        # Ensure the correct email is stored in the profile
-        try:
-            firebase_user = firebase_auth.get_user(instance.username)
-            profile.email = firebase_user.email  # Sync email with Firebase
-        except firebase_admin.auth.UserNotFoundError:
-            print(f"Firebase user not found for UID: {instance.username}")
+    # Ensure the correct email is stored in the profile
+    email = claims_email(instance)
+    if email and email != profile.email:
+        profile.email = email
+        profile.save(update_fields=['email'])
+    elif not email and has_placeholder_email(profile):
+        sync_firebase_email.enqueue(instance.username)
 
-        # Check if all required fields are filled
-        required_fields = ['first_name', 'last_name', 'phone_number']
-        if all(getattr(profile, field, None) for field in required_fields):
-            profile.profile_completed = True  # Set profile_completed to True
-            print(f"Profile completed for {profile.email}")
+    if not profile.profile_completed:
+        refresh_profile_completion.enqueue(instance.pk)
 
-        profile.save()
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_profile_cache(sender, instance, **kwargs):
+    """
+    Cached profiles embed their user, so drop them when the user changes.
+    """
+    invalidate_profile(firebase_uid=instance.username, user_id=instance.pk)
 
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+def invalidate_profile_cache(sender, instance, **kwargs):
+    """
+    Write-through invalidation for the profile/role cache, under the UID
+    the profile has now and the one it was loaded with.
+    """
+    loaded_uid = getattr(instance, "_loaded_firebase_uid", None)
+    if loaded_uid not in (None, instance.firebase_uid):
+        invalidate_profile(firebase_uid=loaded_uid)
+    invalidate_profile(firebase_uid=instance.firebase_uid, user_id=instance.user_id)
+    instance._loaded_firebase_uid = instance.firebase_uid
 
 
 class Appointment(models.Model):
@@ -70,21 +95,80 @@ class Appointment(models.Model):
     user = models.ForeignKey(
         'auth.User',
         on_delete=models.CASCADE,
-        related_name="appointments"
+        related_name="appointments",
+        db_index=False,  # Covered by appt_user_date_idx
     )
     staff = models.ForeignKey(
         'auth.User',
         on_delete=models.SET_NULL,
         null=True,
         blank=True,
-        related_name="staff_appointments"
+        related_name="staff_appointments",
+        db_index=False,  # Covered by appt_staff_date_idx
     )
+    duration = models.PositiveIntegerField(
+        default=DEFAULT_DURATION_MINUTES,
+        validators=[MinValueValidator(1), MaxValueValidator(MAX_DURATION_MINUTES)],
+    ) # Minutes
+    # Derived from appointment_date, time and duration on save; used for overlap checks
+    starts_at = models.DateTimeField(null=True, editable=False)
+    ends_at = models.DateTimeField(null=True, editable=False)
     status = models.CharField(max_length=50, default="pending")
     created_at = models.DateTimeField(default=now)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        # Match the role-scoped list queries, which filter on user, staff or
+        # nothing and page in (appointment_date, time, id) order. The composite
+        # indexes lead with the foreign keys, so the FKs need no index of their own.
+        indexes = [
+            models.Index(fields=["user", "appointment_date", "time"], name="appt_user_date_idx"),
+            models.Index(fields=["staff", "appointment_date", "time"], name="appt_staff_date_idx"),
+            models.Index(fields=["status", "appointment_date"], name="appt_status_date_idx"),
+            models.Index(fields=["appointment_date", "time"], name="appt_date_time_idx"),
+            models.Index(fields=["staff", "starts_at"], name="appt_staff_start_idx"),
+            # The change feed (src/healthcare/changes.py) reads each role's
+            # rows by update time
+            models.Index(fields=["user", "updated_at"], name="appt_user_updated_idx"),
+            models.Index(fields=["staff", "updated_at"], name="appt_staff_updated_idx"),
+            models.Index(fields=["updated_at"], name="appt_updated_idx"),
+            models.Index(
+                fields=["appointment_date", "time"],
+                name="appt_pending_date_idx",
+                condition=models.Q(status="pending"),
+            ),
+        ]
+
     def __str__(self):
         return f"Appointment: {self.title} on {self.date} at {self.time}"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored booking so moving it also frees the old day's cached availability
+        instance._loaded_staff_window = tuple(
+            instance.__dict__.get(field) for field in ("staff_id", "starts_at", "ends_at")
+        )
+        instance._loaded_user_id = instance.__dict__.get("user_id")
+        instance._loaded_status = instance.__dict__.get("status")
+        return instance
+
+    @property
+    def staff_window(self):
+        return (self.staff_id, self.starts_at, self.ends_at)
+
+    def update_window(self):
+        """
+        Recomputes starts_at/ends_at. save() calls this; bulk writes must too.
+        """
+        self.starts_at, self.ends_at = appointment_window(self.appointment_date, self.time, self.duration)
+
+    def save(self, *args, **kwargs):
+        self.update_window()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            kwargs["update_fields"] = {*update_fields, "starts_at", "ends_at"}
+        super().save(*args, **kwargs)
     
     # Method to get the user's role safely
     @property
@@ -93,3 +177,137 @@ class Appointment(models.Model):
             return self.user.profile.role
         except AttributeError:
             return "unknown"
+
+
+class AppointmentTombstone(models.Model):
+    """
+    Records that an appointment left an appointment list, for the change
+    feed: a deletion (seen by its client, its staff member and admins) or a
+    reassignment (seen by the previous client or staff member only).
+    """
+    appointment_id = models.BigIntegerField()
+    # Plain ids, not foreign keys: a user's deletion cascades to their
+    # appointments, whose tombstones still name them
+    user_id = models.IntegerField(null=True)
+    staff_id = models.IntegerField(null=True)
+    deleted = models.BooleanField(default=False)
+    removed_at = models.DateTimeField(default=now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user_id", "removed_at"], name="tomb_user_removed_idx"),
+            models.Index(fields=["staff_id", "removed_at"], name="tomb_staff_removed_idx"),
+            models.Index(fields=["removed_at"], name="tomb_removed_idx"),
+        ]
+
+    def __str__(self):
+        return f"Tombstone: appointment {self.appointment_id} at {self.removed_at}"
+
+class AppointmentDailySummary(models.Model):
+    """
+    Number of appointments per day, staff member and status, kept up to
+    date by the appointment write paths (src/healthcare/summary.py).
+    """
+    day = models.DateField()
+    staff_id = models.IntegerField()  # UNASSIGNED_STAFF (0) for appointments without staff
+    status = models.CharField(max_length=50)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["day", "staff_id", "status"], name="summary_day_staff_status_uniq"),
+        ]
+        indexes = [
+            models.Index(fields=["staff_id", "day"], name="summary_staff_day_idx"),
+        ]
+
+    def __str__(self):
+        return f"Summary: {self.count} {self.status} on {self.day} for staff {self.staff_id}"
+
+def appointment_tombstones(appointment, deleted=False):
+    """
+    Unsaved tombstones for a deleted appointment, or for the lists a saved
+    one left by being reassigned since it was loaded.
+    """
+    if deleted:
+        return [AppointmentTombstone(
+            appointment_id=appointment.pk,
+            user_id=appointment.user_id,
+            staff_id=appointment.staff_id,
+            deleted=True,
+        )]
+    tombstones = []
+    loaded_user_id = getattr(appointment, "_loaded_user_id", None)
+    if loaded_user_id not in (None, appointment.user_id):
+        tombstones.append(AppointmentTombstone(appointment_id=appointment.pk, user_id=loaded_user_id))
+    loaded_staff_id = getattr(appointment, "_loaded_staff_window", (None,))[0]
+    if loaded_staff_id not in (None, appointment.staff_id):
+        tombstones.append(AppointmentTombstone(appointment_id=appointment.pk, staff_id=loaded_staff_id))
+    return tombstones
+
+def appointment_version_counters(appointment):
+    """
+    Version counters of the appointment lists that show the appointment now
+    or showed it when it was loaded.
+    """
+    return [
+        (ALL_APPOINTMENTS, 0),
+        (APPOINTMENTS_OF_USER, appointment.user_id),
+        (APPOINTMENTS_OF_USER, getattr(appointment, "_loaded_user_id", None)),
+        (APPOINTMENTS_OF_STAFF, appointment.staff_id),
+        (APPOINTMENTS_OF_STAFF, getattr(appointment, "_loaded_staff_window", (None,))[0]),
+    ]
+
+def reset_loaded_state(appointment):
+    """
+    Makes the appointment's current values the baseline for its next write.
+    """
+    appointment._loaded_staff_window = appointment.staff_window
+    appointment._loaded_user_id = appointment.user_id
+    appointment._loaded_status = appointment.status
+
+def apply_appointment_changes(created=(), updated=(), deleted=()):
+    """
+    Records the side effects of written appointments: tombstones, daily
+    summary counts, list versions, cached availability and change events.
+
+    Every step compares an appointment with the values it was loaded with,
+    so all of them run before the loaded state is reset. Used by the signal
+    handlers below and by bulk writes, which send no signals.
+    """
+    from src.healthcare.summary import appointment_summary_deltas, apply_summary_deltas
+
+    changed = [*created, *updated, *deleted]
+    AppointmentTombstone.objects.bulk_create(
+        [tombstone for appointment in updated for tombstone in appointment_tombstones(appointment)]
+        + [tombstone for appointment in deleted for tombstone in appointment_tombstones(appointment, deleted=True)]
+    )
+    summary_deltas = Counter()
+    for appointment in created:
+        summary_deltas.update(appointment_summary_deltas(appointment, created=True))
+    for appointment in updated:
+        summary_deltas.update(appointment_summary_deltas(appointment))
+    for appointment in deleted:
+        summary_deltas.update(appointment_summary_deltas(appointment, deleted=True))
+    apply_summary_deltas(summary_deltas)
+    bump_versions(counter for appointment in changed for counter in appointment_version_counters(appointment))
+    invalidate_availability(
+        [appointment.staff_window for appointment in changed]
+        + [getattr(appointment, "_loaded_staff_window", (None, None, None)) for appointment in changed]
+    )
+    publish_appointment_events(created, CREATED)
+    publish_appointment_events(updated, UPDATED)
+    publish_appointment_events(deleted, DELETED)
+    for appointment in changed:
+        reset_loaded_state(appointment)
+
+@receiver(post_save, sender=Appointment)
+def record_appointment_save(sender, instance, created, **kwargs):
+    if created:
+        apply_appointment_changes(created=[instance])
+    else:
+        apply_appointment_changes(updated=[instance])
+
+@receiver(post_delete, sender=Appointment)
+def record_appointment_deletion(sender, instance, **kwargs):
+    apply_appointment_changes(deleted=[instance])
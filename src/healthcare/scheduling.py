@@ -0,0 +1,120 @@
+import bisect
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+DEFAULT_DURATION_MINUTES = 30
+MAX_DURATION_MINUTES = 8 * 60
+CANCELLED = "cancelled"
+OVERLAP_MESSAGE = "The staff member already has an appointment at this time."
+
+# PostgreSQL enforces non-overlapping bookings itself with a generated range
+# column and an exclusion constraint (see migration 0004). Staff equality is
+# expressed as overlap of a degenerate int8range so plain GiST can index it
+# without the btree_gist extension. Other databases rely on the indexed
+# overlap query below.
+EXCLUSION_CONSTRAINT = "appt_staff_no_overlap"
+
+def appointment_window(appointment_date, time, duration):
+    """
+    Returns the (starts_at, ends_at) datetimes an appointment occupies.
+    ``appointment_date`` contributes its local calendar date only, the same
+    way validate_future_date_time combines it with ``time``.
+    """
+    if isinstance(appointment_date, datetime) and timezone.is_aware(appointment_date):
+        appointment_date = timezone.localtime(appointment_date).date()
+    starts_at = timezone.make_aware(
+        datetime.combine(appointment_date, time), timezone.get_current_timezone()
+    )
+    return starts_at, starts_at + timedelta(minutes=duration)
+
+
+def overlapping(queryset, staff_id, starts_at, ends_at):
+    """
+    Active appointments of ``staff_id`` overlapping [starts_at, ends_at).
+    Durations are capped, so the scan over the (staff, starts_at) index is
+    bounded to MAX_DURATION_MINUTES before ``starts_at``.
+    """
+    return (
+        queryset.filter(
+            staff_id=staff_id,
+            starts_at__gt=starts_at - timedelta(minutes=MAX_DURATION_MINUTES),
+            starts_at__lt=ends_at,
+            ends_at__gt=starts_at,
+        )
+        .exclude(status=CANCELLED)
+    )
+
+
+def find_batch_conflicts(queryset, candidates):
+    """
+    Checks many proposed bookings at once. ``candidates`` is a list of
+    ``(key, staff_id, starts_at, ends_at)``; returns the keys that overlap an
+    existing booking (one query for the whole batch) or another candidate.
+    Rows excluded from ``queryset`` (e.g. the ones being moved) are ignored.
+    """
+    candidates = [c for c in candidates if c[1] is not None]
+    if not candidates:
+        return set()
+
+    earliest = min(c[2] for c in candidates) - timedelta(minutes=MAX_DURATION_MINUTES)
+    latest = max(c[3] for c in candidates)
+    booked = defaultdict(list)
+    rows = (
+        queryset.filter(
+            staff_id__in={c[1] for c in candidates},
+            starts_at__gt=earliest,
+            starts_at__lt=latest,
+        )
+        .exclude(status=CANCELLED)
+        .order_by("staff_id", "starts_at")
+        .values_list("staff_id", "starts_at", "ends_at")
+    )
+    for staff_id, starts_at, ends_at in rows:
+        booked[staff_id].append((starts_at, ends_at))
+    booked_starts = {staff_id: [interval[0] for interval in intervals] for staff_id, intervals in booked.items()}
+
+    conflicts = set()
+    for key, staff_id, starts_at, ends_at in candidates:
+        intervals = booked[staff_id]
+        starts = booked_starts.get(staff_id, [])
+        # Only bookings starting before our end can overlap; walk back from there
+        i = bisect.bisect_left(starts, ends_at) - 1
+        while i >= 0 and intervals[i][0] > starts_at - timedelta(minutes=MAX_DURATION_MINUTES):
+            if intervals[i][1] > starts_at:
+                conflicts.add(key)
+                break
+            i -= 1
+
+    by_staff = defaultdict(list)
+    for key, staff_id, starts_at, ends_at in candidates:
+        by_staff[staff_id].append((starts_at, ends_at, key))
+    for intervals in by_staff.values():
+        intervals.sort()
+        latest_end, latest_key = None, None
+        for starts_at, ends_at, key in intervals:
+            if latest_end is not None and starts_at < latest_end:
+                conflicts.update((key, latest_key))
+            if latest_end is None or ends_at > latest_end:
+                latest_end, latest_key = ends_at, key
+    return conflicts
+
+
+@contextmanager
+def overlap_guard():
+    """
+    Turns an exclusion constraint violation (two concurrent bookings that
+    both passed the overlap check) into a ValidationError. Runs in a
+    savepoint so the surrounding transaction stays usable.
+    """
+    try:
+        with transaction.atomic():
+            yield
+    except IntegrityError as exc:
+        if EXCLUSION_CONSTRAINT in str(exc):
+            raise ValidationError({"time": OVERLAP_MESSAGE})
+        raise
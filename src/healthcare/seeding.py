@@ -0,0 +1,112 @@
+import random
+from datetime import time, timedelta
+
+from django.contrib.auth.models import User
+from django.utils import timezone
+
+from src.healthcare.models import Appointment
+from src.healthcare.scheduling import CANCELLED
+from src.users.email_sync import placeholder_email
+from src.users.models import Profile
+
+BENCH_USER_PREFIX = "bench-"
+SLOT_SECONDS = 30 * 60
+STATUSES = ("pending", "confirmed", "completed", "cancelled")
+STATUS_WEIGHTS = (0.2, 0.3, 0.4, 0.1)
+
+
+def create_bench_users(clients, staff):
+    """
+    Creates synthetic client and staff users, with their profiles, using
+    bulk_create, which skips the User post_save signals (and their Firebase
+    calls). The Firebase UID of each user is its username. Returns the two
+    lists of users.
+    """
+    existing = User.objects.filter(username__startswith=BENCH_USER_PREFIX).count()
+    User.objects.bulk_create(
+        [User(username=f"{BENCH_USER_PREFIX}client-{existing + i}") for i in range(clients)]
+        + [User(username=f"{BENCH_USER_PREFIX}staff-{existing + i}") for i in range(staff)],
+        batch_size=1000,
+    )
+    users = User.objects.filter(username__startswith=BENCH_USER_PREFIX)
+    Profile.objects.bulk_create(
+        [
+            Profile(
+                user=user,
+                firebase_uid=user.username,
+                email=placeholder_email(user.username),
+                role="staff" if "-staff-" in user.username else "client",
+                first_name="Bench",
+                last_name=user.username,
+                profile_completed=True,
+            )
+            for user in users.filter(profile=None)
+        ],
+        batch_size=1000,
+    )
+    return (
+        list(users.filter(username__contains="-client-")),
+        list(users.filter(username__contains="-staff-")),
+    )
+
+
+def _half_hours(starts_at, ends_at):
+    # Half-hour grid cells since the epoch that [starts_at, ends_at) touches
+    first = int(starts_at.timestamp()) // SLOT_SECONDS
+    last = (int(ends_at.timestamp()) - 1) // SLOT_SECONDS
+    return range(first, last + 1)
+
+
+def seed_appointments(count, clients, staff, days=730, batch_size=10000, seed=0):
+    """
+    Bulk inserts ``count`` appointments spread over ``days`` around today,
+    assigned to random clients and staff. Staff are never double-booked
+    (including against their existing appointments), so the rows satisfy the
+    PostgreSQL overlap constraint; a booking whose slot is taken goes
+    unassigned. Yields the running total after each batch so callers can
+    report progress.
+    """
+    rng = random.Random(seed)
+    start = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=days // 2)
+    client_ids = [user.pk for user in clients]
+    staff_ids = [user.pk for user in staff]
+    booked = set()  # (staff_id, half-hour cell) of active bookings
+    existing = (
+        Appointment.objects.filter(staff_id__in=staff_ids, starts_at__isnull=False)
+        .exclude(status=CANCELLED)
+        .values_list("staff_id", "starts_at", "ends_at")
+    )
+    for staff_id, starts_at, ends_at in existing.iterator(chunk_size=10000):
+        booked.update((staff_id, cell) for cell in _half_hours(starts_at, ends_at))
+    created = 0
+    while created < count:
+        batch = []
+        for _ in range(min(batch_size, count - created)):
+            day = start + timedelta(days=rng.randrange(days))
+            slot = time(hour=rng.randrange(8, 18), minute=rng.choice((0, 30)))
+            appointment = Appointment(
+                title="Benchmark appointment",
+                appointment_date=day,
+                time=slot,
+                user_id=rng.choice(client_ids),
+                staff_id=rng.choice(staff_ids) if rng.random() < 0.9 else None,
+                status=rng.choices(STATUSES, STATUS_WEIGHTS)[0],
+            )
+            appointment.update_window()
+            if appointment.staff_id is not None and appointment.status != CANCELLED:
+                cells = [(appointment.staff_id, cell) for cell in _half_hours(appointment.starts_at, appointment.ends_at)]
+                if booked.isdisjoint(cells):
+                    booked.update(cells)
+                else:
+                    appointment.staff_id = None
+            batch.append(appointment)
+        Appointment.objects.bulk_create(batch)
+        created += len(batch)
+        yield created
+
+
+def delete_bench_data():
+    """
+    Removes every synthetic user; their appointments cascade.
+    """
+    return User.objects.filter(username__startswith=BENCH_USER_PREFIX).delete()
@@ -1,26 +1,68 @@
 from rest_framework import serializers
 from src.healthcare.models import Appointment
+from src.healthcare.scheduling import (
+    CANCELLED,
+    DEFAULT_DURATION_MINUTES,
+    OVERLAP_MESSAGE,
+    appointment_window,
+    overlap_guard,
+    overlapping,
+)
 from src.users.models import Profile
-from src.core.utils import ( 
+from src.core.metrics import TimedListSerializer, TimedSerializerMixin
+from src.core.utils import (
     parse_and_validate_date,
     validate_future_date_time,
     )
 
-class AppointmentSerializer(serializers.ModelSerializer):
+class AppointmentSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     user = serializers.StringRelatedField()  # Fix field name from `client` to `user`
     staff = serializers.StringRelatedField()
     class Meta:
         model = Appointment
-        fields = ['id', 'title', 'appointment_date', 'time', 'user', 'staff', 'status', 'created_at', 'updated_at']
+        list_serializer_class = TimedListSerializer
+        fields = ['id', 'title', 'appointment_date', 'time', 'duration', 'user', 'staff', 'status', 'created_at', 'updated_at']
 
     def validate(self, data):
         validated_data = data.copy()
-        
+
         # Parse and validate the date
         validated_data['appointment_date'] = parse_and_validate_date(validated_data['appointment_date'])
 
         # Validate future date and time
         validate_future_date_time(validated_data['appointment_date'], validated_data['time'])
 
+        # Reject bookings that overlap the staff member's other appointments
+        self.validate_staff_availability(validated_data)
+
         return validated_data
-    
+
+    def validate_staff_availability(self, data):
+        """
+        Checks the booking's time window against the assigned staff member's
+        active appointments using the (staff, starts_at) index.
+        """
+        instance = self.instance
+        # staff is read-only here, so the booking keeps the staff it has;
+        # staff are assigned through the batch endpoint, which checks them itself
+        staff_id = getattr(instance, 'staff_id', None)
+        status = data.get('status', getattr(instance, 'status', None))
+        if staff_id is None or status == CANCELLED:
+            return
+
+        duration = data.get('duration', getattr(instance, 'duration', DEFAULT_DURATION_MINUTES))
+        starts_at, ends_at = appointment_window(data['appointment_date'], data['time'], duration)
+        conflicts = overlapping(Appointment.objects.all(), staff_id, starts_at, ends_at)
+        if instance is not None:
+            conflicts = conflicts.exclude(pk=instance.pk)
+        if conflicts.exists():
+            raise serializers.ValidationError({'time': OVERLAP_MESSAGE})
+
+    def create(self, validated_data):
+        with overlap_guard():
+            return super().create(validated_data)
+
+    def update(self, instance, validated_data):
+        with overlap_guard():
+            return super().update(instance, validated_data)
+
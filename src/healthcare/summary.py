@@ -0,0 +1,220 @@
+import logging
+from collections import Counter
+from datetime import datetime, time, timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Max, Min, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from src.healthcare.models import Appointment, AppointmentDailySummary
+
+logger = logging.getLogger(__name__)
+
+UNASSIGNED_STAFF = 0  # staff_id of summary rows counting appointments without staff
+
+
+def summary_key(staff_id, starts_at, status):
+    """
+    The ``(day, staff_id, status)`` summary row counting an appointment;
+    None when the start time is unknown.
+    """
+    if starts_at is None:
+        return None
+    return (timezone.localdate(starts_at), staff_id or UNASSIGNED_STAFF, status)
+
+
+def loaded_summary_key(appointment):
+    staff_id, starts_at, _ = getattr(appointment, "_loaded_staff_window", (None, None, None))
+    status = getattr(appointment, "_loaded_status", None)
+    if status is None:
+        return None  # Not loaded from the database, or loaded without these fields
+    return summary_key(staff_id, starts_at, status)
+
+
+def appointment_summary_deltas(appointment, created=False, deleted=False):
+    """
+    Count changes an appointment write makes to the summary, as a Counter
+    of summary keys.
+    """
+    deltas = Counter()
+    current = summary_key(appointment.staff_id, appointment.starts_at, appointment.status)
+    loaded = None if created else loaded_summary_key(appointment)
+    if deleted:
+        key = loaded or current
+        if key is not None:
+            deltas[key] -= 1
+        return deltas
+    if loaded is not None:
+        deltas[loaded] -= 1
+    if current is not None:
+        deltas[current] += 1
+    return deltas
+
+
+def _add(key, delta):
+    day, staff_id, status = key
+    rows = AppointmentDailySummary.objects.filter(day=day, staff_id=staff_id, status=status)
+    if rows.update(count=F("count") + delta):
+        return
+    try:
+        with transaction.atomic():
+            AppointmentDailySummary.objects.create(day=day, staff_id=staff_id, status=status, count=delta)
+    except IntegrityError:  # Created by a concurrent writer
+        rows.update(count=F("count") + delta)
+
+
+def apply_summary_deltas(deltas):
+    """
+    Adds ``deltas`` to the summary rows. A single save touches at most two
+    rows, updated in place; larger batches lock the rows they touch, then
+    write them with one bulk update and one bulk insert. Keys go in sorted
+    order so concurrent writers lock rows in the same order.
+    """
+    keys = sorted(key for key, delta in deltas.items() if delta)
+    if len(keys) <= 2:
+        with transaction.atomic():
+            for key in keys:
+                _add(key, deltas[key])
+        return
+
+    match = Q()
+    for day, staff_id, status in keys:
+        match |= Q(day=day, staff_id=staff_id, status=status)
+    with transaction.atomic():
+        locked = AppointmentDailySummary.objects.select_for_update().filter(match).order_by("day", "staff_id", "status")
+        rows = {(row.day, row.staff_id, row.status): row for row in locked}
+        for key, row in rows.items():
+            row.count += deltas[key]
+        AppointmentDailySummary.objects.bulk_update(rows.values(), ["count"])
+        missing = [key for key in keys if key not in rows]
+        try:
+            with transaction.atomic():
+                AppointmentDailySummary.objects.bulk_create(
+                    AppointmentDailySummary(day=key[0], staff_id=key[1], status=key[2], count=deltas[key])
+                    for key in missing
+                )
+        except IntegrityError:  # Some were created by a concurrent writer
+            for key in missing:
+                _add(key, deltas[key])
+
+
+def _midnight(day):
+    return timezone.make_aware(datetime.combine(day, time.min), timezone.get_current_timezone())
+
+
+def actual_counts(start, end):
+    """
+    Summary counts computed from the appointments starting between the
+    ``start`` and ``end`` days (inclusive).
+    """
+    tz = timezone.get_current_timezone()
+    lower, upper = _midnight(start), _midnight(end + timedelta(days=1))
+    rows = (
+        # starts_at falls on appointment_date's local day; the widened
+        # appointment_date range lets the (appointment_date, time) index
+        # narrow the scan
+        Appointment.objects.filter(
+            appointment_date__gte=lower - timedelta(days=1),
+            appointment_date__lt=upper + timedelta(days=1),
+            starts_at__gte=lower,
+            starts_at__lt=upper,
+        )
+        .annotate(day=TruncDate("starts_at", tzinfo=tz))
+        .values_list("day", "staff_id", "status")
+        .annotate(count=Count("id"))
+        .order_by()
+    )
+    return {(day, staff_id or UNASSIGNED_STAFF, status): count for day, staff_id, status, count in rows}
+
+
+@transaction.atomic
+def reconcile_days(start, end):
+    """
+    Rewrites the summary rows of the ``start``-``end`` days that differ
+    from the appointments table. The days' rows are locked first, so
+    writers updating them wait and apply their change on top. Returns the
+    number of rows corrected.
+    """
+    stored = {
+        (row.day, row.staff_id, row.status): row
+        for row in AppointmentDailySummary.objects.select_for_update().filter(day__gte=start, day__lte=end)
+    }
+    actual = actual_counts(start, end)
+    corrected = 0
+    for key in sorted(stored.keys() | actual.keys()):
+        count = actual.get(key, 0)
+        row = stored.get(key)
+        if row is not None and row.count == count:
+            continue
+        logger.warning(
+            "Appointment summary drift on %s for staff %s (%s): %s stored, %s actual",
+            key[0], key[1], key[2], row.count if row is not None else 0, count,
+        )
+        corrected += 1
+        if row is None:
+            apply_summary_deltas({key: count})
+        elif count:
+            row.count = count
+            row.save(update_fields=["count"])
+        else:
+            row.delete()
+    return corrected
+
+
+def reconcile_summaries(start=None, end=None, chunk_days=31):
+    """
+    Reconciles the summary with the appointments table over ``start``-
+    ``end`` (default: every day with appointments or summary rows), one
+    transaction per ``chunk_days`` days. Returns the rows corrected.
+    """
+    if chunk_days < 1:
+        raise ValueError("chunk_days must be at least 1.")
+    if start is None or end is None:
+        starts = Appointment.objects.aggregate(first=Min("starts_at"), last=Max("starts_at"))
+        days = AppointmentDailySummary.objects.aggregate(first=Min("day"), last=Max("day"))
+        firsts = [day for day in (days["first"], starts["first"] and timezone.localdate(starts["first"])) if day]
+        lasts = [day for day in (days["last"], starts["last"] and timezone.localdate(starts["last"])) if day]
+        if not firsts:
+            return 0
+        start, end = start or min(firsts), end or max(lasts)
+
+    corrected = 0
+    while start <= end:
+        chunk_end = min(start + timedelta(days=chunk_days - 1), end)
+        corrected += reconcile_days(start, chunk_end)
+        start = chunk_end + timedelta(days=1)
+    return corrected
+
+
+# Query parameter -> summary column
+SUMMARY_GROUPS = {"day": "day", "staff": "staff_id", "status": "status"}
+
+
+def summarize(start, end, group_by=tuple(SUMMARY_GROUPS), staff_id=None):
+    """
+    Appointment counts between the ``start`` and ``end`` days (inclusive)
+    grouped by ``group_by`` (names from SUMMARY_GROUPS), read from the
+    summary table only. ``staff_id`` limits the counts to one staff member
+    (UNASSIGNED_STAFF for appointments without staff).
+    """
+    rows = AppointmentDailySummary.objects.filter(day__gte=start, day__lte=end)
+    if staff_id is not None:
+        rows = rows.filter(staff_id=staff_id)
+    fields = [SUMMARY_GROUPS[name] for name in group_by]
+    if not fields:
+        return [{"count": rows.aggregate(total=Sum("count"))["total"] or 0}]
+    rows = rows.values(*fields).annotate(total=Sum("count")).filter(total__gt=0).order_by(*fields)
+
+    results = []
+    for row in rows:
+        result = {}
+        if "day" in row:
+            result["date"] = row["day"].isoformat()
+        if "staff_id" in row:
+            result["staff"] = row["staff_id"] or None
+        if "status" in row:
+            result["status"] = row["status"]
+        result["count"] = row["total"]
+        results.append(result)
+    return results
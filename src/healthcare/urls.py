@@ -1,7 +1,36 @@
+from django.conf import settings
 from django.urls import path
-from .views import AppointmentListCreateView, AppointmentDetailView
+from src.core.async_views import async_get
+from .views import (
+    AppointmentListCreateView,
+    AppointmentDetailView,
+    BulkAppointmentView,
+    AvailabilityView,
+    AppointmentChangesView,
+    AppointmentSummaryView,
+    AppointmentExportView,
+    appointment_detail_async,
+    appointment_list_async,
+    appointment_events_async,
+)
+
+appointment_list = AppointmentListCreateView.as_view()
+appointment_detail = AppointmentDetailView.as_view()
+if settings.ASYNC_VIEWS:
+    # Serve the read paths from async views; writes stay on the DRF views
+    appointment_list = async_get(appointment_list_async, appointment_list)
+    appointment_detail = async_get(appointment_detail_async, appointment_detail)
 
 urlpatterns = [
-    path('appointments/', AppointmentListCreateView.as_view(), name='appointment-list-create'), # List/create appointments
-    path('appointments/<int:pk>/', AppointmentDetailView.as_view(), name='appointment-detail'), # Appointment details
-]
\ No newline at end of file
+    path('appointments/', appointment_list, name='appointment-list-create'), # List/create appointments
+    path('appointments/<int:pk>/', appointment_detail, name='appointment-detail'), # Appointment details
+    path('appointments/bulk/', BulkAppointmentView.as_view(), name='appointment-bulk'), # Batch create/update/cancel
+    path('appointments/availability/', AvailabilityView.as_view(), name='appointment-availability'), # Open slots per staff/day
+    path('appointments/changes/', AppointmentChangesView.as_view(), name='appointment-changes'), # Incremental sync
+    path('appointments/summary/', AppointmentSummaryView.as_view(), name='appointment-summary'), # Counts per day/staff/status
+    path('appointments/export.<str:export_format>', AppointmentExportView.as_view(), name='appointment-export'), # CSV/NDJSON/Parquet
+]
+
+if settings.ASYNC_VIEWS:
+    # Long-lived streams would each hold a worker thread under WSGI
+    urlpatterns.append(path('appointments/events/', appointment_events_async, name='appointment-events'))
\ No newline at end of file
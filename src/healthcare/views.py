@@ -1,56 +1,123 @@
 from rest_framework import generics, permissions, status, serializers
-from rest_framework.exceptions import PermissionDenied, ValidationError
+from rest_framework.exceptions import NotFound, PermissionDenied, Throttled, ValidationError
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from src.users.models import Profile
 from src.healthcare.models import Appointment
 from .serializers import AppointmentSerializer
+from .filters import AppointmentFilterBackend, get_keyset_ordering
+from .bulk import BulkAppointmentProcessor
+from .availability import find_open_slots
+from .events import channels_for_profile
+from .summary import SUMMARY_GROUPS, UNASSIGNED_STAFF, summarize
+from .export import ENCODERS, aexport_stream, export_stream
+from .changes import changes_since, decode_watermark, encode_watermark, tombstones_for_profile
+from .scheduling import DEFAULT_DURATION_MINUTES, MAX_DURATION_MINUTES
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.http import JsonResponse, StreamingHttpResponse
 from django.contrib.auth.models import User
 from firebase_admin import auth as firebase_auth, credentials, initialize_app, get_app
 from firebase_admin.auth import get_user, verify_id_token
-from datetime import datetime
+from datetime import datetime, timedelta
+from django.utils import timezone
 from rest_framework.decorators import api_view, permission_classes
-from src.core.utils import validate_token
+from src.core.utils import aget_request_identity, parse_and_validate_date, validate_token
+from src.core.async_views import async_api_view
+from src.core.conditional import (
+    ALL_APPOINTMENTS,
+    APPOINTMENTS_OF_STAFF,
+    APPOINTMENTS_OF_USER,
+    aget_versions,
+    finish_conditional,
+    get_versions,
+    make_etag,
+    not_modified,
+)
+from src.core.events import EventStream, TooManySubscriptions, get_hub
 from src.core.permissions import IsAdminOrOwner
+from src.core.pagination import KeysetPagination
 import os
 import json
+import logging
 from dotenv import load_dotenv
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+def appointments_for_profile(profile):
+    """
+    Appointments visible to the given profile's role, with the related
+    users the serializer renders joined in the same query.
+    """
+    queryset = Appointment.objects.select_related('user', 'staff')
+    role = profile.role
+    user = profile.user
+
+    if role == 'admin':
+        return queryset  # Admins see all appointments
+    elif role == 'staff':
+        return queryset.filter(staff=user)  # Staff see their assigned appointments
+    elif role == 'client':
+        return queryset.filter(user=user)  # Clients see their own appointments
+    return queryset.none()  # Default to no access if role is undefined
+
+def appointment_list_counters(profile):
+    """
+    Version counters covering appointments_for_profile(profile).
+    """
+    if profile.role == 'admin':
+        return [(ALL_APPOINTMENTS, 0)]
+    elif profile.role == 'staff':
+        return [(APPOINTMENTS_OF_STAFF, profile.user_id)]
+    elif profile.role == 'client':
+        return [(APPOINTMENTS_OF_USER, profile.user_id)]
+    return []
+
+def appointment_list_etag(request, profile, versions):
+    return make_etag(request, "appointments", profile.user_id, profile.role, *versions)
+
 # View for listing and creating appointments
 class AppointmentListCreateView(generics.ListCreateAPIView):
     """
     API view to list all appointments or create a new appointment.
     - Admins can see all appointments.
     - Clients can only see their own appointments.
+    Lists are filtered by ?status=, ?from=, ?to= and ?staff=, ordered by
+    ?ordering= (default appointment_date) and cursor-paginated.
     """
     serializer_class = AppointmentSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
+    filter_backends = [AppointmentFilterBackend]
     
     def get_queryset(self):
         profile = validate_token(self.request)  # Returns a Profile object
         if not profile:
             raise PermissionDenied("User profile not found.")
-        
-        role = profile.role
-        user = profile.user  # Get the User object from the Profile
-
-        if role == 'admin':
-            return Appointment.objects.all()  # Admins see all appointments
-        elif role == 'staff':
-            return Appointment.objects.filter(staff=user)  # Staff see their assigned appointments
-        elif role == 'client':
-            return Appointment.objects.filter(user=user)  # Clients see their own appointments
-        return Appointment.objects.none()  # Default to no access if role is undefined
+        return appointments_for_profile(profile)
+
+    def get_keyset_ordering(self):
+        return get_keyset_ordering(self.request.query_params)
+
+    def list(self, request, *args, **kwargs):
+        # The ETag comes from version counters, so a 304 needs no rows
+        profile = validate_token(request)
+        etag = appointment_list_etag(request, profile, get_versions(appointment_list_counters(profile)))
+        response = not_modified(request, etag)
+        if response is not None:
+            return response
+        return finish_conditional(super().list(request, *args, **kwargs), etag)
     
     def perform_create(self, serializer):
         """
         Automatically assign the logged-in user as the client
         when they create an appointment.
         """
-        user = self.request.user
-        if user.profile.role != 'client':
+        profile = validate_token(self.request)
+        user = profile.user
+        if profile.role != 'client':
             raise PermissionDenied("Only clients can create appointments.")
         
         # Parse and validate the date field for MM-DD-YYYY format
@@ -69,6 +136,30 @@ class AppointmentListCreateView(generics.ListCreateAPIView):
         else:
             serializer.save(user=user)
     
+@async_api_view(permission_classes=[permissions.IsAuthenticated])
+async def appointment_list_async(request):
+    """
+    Async GET for AppointmentListCreateView: same filters, ordering and
+    cursor pagination, fetched with the async ORM.
+    """
+    identity = await aget_request_identity(request)
+    if identity.profile is None:
+        raise PermissionDenied(f"Profile not found for UID: {identity.uid}")
+    versions = await aget_versions(appointment_list_counters(identity.profile))
+    etag = appointment_list_etag(request, identity.profile, versions)
+    response = not_modified(request, etag)
+    if response is not None:
+        return response
+
+    view = AppointmentListCreateView(request=request, args=(), kwargs={}, format_kwarg=None)
+    queryset = appointments_for_profile(identity.profile)
+    for backend in view.filter_backends:
+        queryset = backend().filter_queryset(request, queryset, view)
+    paginator = view.pagination_class()
+    rows = await paginator.apaginate_queryset(queryset, request, view)
+    data = AppointmentSerializer(rows, many=True).data
+    return finish_conditional(JsonResponse(paginator.get_paginated_data(data)), etag)
+
 # View for retrieving, updating, and deleting a specific appointment
 class AppointmentDetailView(generics.RetrieveUpdateDestroyAPIView):
     """
@@ -84,17 +175,7 @@ class AppointmentDetailView(generics.RetrieveUpdateDestroyAPIView):
         profile = validate_token(self.request)  # Returns a Profile object
         if not profile:
             raise PermissionDenied("User profile not found.")
-        
-        user = profile.user
-        role = role = profile.role
-
-        if role == 'admin':
-            return Appointment.objects.all()  # Admins see all appointments
-        elif role == 'staff':
-            return Appointment.objects.filter(staff=user)  # Staff see their assigned appointments
-        elif role == 'client':
-            return Appointment.objects.filter(user=user)  # Clients see their own appointments
-        return Appointment.objects.none()  # Default to no access if role is undefined
+        return appointments_for_profile(profile)
     
     def put(self, request, *args, **kwargs):
         """
@@ -102,34 +183,271 @@ class AppointmentDetailView(generics.RetrieveUpdateDestroyAPIView):
         """
         
         appointment_id = kwargs.get("pk")  # Get the appointment ID from the URL
-        print("Updating Appointment ID:", appointment_id) # Debugging
-        print("Request Data:", request.data) # Debugging the payload
+        logger.debug("Updating appointment %s", appointment_id)
         
         # Validate Data
         try:
             serializer = self.get_serializer(data=request.data)
             serializer.is_valid(raise_exception=True)
-            print("Validated Data:", serializer.validated_data)
         except Exception as e:
-            print("Validation Error:", str(e))
+            logger.info("Appointment %s update rejected: %s", appointment_id, e)
             return Response({"error": str(e)}, status=400)
         
-        # Check profile and role
+        # Check profile and role (already verified during authentication)
         try:
             profile = validate_token(self.request)  # Returns a Profile object
             role = profile.role  # Directly access the role attribute
-            print("Profile Role:", role)
         except Exception as e:
-            print("Error fetching Profile or Role:", str(e))
+            logger.warning("Could not resolve profile for appointment %s update: %s", appointment_id, e)
             return Response({"error": "Invalid user profile or role."}, status=403)
 
         # Call the parent PUT method to perform the update
         try:
             return super().put(request, *args, **kwargs)
+        except ValidationError:
+            raise  # e.g. a staff scheduling conflict; return it as a 400
         except Exception as e:
-            print("Error during PUT:", str(e))
+            logger.exception("Error updating appointment %s", appointment_id)
             return Response({"error": str(e)}, status=500)
 
+@async_api_view(permission_classes=[permissions.IsAuthenticated])
+async def appointment_detail_async(request, pk):
+    """
+    Async GET for AppointmentDetailView. The role-scoped queryset already
+    limits each role to the appointments IsAdminOrOwner would allow.
+    """
+    identity = await aget_request_identity(request)
+    if identity.profile is None:
+        raise PermissionDenied(f"Profile not found for UID: {identity.uid}")
+
+    appointment = await appointments_for_profile(identity.profile).filter(pk=pk).afirst()
+    if appointment is None:
+        raise NotFound("No Appointment matches the given query.")
+    return JsonResponse(AppointmentSerializer(appointment).data)
+
+class BulkAppointmentView(APIView):
+    """
+    API view to create, update or cancel many appointments in one request.
+    Accepts {"operations": [{"op": "create" | "update" | "cancel", "id": ..., "data": {...}}],
+    "atomic": true} and returns one result per operation. With "atomic"
+    (the default) nothing is written unless every operation is valid.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        profile = validate_token(request)
+        operations = request.data.get("operations")
+        if not isinstance(operations, list) or not operations:
+            return Response({"error": "'operations' must be a non-empty list."}, status=status.HTTP_400_BAD_REQUEST)
+        max_operations = settings.BULK_APPOINTMENT_MAX_OPERATIONS
+        if len(operations) > max_operations:
+            return Response(
+                {"error": f"At most {max_operations} operations are allowed per request."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        processor = BulkAppointmentProcessor(profile, appointments_for_profile(profile))
+        results, written = processor.process(operations, atomic=request.data.get("atomic", True) is not False)
+        return Response(
+            {"results": results},
+            status=status.HTTP_200_OK if written else status.HTTP_400_BAD_REQUEST,
+        )
+
+class AppointmentChangesView(APIView):
+    """
+    API view for incremental sync of the caller's appointment list.
+    ``?since=<watermark>`` returns the appointments created or updated
+    since then and the ids of those deleted or reassigned away; without it,
+    every visible appointment. Returns {"changed": [...], "deleted": [ids],
+    "watermark": ..., "has_more": bool}. Pass the watermark back as
+    ``since`` on the next sync, straight away while ``has_more`` is set.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination  # For its ?page_size= handling
+
+    def get(self, request, *args, **kwargs):
+        profile = validate_token(request)
+        since = request.query_params.get("since") or None
+        if since is not None:
+            try:
+                since = decode_watermark(since)
+            except ValueError:
+                raise ValidationError({"since": "Must be a watermark returned by this endpoint."})
+            # Older tombstones are pruned, so deletions before then are unknown
+            if since < timezone.now() - timedelta(days=settings.CHANGE_FEED_RETENTION_DAYS):
+                return Response(
+                    {"error": "The watermark has expired; sync again without 'since'."}, status=status.HTTP_410_GONE
+                )
+
+        limit = self.pagination_class().get_page_size(request)
+        changes = changes_since(appointments_for_profile(profile), tombstones_for_profile(profile), since, limit)
+        return Response({
+            "changed": AppointmentSerializer(changes["changed"], many=True).data,
+            "deleted": changes["deleted"],
+            "watermark": encode_watermark(changes["watermark"]),
+            "has_more": changes["has_more"],
+        })
+
+@async_api_view(permission_classes=[permissions.IsAuthenticated])
+async def appointment_events_async(request):
+    """
+    Server-Sent Events stream (ASGI only) of "created", "updated" and
+    "deleted" events for the appointments the caller can see. Events carry
+    the id and status; fetch the rows from the change feed. After a
+    "resync" event, or on reconnecting, sync from the change feed.
+    """
+    identity = await aget_request_identity(request)
+    if identity.profile is None:
+        raise PermissionDenied(f"Profile not found for UID: {identity.uid}")
+    try:
+        subscription = get_hub().subscribe(identity.profile.user_id, channels_for_profile(identity.profile))
+    except TooManySubscriptions:
+        raise Throttled(detail="Too many open event streams for this user.")
+
+    stream = EventStream(subscription, heartbeat=settings.EVENTS_HEARTBEAT, max_age=settings.EVENTS_MAX_AGE)
+    response = StreamingHttpResponse(stream, content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # Stop nginx from buffering the stream
+    return response
+
+class AppointmentExportView(APIView):
+    """
+    API view streaming every appointment to admins as CSV, NDJSON or
+    Parquet (``/appointments/export.<format>``), filtered like the list
+    (?status=, ?from=, ?to=, ?staff=). Rows are read in chunks of
+    EXPORT_CHUNK_SIZE through a server-side cursor and sent as they are
+    encoded, so memory use does not grow with the row count.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, export_format, *args, **kwargs):
+        profile = validate_token(request)
+        if profile.role != 'admin':
+            raise PermissionDenied("Only admins can export appointments.")
+        if export_format not in ENCODERS:
+            raise NotFound(f"Unknown export format; choose from {', '.join(ENCODERS)}.")
+        # Checked before streaming: once the response starts, errors cannot reach the client
+        if settings.EXPORT_CHUNK_SIZE < 1:
+            raise ImproperlyConfigured("EXPORT_CHUNK_SIZE must be at least 1.")
+
+        queryset = AppointmentFilterBackend().filter_queryset(request, Appointment.objects.all(), self)
+        encoder = ENCODERS[export_format]()
+        # Under ASGI a sync iterator would be read whole before sending
+        stream = aexport_stream if settings.ASYNC_VIEWS else export_stream
+        response = StreamingHttpResponse(
+            stream(queryset, encoder, settings.EXPORT_CHUNK_SIZE), content_type=encoder.content_type
+        )
+        filename = f"appointments-{timezone.localdate():%Y%m%d}.{encoder.extension}"
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
+
+def date_param(params, name, default):
+    """
+    The date in query parameter ``name``, or ``default`` when absent.
+    """
+    if not params.get(name):
+        return default
+    try:
+        return parse_and_validate_date(params[name])
+    except ValidationError:
+        raise ValidationError({name: "Date must be in MM-DD-YYYY or YYYY-MM-DD format."})
+
+class AppointmentSummaryView(APIView):
+    """
+    API view of appointment counts per day, staff member and status, read
+    from the precomputed daily summary rather than the appointments.
+    Query parameters:
+    - ``from`` / ``to``: inclusive date range (defaults to today only)
+    - ``staff``: a staff user id, or ``none`` for unassigned appointments
+    - ``group_by``: comma-separated subset of ``day``, ``staff`` and ``status`` (default all three)
+    Admins see every staff member's counts, staff only their own.
+    Returns {"from": ..., "to": ..., "results": [{"date", "staff", "status", "count"}]}.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        profile = validate_token(request)
+        if profile.role not in ('admin', 'staff'):
+            raise PermissionDenied("Only admins and staff can view appointment summaries.")
+        params = request.query_params
+
+        start = date_param(params, "from", timezone.localdate())
+        end = date_param(params, "to", start)
+        if end < start:
+            raise ValidationError({"to": "Must be on or after 'from'."})
+        if (end - start).days >= settings.SUMMARY_MAX_DAYS:
+            raise ValidationError({"to": f"The range can span at most {settings.SUMMARY_MAX_DAYS} days."})
+
+        group_by = params.get("group_by", ",".join(SUMMARY_GROUPS))
+        group_by = [name.strip() for name in group_by.split(",") if name.strip()]
+        unknown = [name for name in group_by if name not in SUMMARY_GROUPS]
+        if unknown:
+            raise ValidationError({"group_by": f"Choose from {', '.join(SUMMARY_GROUPS)}."})
+
+        staff = params.get("staff")
+        if profile.role == 'staff':
+            staff_id = profile.user_id  # Staff only see their own counts
+        elif staff == "none":
+            staff_id = UNASSIGNED_STAFF
+        elif staff:
+            if not staff.isdigit():
+                raise ValidationError({"staff": "Must be a staff user id or 'none'."})
+            staff_id = int(staff)
+        else:
+            staff_id = None
+
+        results = summarize(start, end, list(dict.fromkeys(group_by)), staff_id=staff_id)
+        return Response({"from": start.isoformat(), "to": end.isoformat(), "results": results})
+
+class AvailabilityView(APIView):
+    """
+    API view to search open booking slots.
+    Query parameters:
+    - ``staff``: comma-separated staff user ids (required)
+    - ``from`` / ``to``: inclusive date range (defaults to today only)
+    - ``duration``: booking length in minutes (default 30)
+    - ``step``: minutes between candidate start times
+    Returns {"duration": ..., "results": [{"staff", "date", "slots": ["HH:MM", ...]}]}.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_int(self, params, name, default, minimum, maximum):
+        value = params.get(name)
+        if value in (None, ""):
+            return default
+        if not value.isdigit() or not minimum <= int(value) <= maximum:
+            raise ValidationError({name: f"Must be a whole number from {minimum} to {maximum}."})
+        return int(value)
+
+    def get(self, request, *args, **kwargs):
+        params = request.query_params
+        try:
+            staff_ids = sorted({int(staff_id) for staff_id in params.get("staff", "").split(",") if staff_id.strip()})
+        except ValueError:
+            raise ValidationError({"staff": "Must be a comma-separated list of staff user ids."})
+        if not staff_ids:
+            raise ValidationError({"staff": "This field is required."})
+        if len(staff_ids) > settings.AVAILABILITY_MAX_STAFF:
+            raise ValidationError({"staff": f"At most {settings.AVAILABILITY_MAX_STAFF} staff members per request."})
+
+        start = date_param(params, "from", timezone.localdate())
+        end = date_param(params, "to", start)
+        if end < start:
+            raise ValidationError({"to": "Must be on or after 'from'."})
+        if (end - start).days >= settings.AVAILABILITY_MAX_DAYS:
+            raise ValidationError({"to": f"The range can span at most {settings.AVAILABILITY_MAX_DAYS} days."})
+        duration = self.get_int(params, "duration", DEFAULT_DURATION_MINUTES, 1, MAX_DURATION_MINUTES)
+        step = self.get_int(params, "step", settings.AVAILABILITY_SLOT_STEP, 1, MAX_DURATION_MINUTES)
+
+        known = set(Profile.objects.filter(user_id__in=staff_ids, role='staff').values_list('user_id', flat=True))
+        unknown = [staff_id for staff_id in staff_ids if staff_id not in known]
+        if unknown:
+            raise ValidationError({"staff": f"Staff member not found: {', '.join(map(str, unknown))}."})
+
+        days = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+        results = find_open_slots(Appointment.objects.all(), staff_ids, days, duration, step)
+        return Response({"duration": duration, "results": results})
+
 # Path to your Firebase credentials JSON file
 try:
     get_app()
@@ -143,4 +461,4 @@ except ValueError:
     cred = credentials.Certificate(json.loads(firebase_credentials))
     initialize_app(cred)
 
-print("Firebase Initialized Successfully")
\ No newline at end of file
+logger.info("Firebase initialized")
\ No newline at end of file
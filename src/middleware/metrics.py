@@ -0,0 +1,64 @@
+from time import perf_counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from src.core.metrics import collect_timings, instrument_queries, observe_request, server_timing
+
+KNOWN_METHODS = {"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"}
+UNMATCHED_VIEW = "<unmatched>"
+
+
+def install_query_instrumentation(connection, **kwargs):
+    # First in the list, so Django's execute_wrapper() blocks, which pop the
+    # last wrapper on exit, never remove it
+    if instrument_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, instrument_queries)
+
+
+class MetricsMiddleware:
+    """
+    Records wall time, database queries and time, Firebase time and
+    serializer time per view into the histograms served at /metrics, and
+    reports the request's own numbers in a Server-Timing header when
+    METRICS_SERVER_TIMING is on.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, "METRICS_ENABLED", True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.server_timing = getattr(settings, "METRICS_SERVER_TIMING", False)
+        connection_created.connect(install_query_instrumentation, dispatch_uid="metrics-query-instrumentation")
+        for connection in connections.all(initialized_only=True):
+            install_query_instrumentation(connection)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        start = perf_counter()
+        with collect_timings() as timings:
+            response = self.get_response(request)
+        return self.finish(request, response, perf_counter() - start, timings)
+
+    async def __acall__(self, request):
+        start = perf_counter()
+        with collect_timings() as timings:
+            response = await self.get_response(request)
+        return self.finish(request, response, perf_counter() - start, timings)
+
+    def finish(self, request, response, seconds, timings):
+        match = request.resolver_match
+        view = match.route if match is not None else UNMATCHED_VIEW
+        method = request.method if request.method in KNOWN_METHODS else "OTHER"
+        observe_request(view, method, response.status_code, seconds, timings)
+        if self.server_timing:
+            response["Server-Timing"] = server_timing(seconds, timings)
+        return response
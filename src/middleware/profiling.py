@@ -0,0 +1,69 @@
+import cProfile
+import logging
+import random
+import threading
+from time import perf_counter
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from src.core.profiling import PROFILE_HEADER, PROFILE_ID_HEADER, get_profile_store, is_valid_profile_token
+
+logger = logging.getLogger(__name__)
+
+# One capture at a time: on Python 3.12+ cProfile uses the interpreter-wide
+# sys.monitoring, so a second profiler in another thread fails to enable.
+_capture_lock = threading.Lock()
+
+
+class ProfilingMiddleware:
+    """
+    Runs a sampled fraction of requests (PROFILING_SAMPLE_RATE), and any
+    request carrying a valid signed X-Profile header, under cProfile.
+    Sampled profiles are kept when the request took at least
+    PROFILING_SLOW_MS; header-triggered ones always are, and their file
+    name is returned in X-Profile-Id. Summarise them with
+    ``python manage.py profiles``.
+
+    Removed from the middleware chain unless PROFILING_ENABLED is set. It
+    is sync only: under ASGI, Django runs it in a thread, so enable it for
+    investigations rather than permanently. Requests arriving while
+    another request is being profiled run unprofiled.
+    """
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = settings.PROFILING_SAMPLE_RATE
+        self.slow_seconds = settings.PROFILING_SLOW_MS / 1000
+        self.store = get_profile_store()
+
+    def __call__(self, request):
+        forced = PROFILE_HEADER in request.headers and is_valid_profile_token(request.headers[PROFILE_HEADER])
+        if not forced and (self.sample_rate <= 0 or random.random() >= self.sample_rate):
+            return self.get_response(request)
+
+        if not _capture_lock.acquire(blocking=False):
+            return self.get_response(request)
+        try:
+            profiler = cProfile.Profile()
+            start = perf_counter()
+            profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.disable()
+            seconds = perf_counter() - start
+        finally:
+            _capture_lock.release()
+
+        if forced or seconds >= self.slow_seconds:
+            try:
+                name = self.store.save(profiler, request.method, request.path, seconds)
+            except OSError:
+                logger.exception("Could not save request profile")
+            else:
+                if forced:
+                    response[PROFILE_ID_HEADER] = name
+        return response
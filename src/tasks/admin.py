@@ -0,0 +1,8 @@
+from django.contrib import admin
+from .models import Task
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ("id", "name", "status", "attempts", "run_after", "created_at")  # Columns to display
+    search_fields = ("name", "last_error")  # Enable search
+    list_filter = ("status", "name")  # Add filter options
@@ -0,0 +1,100 @@
+import logging
+from datetime import timedelta
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from src.tasks.models import Task
+
+logger = logging.getLogger(__name__)
+
+
+class DatabaseBroker:
+    """
+    Stores tasks in the tasks_task table. Workers claim due tasks with a
+    conditional UPDATE, so two workers never run the same task; on
+    PostgreSQL the candidate rows are also locked with SKIP LOCKED so
+    concurrent workers do not contend for the same rows.
+    """
+
+    def push(self, name, args, kwargs, max_attempts=None, unique=False):
+        if unique:
+            # A task already running may have read the old data, so only
+            # queued ones count as duplicates
+            queued = Task.objects.filter(name=name, args=args, kwargs=kwargs, status=Task.QUEUED).first()
+            if queued is not None:
+                return queued
+        return Task.objects.create(
+            name=name,
+            args=args,
+            kwargs=kwargs,
+            max_attempts=max_attempts or settings.TASKS_MAX_ATTEMPTS,
+        )
+
+    def _claimable(self, now):
+        # Running tasks whose lock expired belong to a worker that died mid-task
+        stale = now - timedelta(seconds=settings.TASKS_LOCK_TIMEOUT)
+        return Q(status=Task.QUEUED, run_after__lte=now) | Q(status=Task.RUNNING, locked_at__lt=stale)
+
+    def claim(self, worker_id, limit):
+        """
+        Marks up to ``limit`` due tasks as running for ``worker_id`` and
+        returns them, oldest first.
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            candidates = Task.objects.filter(self._claimable(now)).order_by("run_after", "id")
+            if connection.features.has_select_for_update_skip_locked:
+                candidates = candidates.select_for_update(skip_locked=True)
+            ids = list(candidates.values_list("pk", flat=True)[:limit])
+            if not ids:
+                return []
+            Task.objects.filter(self._claimable(now), pk__in=ids).update(
+                status=Task.RUNNING, locked_by=worker_id, locked_at=now, attempts=F("attempts") + 1
+            )
+        return list(Task.objects.filter(pk__in=ids, status=Task.RUNNING, locked_by=worker_id, locked_at=now))
+
+    def complete(self, task):
+        Task.objects.filter(pk=task.pk, locked_by=task.locked_by).delete()
+
+    def retry(self, task, error, delay):
+        Task.objects.filter(pk=task.pk, locked_by=task.locked_by).update(
+            status=Task.QUEUED,
+            run_after=timezone.now() + timedelta(seconds=delay),
+            locked_by="",
+            locked_at=None,
+            last_error=error,
+        )
+
+    def fail(self, task, error):
+        Task.objects.filter(pk=task.pk, locked_by=task.locked_by).update(
+            status=Task.FAILED, locked_by="", locked_at=None, last_error=error
+        )
+
+
+class ImmediateBroker:
+    """
+    Runs each task in-process as soon as it is pushed (i.e. after commit),
+    without retries. For development setups with no worker running.
+    """
+
+    def push(self, name, args, kwargs, max_attempts=None, unique=False):
+        from src.tasks.registry import registry
+
+        try:
+            registry[name](*args, **kwargs)
+        except Exception:
+            logger.exception("Task %s failed", name)
+
+
+@lru_cache(maxsize=None)
+def _load_broker(path):
+    return import_string(path)()
+
+
+def get_broker():
+    return _load_broker(settings.TASKS_BROKER)
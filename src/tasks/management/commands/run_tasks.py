@@ -0,0 +1,30 @@
+import signal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from src.tasks.worker import Worker
+
+
+class Command(BaseCommand):
+    help = "Runs queued background tasks (see src/tasks)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--concurrency", type=int, default=settings.TASKS_CONCURRENCY, help="Tasks to run at the same time."
+        )
+        parser.add_argument("--poll-interval", type=float, default=1.0, help="Seconds to wait when the queue is empty.")
+        parser.add_argument("--once", action="store_true", help="Exit once no task is due instead of polling.")
+
+    def handle(self, *args, **options):
+        worker = Worker(concurrency=options["concurrency"], poll_interval=options["poll_interval"])
+
+        def stop(signum, frame):
+            self.stdout.write("Stopping after the current batch...")
+            worker.stop()
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+
+        self.stdout.write(f"Worker {worker.worker_id} started with concurrency {worker.concurrency}.")
+        worker.run(until_empty=options["once"])
@@ -0,0 +1,67 @@
+import json
+
+from django.db import transaction
+
+# Registered task functions by name
+registry = {}
+
+
+class TaskFunction:
+    """
+    A function registered with @task. Calling it runs it inline;
+    ``.enqueue()`` queues it for a worker once the transaction commits.
+    """
+
+    def __init__(self, func, name, max_attempts=None, unique=False):
+        self.func = func
+        self.name = name
+        self.max_attempts = max_attempts
+        self.unique = unique
+        self.__doc__ = func.__doc__
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def enqueue(self, *args, **kwargs):
+        enqueue(self.name, args, kwargs, max_attempts=self.max_attempts, unique=self.unique)
+
+    def __repr__(self):
+        return f"<task {self.name}>"
+
+
+def task(func=None, *, name=None, max_attempts=None, unique=False):
+    """
+    Registers a function as a background task. Arguments must be JSON
+    serializable, since they are stored until a worker picks the task up.
+    With ``unique``, enqueueing a call that is already queued with the same
+    arguments does nothing.
+
+        @task(max_attempts=5)
+        def send_reminder(appointment_id):
+            ...
+
+        send_reminder.enqueue(appointment.pk)
+    """
+    def register(func):
+        task_name = name or f"{func.__module__}.{func.__qualname__}"
+        if task_name in registry and registry[task_name].func is not func:
+            raise ValueError(f"A task named {task_name!r} is already registered.")
+        registry[task_name] = TaskFunction(func, task_name, max_attempts, unique)
+        return registry[task_name]
+
+    return register(func) if func is not None else register
+
+
+def enqueue(name, args=(), kwargs=None, max_attempts=None, unique=False):
+    """
+    Hands the task to the broker once the current transaction commits, so
+    a worker never sees a task for data that was rolled back. Outside a
+    transaction it is handed over immediately.
+    """
+    from src.tasks.brokers import get_broker
+
+    args, kwargs = list(args), dict(kwargs or {})
+    json.dumps([args, kwargs])  # Fail now, not after commit, on arguments that cannot be stored
+    transaction.on_commit(
+        lambda: get_broker().push(name, args, kwargs, max_attempts=max_attempts, unique=unique)
+    )
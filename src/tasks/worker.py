@@ -0,0 +1,91 @@
+import logging
+import os
+import socket
+import threading
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, connections
+
+from src.tasks.brokers import get_broker
+from src.tasks.registry import registry
+
+logger = logging.getLogger(__name__)
+
+
+class Worker:
+    """
+    Claims due tasks from the broker and runs up to ``concurrency`` of them
+    at a time on a thread pool. A failing task is retried with exponential
+    backoff until it has used ``max_attempts``, then marked failed.
+    """
+
+    def __init__(self, broker=None, concurrency=1, poll_interval=1.0, worker_id=None):
+        self.broker = broker or get_broker()
+        self.concurrency = max(concurrency, 1)
+        self.poll_interval = poll_interval
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.stopping = threading.Event()
+
+    def retry_delay(self, attempts):
+        return settings.TASKS_RETRY_DELAY * 2 ** (attempts - 1)
+
+    def execute(self, task):
+        """
+        Runs one claimed task and records the outcome with the broker.
+        """
+        function = registry.get(task.name)
+        try:
+            if function is None:
+                raise LookupError(f"No task registered as {task.name!r}")
+            function(*task.args, **task.kwargs)
+        except Exception:
+            error = traceback.format_exc()
+            if function is not None and task.attempts < task.max_attempts:
+                delay = self.retry_delay(task.attempts)
+                logger.warning("Task %s (%s) failed, retrying in %ss", task.pk, task.name, delay)
+                self.broker.retry(task, error, delay)
+            else:
+                logger.error("Task %s (%s) failed permanently", task.pk, task.name)
+                self.broker.fail(task, error)
+            return False
+        self.broker.complete(task)
+        return True
+
+    def _execute_in_thread(self, task):
+        close_old_connections()
+        try:
+            return self.execute(task)
+        finally:
+            connections.close_all()
+
+    def run_once(self, pool=None):
+        """
+        Claims and runs one batch of up to ``concurrency`` tasks. Returns
+        the number of tasks claimed.
+        """
+        tasks = self.broker.claim(self.worker_id, self.concurrency)
+        if pool is None or len(tasks) <= 1:
+            for task in tasks:
+                self.execute(task)
+        else:
+            list(pool.map(self._execute_in_thread, tasks))
+        return len(tasks)
+
+    def run(self, until_empty=False):
+        """
+        Processes tasks until stop() is called, or until no task is due
+        when ``until_empty`` is set.
+        """
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="task-worker") as pool:
+            while not self.stopping.is_set():
+                if self.run_once(pool if self.concurrency > 1 else None):
+                    continue
+                if until_empty:
+                    break
+                self.stopping.wait(self.poll_interval)
+
+    def stop(self):
+        self.stopping.set()
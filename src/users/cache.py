@@ -0,0 +1,91 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from src.core.conditional import PROFILE, bump_versions
+from src.users.models import Profile
+
+
+def _cache():
+    return caches[getattr(settings, "PROFILE_CACHE_ALIAS", "default")]
+
+
+def _timeout():
+    return getattr(settings, "PROFILE_CACHE_TIMEOUT", 300)
+
+
+def _uid_key(firebase_uid):
+    return f"profile:uid:{firebase_uid}"
+
+
+def _user_key(user_id):
+    return f"profile:user:{user_id}"
+
+
+def cache_profile(profile):
+    """
+    Stores the profile (with its user) under both lookup keys.
+    """
+    _cache().set_many(
+        {_uid_key(profile.firebase_uid): profile, _user_key(profile.user_id): profile},
+        _timeout(),
+    )
+
+
+def get_profile_by_uid(firebase_uid):
+    """
+    Returns the Profile for a Firebase UID, or None. Hits the database
+    only on a cache miss.
+    """
+    profile = _cache().get(_uid_key(firebase_uid))
+    if profile is None:
+        profile = Profile.objects.select_related("user").filter(firebase_uid=firebase_uid).first()
+        if profile is not None:
+            cache_profile(profile)
+    return profile
+
+
+async def aget_profile_by_uid(firebase_uid):
+    """
+    Async variant of get_profile_by_uid.
+    """
+    profile = await _cache().aget(_uid_key(firebase_uid))
+    if profile is None:
+        profile = await Profile.objects.select_related("user").filter(firebase_uid=firebase_uid).afirst()
+        if profile is not None:
+            await _cache().aset_many(
+                {_uid_key(profile.firebase_uid): profile, _user_key(profile.user_id): profile},
+                _timeout(),
+            )
+    return profile
+
+
+def get_profile_by_user_id(user_id):
+    """
+    Returns the Profile for a Django user id, or None. Hits the database
+    only on a cache miss.
+    """
+    profile = _cache().get(_user_key(user_id))
+    if profile is None:
+        profile = Profile.objects.select_related("user").filter(user_id=user_id).first()
+        if profile is not None:
+            cache_profile(profile)
+    return profile
+
+
+def invalidate_profile(firebase_uid=None, user_id=None):
+    """
+    Drops cached entries now and again once the surrounding transaction
+    commits, so a concurrent reader cannot re-cache the pre-commit row.
+    Also changes the user's profile ETags.
+    """
+    bump_versions([(PROFILE, user_id)])
+    keys = []
+    if firebase_uid:
+        keys.append(_uid_key(firebase_uid))
+    if user_id:
+        keys.append(_user_key(user_id))
+    if not keys:
+        return
+    _cache().delete_many(keys)
+    transaction.on_commit(lambda: _cache().delete_many(keys))
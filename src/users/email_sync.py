@@ -0,0 +1,71 @@
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.contrib.auth.models import User
+from firebase.instrumented import auth as firebase_auth
+
+from src.users.cache import invalidate_profile
+from src.users.models import Profile
+
+logger = logging.getLogger(__name__)
+
+# Stand-in address for users whose email is not known yet. Profile.email is
+# unique, so it is derived from the UID; ".invalid" can never be delivered.
+PLACEHOLDER_EMAIL_DOMAIN = "users.invalid"
+
+_current_claims = ContextVar("firebase_claims", default=None)
+
+
+@contextmanager
+def firebase_claims(claims):
+    """
+    Makes already-verified token claims available to the User signals for
+    saves inside the block, so they need not ask Firebase for the email.
+    """
+    token = _current_claims.set(claims)
+    try:
+        yield
+    finally:
+        _current_claims.reset(token)
+
+
+def claims_email(user):
+    """
+    The email from the current token claims, if they belong to ``user``.
+    """
+    claims = _current_claims.get()
+    if claims and claims.get("uid", claims.get("sub")) == user.username:
+        return claims.get("email") or None
+    return None
+
+
+def placeholder_email(firebase_uid):
+    return f"{firebase_uid}@{PLACEHOLDER_EMAIL_DOMAIN}"
+
+
+def has_placeholder_email(profile):
+    """
+    True while the profile has no real email yet.
+    """
+    return not profile.email or profile.email == placeholder_email(profile.firebase_uid)
+
+
+def sync_email(firebase_uid):
+    """
+    Copies the Firebase account's email onto the User and Profile. Uses
+    queryset updates, so the User signals do not fire again.
+    """
+    try:
+        firebase_user = firebase_auth.get_user(firebase_uid)
+    except firebase_auth.UserNotFoundError:
+        logger.warning("Firebase user not found for UID: %s", firebase_uid)
+        return
+    email = firebase_user.email
+    user_id = User.objects.filter(username=firebase_uid).values_list("pk", flat=True).first()
+    if not email or user_id is None:
+        return
+    updated = User.objects.filter(pk=user_id).exclude(email=email).update(email=email)
+    updated += Profile.objects.filter(user_id=user_id).exclude(email=email).update(email=email)
+    if updated:
+        invalidate_profile(firebase_uid=firebase_uid, user_id=user_id)
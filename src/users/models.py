@@ -25,4 +25,11 @@ class Profile(models.Model):
 
 
     def __str__(self):
-        return self.user.username
\ No newline at end of file
+        return self.user.username
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored UID so changing it also drops the profile cached under the old one
+        instance._loaded_firebase_uid = instance.__dict__.get("firebase_uid")
+        return instance
\ No newline at end of file
@@ -1,8 +1,9 @@
 from rest_framework import serializers
 from src.users.models import Profile
 from src.core.utils import validate_phone_number_format, validate_unique_email
+from src.core.metrics import TimedSerializerMixin
 
-class ProfileSerializer(serializers.ModelSerializer):
+class ProfileSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Profile
         fields = ['first_name', 'last_name', 'email', 'phone_number', 'role', 'firebase_uid', 'user', 'profile_completed']
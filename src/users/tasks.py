@@ -0,0 +1,25 @@
+from src.tasks.registry import task
+from src.users.cache import invalidate_profile
+from src.users.email_sync import sync_email
+from src.users.models import Profile
+
+PROFILE_REQUIRED_FIELDS = ("first_name", "last_name", "phone_number")
+
+
+@task(max_attempts=5, unique=True)
+def sync_firebase_email(firebase_uid):
+    """
+    Copies the email from the user's Firebase account.
+    """
+    sync_email(firebase_uid)
+
+
+@task(unique=True)
+def refresh_profile_completion(user_id):
+    """
+    Marks the profile complete once all required fields are filled.
+    """
+    profile = Profile.objects.filter(user_id=user_id, profile_completed=False).first()
+    if profile and all(getattr(profile, field) for field in PROFILE_REQUIRED_FIELDS):
+        Profile.objects.filter(pk=profile.pk).update(profile_completed=True)
+        invalidate_profile(firebase_uid=profile.firebase_uid, user_id=user_id)
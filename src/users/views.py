@@ -1,101 +1,41 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework.exceptions import NotAuthenticated
+from rest_framework.exceptions import NotAuthenticated, PermissionDenied
 from rest_framework import generics, permissions, status
-from firebase_admin.auth import get_user
-from firebase_admin import auth as firebase_auth
-from django.contrib.auth.models import User
 
 from src.users.models import Profile
 from src.users.serializers import ProfileSerializer
+from src.core.conditional import finish_conditional, not_modified, profile_etag
+from src.core.identity import get_request_profile
+from src.core.utils import get_request_identity
+from src.users.email_sync import firebase_claims
+import logging
 
-# View for creating user profiles
-class CreateProfileView(APIView):
-    """
-    API view to create user profiles.
-    Only admins can create profiles for other users.
-    """
-    permission_classes = [permissions.IsAuthenticated]  # Ensure the user is authenticated
-
-    def post(self, request, *args, **kwargs):
-        try:
-            # Log headers and payload
-            print("Request recieved at CreateProfileView")
-            print("Request Data:", request.data)
-
-            # Extract and verify Firebase token
-            auth_header = request.headers.get("Authorization", "")
-            if not auth_header.startswith("Bearer "):
-                return Response({"error": "Invalid Authorization header format"}, status=status.HTTP_400_BAD_REQUEST)
-            
-            # Extract and verify Firebase token from the Authorization header
-            token = auth_header.split(" ")[1]
-            decoded_token = firebase_auth.verify_id_token(token)
-            firebase_uid = decoded_token.get("uid")
-            print("Decoded Token:", decoded_token)
-
-            # Check email verification status
-            firebase_user = get_user(firebase_uid)
-            if not firebase_user.email_verified:
-                return Response({"error": "Please verify your email before logging in."}, status=status.HTTP_400_BAD_REQUEST)
-
-            # Extract email, password, and role from request data
-            email = request.data.get("email")
-            password = request.data.get("password")
-            role = request.data.get("role", "client")  # Default role is 'client'
-
-            if not email or not password:
-                return Response({"error": "Email and password are required"}, status=status.HTTP_400_BAD_REQUEST)
-
-            # Check if the user already exists
-            if User.objects.filter(username=firebase_uid).exists():
-                return Response(
-                    {"error": "A user with this Firebase UID already exists."},
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
-
-            # Create Django user
-            new_user = User.objects.create_user(
-                username=firebase_uid, # Firebase UID as the username
-                password=password,
-                email=email,
-            )
-
-            # Create profile
-            profile = Profile.objects.create(
-                user=new_user,
-                role=role,
-                firebase_uid=firebase_uid,
-            )
-
-            # Validate the request data and create the profile
-            serializer = ProfileSerializer(profile)
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
-    
-        except ValueError as e:
-            print("Firebase Authentication Error:", str(e))  # Debug log for Firebase auth errors
-            return Response({"error": f"Firebase validation error: {str(e)}"}, status=status.HTTP_401_UNAUTHORIZED)
-
-        except Exception as e:
-            print("General Error:", str(e))  # Debug log for general errors
-            return Response({"error": "An unexpected error occurred. Please try again later."}, status=status.HTTP_400_BAD_REQUEST)
+logger = logging.getLogger(__name__)
 
 class ProfileView(APIView):
     """
-    API view to retrieve the logged-in user's profile.
+    API view to retrieve the logged-in user's profile. Answers 304 to a
+    matching If-None-Match without serializing the profile.
     """
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
         try:
             # Fetch the profile for the logged-in user
-            profile = request.user.profile  # Assuming a OneToOneField relationship to Profile
+            profile = get_request_profile(request)
+            if profile is None:
+                raise Profile.DoesNotExist
+            etag = profile_etag(request, profile)
+            response = not_modified(request, etag)
+            if response is not None:
+                return response
             serializer = ProfileSerializer(profile)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            return finish_conditional(Response(serializer.data, status=status.HTTP_200_OK), etag)
         except Profile.DoesNotExist:
             return Response({"error": "Profile not found."}, status=status.HTTP_404_NOT_FOUND)
-        except Exception as e:
-            print("General Error:", str(e))  # Debug log for general errors
+        except Exception:
+            logger.exception("Unexpected error in ProfileView")
             return Response({"error": "An unexpected error occurred. Please try again later."},status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 class UpdateProfileView(generics.RetrieveUpdateAPIView):
@@ -119,22 +59,24 @@ class UpdateProfileView(generics.RetrieveUpdateAPIView):
                 return Profile.objects.get(pk=pk)
             except Profile.DoesNotExist:
                 raise NotAuthenticated("Profile not found.")
-        return self.request.user.profile
+        profile = get_request_profile(self.request)
+        if profile is None:
+            raise NotAuthenticated("Profile not found.")
+        return profile
     
     def patch(self, request, *args, **kwargs):
-        auth_header = request.headers.get("Authorization")
-        if not auth_header or not auth_header.startswith("Bearer "):
-            return Response({"error": "Missing or invalid Authorization header"}, status=403)
-
-        token = auth_header.split("Bearer ")[1]
+        try:
+            identity = get_request_identity(request)
+        except PermissionDenied as e:
+            return Response({"error": str(e.detail)}, status=403)
 
         try:
-            # Verify Firebase token
-            decoded_token = firebase_auth.verify_id_token(token)
-            uid = decoded_token["uid"]
+            decoded_token = identity.claims
 
-            # Fetch the user's profile
-            profile = Profile.objects.get(firebase_uid=uid)
+            # Use the profile loaded during authentication
+            profile = identity.profile
+            if profile is None:
+                raise Profile.DoesNotExist
 
             # Update the email field with Firebase email
             profile.email = decoded_token.get("email", "")
@@ -149,13 +91,10 @@ class UpdateProfileView(generics.RetrieveUpdateAPIView):
                 user.first_name = updated_profile.first_name
                 user.last_name = updated_profile.last_name
                 user.email = updated_profile.email  # Ensure Firebase email is stored
-                user.save()  # Save User model updates
+                with firebase_claims(decoded_token):
+                    user.save()  # Save User model updates
 
-                # Check if profile is complete
-                required_fields = ["first_name", "last_name", "phone_number"]
-                if all(getattr(updated_profile, field, None) for field in required_fields):
-                    updated_profile.profile_completed = True
-                    updated_profile.save()
+                # ProfileSerializer.update has already set profile_completed
 
                 return Response(serializer.data, status=status.HTTP_200_OK)
 
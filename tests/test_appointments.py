@@ -0,0 +1,783 @@
+import csv
+import json
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import AsyncRequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+import numpy as np
+import pyarrow.parquet
+from asgiref.sync import sync_to_async
+
+from firebase.token_cache import token_cache
+from src.core.metrics import registry
+from src.healthcare.availability import merge_intervals
+from src.healthcare.models import Appointment, AppointmentDailySummary, AppointmentTombstone
+from src.healthcare.scheduling import find_batch_conflicts
+from src.healthcare.summary import UNASSIGNED_STAFF, actual_counts, reconcile_summaries
+from src.healthcare.views import appointment_detail_async, appointment_list_async
+from src.users.models import Profile
+
+
+def fake_verify_id_token(token, check_revoked=False):
+    """
+    Accepts tokens of the form ``test:<uid>``.
+    """
+    uid = token.split(":", 1)[1]
+    now = int(time.time())
+    return {"uid": uid, "sub": uid, "email": f"{uid}@example.com", "iat": now, "exp": now + 3600}
+
+
+def fake_get_user(uid):
+    return mock.Mock(uid=uid, email=f"{uid}@example.com", email_verified=True, disabled=False)
+
+
+class AppointmentTestCase(TestCase):
+    def setUp(self):
+        for target, fake in (
+            ("firebase_admin.auth.verify_id_token", fake_verify_id_token),
+            ("firebase_admin.auth.get_user", fake_get_user),
+        ):
+            patcher = mock.patch(target, fake)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        token_cache.clear()
+        cache.clear()
+
+        self.client_user = self.create_user("client-1", "client")
+        self.staff_user = self.create_user("staff-1", "staff")
+        self.admin_user = self.create_user("admin-1", "admin")
+        self.api = APIClient()
+
+    def create_user(self, uid, role):
+        user = User.objects.create(username=uid, email=f"{uid}@example.com")
+        Profile.objects.filter(user=user).update(role=role)
+        return user
+
+    def authenticate(self, user):
+        self.api.credentials(HTTP_AUTHORIZATION=f"Bearer test:{user.username}")
+
+    def create_appointments(self, count, **kwargs):
+        # Each call books a later day by default, so the staff member stays free
+        start = kwargs.get("start") or timezone.now() + timedelta(days=1 + Appointment.objects.count())
+        appointments = [
+            Appointment(
+                title=f"Appointment {i}",
+                appointment_date=start + timedelta(hours=i),
+                time=(start + timedelta(hours=i)).time(),
+                user=kwargs.get("user", self.client_user),
+                staff=kwargs.get("staff", self.staff_user),
+            )
+            for i in range(count)
+        ]
+        for appointment in appointments:
+            appointment.update_window()
+        return Appointment.objects.bulk_create(appointments)
+
+
+class AppointmentListQueryCountTests(AppointmentTestCase):
+    """
+    Guards against N+1 queries: listing appointments must cost the same
+    number of queries however many rows are rendered.
+    """
+
+    def count_list_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.api.get("/api/appointments/")
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def assertConstantQueries(self, user):
+        self.authenticate(user)
+        self.count_list_queries()  # Warm the token and profile caches
+        self.create_appointments(2)
+        few = self.count_list_queries()
+        self.create_appointments(20)
+        many = self.count_list_queries()
+        self.assertEqual(few, many, "Appointment list issues a query per row")
+
+    def test_admin_list_query_count_is_constant(self):
+        self.assertConstantQueries(self.admin_user)
+
+    def test_staff_list_query_count_is_constant(self):
+        self.assertConstantQueries(self.staff_user)
+
+    def test_client_list_query_count_is_constant(self):
+        self.assertConstantQueries(self.client_user)
+
+
+class AppointmentPaginationTests(AppointmentTestCase):
+    def test_cursor_pages_cover_every_row_once_in_order(self):
+        appointments = self.create_appointments(12)
+        # Ties on appointment_date/time must still page deterministically
+        Appointment.objects.filter(pk__in=[a.pk for a in appointments[:6]]).update(
+            appointment_date=appointments[0].appointment_date, time=appointments[0].time
+        )
+        expected = list(
+            Appointment.objects.order_by("appointment_date", "time", "id").values_list("id", flat=True)
+        )
+        self.authenticate(self.admin_user)
+
+        seen, url = [], "/api/appointments/?page_size=5"
+        while url:
+            response = self.api.get(url)
+            self.assertEqual(response.status_code, 200)
+            seen.extend(item["id"] for item in response.data["results"])
+            url = response.data["next"]
+        self.assertEqual(seen, expected)
+
+        previous = self.api.get(response.data["previous"]).data
+        self.assertEqual([item["id"] for item in previous["results"]], expected[5:10])
+
+    def test_invalid_cursor_is_rejected(self):
+        self.authenticate(self.admin_user)
+        response = self.api.get("/api/appointments/?cursor=not-a-cursor")
+        self.assertEqual(response.status_code, 404)
+
+
+class AppointmentFilterTests(AppointmentTestCase):
+    def list_ids(self, query):
+        response = self.api.get(f"/api/appointments/?{query}")
+        self.assertEqual(response.status_code, 200, response.data)
+        return [item["id"] for item in response.data["results"]]
+
+    def test_filters_by_status_staff_and_date_range(self):
+        appointments = self.create_appointments(6)
+        other_staff = self.create_user("staff-2", "staff")
+        Appointment.objects.filter(pk=appointments[0].pk).update(status="cancelled")
+        Appointment.objects.filter(pk=appointments[1].pk).update(staff=other_staff)
+        Appointment.objects.filter(pk=appointments[2].pk).update(
+            appointment_date=timezone.now() + timedelta(days=40)
+        )
+        self.authenticate(self.admin_user)
+
+        self.assertEqual(self.list_ids("status=cancelled"), [appointments[0].pk])
+        self.assertEqual(self.list_ids(f"staff={other_staff.pk}"), [appointments[1].pk])
+        in_range = timezone.localdate() + timedelta(days=30)
+        self.assertNotIn(appointments[2].pk, self.list_ids(f"to={in_range.isoformat()}"))
+        self.assertEqual(self.list_ids(f"from={in_range.isoformat()}"), [appointments[2].pk])
+
+    def test_ordering_and_invalid_parameters(self):
+        appointments = self.create_appointments(3)
+        self.authenticate(self.client_user)
+        self.assertEqual(self.list_ids("ordering=-appointment_date"), [a.pk for a in reversed(appointments)])
+        second_page = self.api.get(self.api.get("/api/appointments/?ordering=-appointment_date&page_size=2").data["next"])
+        self.assertEqual([item["id"] for item in second_page.data["results"]], [appointments[0].pk])
+        self.assertEqual(self.api.get("/api/appointments/?ordering=title").status_code, 400)
+        self.assertEqual(self.api.get("/api/appointments/?from=yesterday").status_code, 400)
+
+
+class BulkAppointmentTests(AppointmentTestCase):
+    def post_bulk(self, operations, **extra):
+        return self.api.post("/api/appointments/bulk/", {"operations": operations, **extra}, format="json")
+
+    def future(self, days):
+        return (timezone.localdate() + timedelta(days=days)).isoformat()
+
+    def test_client_batch_creates_updates_and_cancels_in_one_request(self):
+        existing = self.create_appointments(2)
+        self.authenticate(self.client_user)
+        operations = [
+            {"op": "create", "data": {"title": f"Import {i}", "appointment_date": self.future(3), "time": "09:30"}}
+            for i in range(50)
+        ] + [
+            {"op": "update", "id": existing[0].pk, "data": {"title": "Moved", "appointment_date": self.future(5)}},
+            {"op": "cancel", "id": existing[1].pk},
+        ]
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post_bulk(operations)
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertLess(len(queries), 20)
+
+        statuses = [result["status"] for result in response.data["results"]]
+        self.assertEqual(statuses, ["created"] * 50 + ["updated", "cancelled"])
+        self.assertEqual(Appointment.objects.filter(user=self.client_user).count(), 52)
+        existing[0].refresh_from_db()
+        existing[1].refresh_from_db()
+        self.assertEqual(existing[0].title, "Moved")
+        self.assertGreater(existing[0].updated_at, existing[0].created_at)
+        self.assertEqual(existing[1].status, "cancelled")
+
+    def test_atomic_batch_writes_nothing_when_one_operation_is_invalid(self):
+        foreign = self.create_appointments(1, user=self.admin_user)[0]
+        self.authenticate(self.client_user)
+        response = self.post_bulk([
+            {"op": "create", "data": {"title": "Ok", "appointment_date": self.future(2), "time": "10:00"}},
+            {"op": "create", "data": {"title": "Past", "appointment_date": self.future(-2), "time": "10:00"}},
+            {"op": "cancel", "id": foreign.pk},
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([r["status"] for r in response.data["results"]], ["skipped", "error", "error"])
+        self.assertFalse(Appointment.objects.filter(title="Ok").exists())
+
+        response = self.post_bulk([
+            {"op": "create", "data": {"title": "Ok", "appointment_date": self.future(2), "time": "10:00"}},
+            {"op": "cancel", "id": foreign.pk},
+        ], atomic=False)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([r["status"] for r in response.data["results"]], ["created", "error"])
+
+
+class StaffConflictTests(AppointmentTestCase):
+    def setUp(self):
+        super().setUp()
+        start = timezone.localtime() + timedelta(days=2)
+        self.start = start.replace(hour=10, minute=0, second=0, microsecond=0)
+        self.booked = self.create_appointments(1, start=self.start)[0]  # 10:00-10:30
+        self.authenticate(self.admin_user)
+
+    def test_adjacent_windows_do_not_conflict(self):
+        end = self.booked.ends_at
+        candidates = [
+            ("before", self.staff_user.pk, self.booked.starts_at - timedelta(minutes=30), self.booked.starts_at),
+            ("after", self.staff_user.pk, end, end + timedelta(minutes=30)),
+            ("inside", self.staff_user.pk, end - timedelta(minutes=20), end - timedelta(minutes=10)),
+            ("other staff", self.admin_user.pk, self.booked.starts_at, end),
+        ]
+        self.assertEqual(find_batch_conflicts(Appointment.objects.all(), candidates), {"inside"})
+
+    def test_update_rejects_overlap_with_staff_booking(self):
+        moving = self.create_appointments(1, start=self.start + timedelta(hours=2))[0]
+        payload = {
+            "title": "Moved",
+            "appointment_date": self.start.date().isoformat(),
+            "time": "10:15",
+            "duration": 30,
+        }
+        response = self.api.put(f"/api/appointments/{moving.pk}/", payload, format="json")
+        self.assertEqual(response.status_code, 400, response.data)
+        self.assertIn("time", response.data)
+
+        payload["time"] = "10:30"
+        response = self.api.put(f"/api/appointments/{moving.pk}/", payload, format="json")
+        self.assertEqual(response.status_code, 200, response.data)
+        moving.refresh_from_db()
+        self.assertEqual(moving.starts_at, self.booked.ends_at)
+
+    def test_bulk_rejects_overlaps_with_existing_and_within_batch(self):
+        date = self.start.date().isoformat()
+
+        def create(time, **data):
+            data = {"title": time, "appointment_date": date, "time": time, "user": self.client_user.pk, **data}
+            return {"op": "create", "data": {"staff": self.staff_user.pk, **data}}
+
+        response = self.post_bulk([
+            create("10:20"),  # Overlaps the existing booking
+            create("12:00", duration=60),
+            create("12:45"),  # Overlaps the previous operation
+            create("14:00"),
+            create("10:10", staff=None),  # Unassigned bookings never conflict
+        ], atomic=False)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [r["status"] for r in response.data["results"]], ["error", "error", "error", "created", "created"]
+        )
+
+        # Moving the existing booking away frees its slot for the same batch
+        response = self.post_bulk([
+            {"op": "update", "id": self.booked.pk, "data": {"time": "15:00"}},
+            create("10:00"),
+        ])
+        self.assertEqual(response.status_code, 200, response.data)
+        self.booked.refresh_from_db()
+        self.assertEqual(timezone.localtime(self.booked.starts_at).hour, 15)
+
+    def post_bulk(self, operations, **extra):
+        return self.api.post("/api/appointments/bulk/", {"operations": operations, **extra}, format="json")
+
+
+@override_settings(AVAILABILITY_DAY_START="09:00", AVAILABILITY_DAY_END="17:00")
+class AvailabilityTests(AppointmentTestCase):
+    def setUp(self):
+        super().setUp()
+        self.day = timezone.localdate() + timedelta(days=2)
+        for hour, minute, duration in ((10, 0, 30), (10, 30, 30), (13, 0, 60)):
+            self.book(hour, minute, duration)
+        self.authenticate(self.client_user)
+
+    def book(self, hour, minute, duration=30, day=None):
+        start = timezone.make_aware(datetime.combine(day or self.day, datetime.min.time()))
+        start = start.replace(hour=hour, minute=minute)
+        return Appointment.objects.create(
+            title="Booked", appointment_date=start, time=start.time(), duration=duration,
+            user=self.client_user, staff=self.staff_user,
+        )
+
+    def slots(self, **params):
+        query = {"staff": self.staff_user.pk, "from": self.day.isoformat(), "step": 30, **params}
+        response = self.api.get("/api/appointments/availability/", query)
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data["results"]
+
+    def test_merge_intervals(self):
+        merged = merge_intervals(np.array([0, 5, 10, 30, 40]), np.array([10, 8, 20, 35, 50]))
+        self.assertEqual(merged.tolist(), [[0, 30, 40], [20, 35, 50]])
+
+    def test_lists_free_slots_around_bookings(self):
+        results = self.slots(duration=60)
+        self.assertEqual(len(results), 1)
+        self.assertEqual(
+            results[0]["slots"],
+            ["09:00", "11:00", "11:30", "12:00", "14:00", "14:30", "15:00", "15:30", "16:00"],
+        )
+        other_day = self.slots(**{"from": (self.day + timedelta(days=1)).isoformat()})
+        self.assertEqual(len(other_day[0]["slots"]), 16)
+
+    def test_cached_per_day_until_an_appointment_changes(self):
+        self.slots()
+        with CaptureQueriesContext(connection) as queries:
+            self.slots()
+        self.assertFalse([q for q in queries if "healthcare_appointment" in q["sql"]])
+
+        booked = self.book(11, 0)
+        self.assertNotIn("11:00", self.slots()[0]["slots"])
+
+        # Moving a booking to another day frees its old slot
+        booked.appointment_date += timedelta(days=1)
+        booked.save()
+        self.assertIn("11:00", self.slots()[0]["slots"])
+
+    def test_rejects_unknown_staff_and_bad_ranges(self):
+        response = self.api.get("/api/appointments/availability/", {"staff": self.client_user.pk})
+        self.assertEqual(response.status_code, 400)
+        response = self.api.get(
+            "/api/appointments/availability/",
+            {"staff": self.staff_user.pk, "from": self.day.isoformat(), "to": (self.day - timedelta(days=1)).isoformat()},
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class AsyncAppointmentViewTests(AppointmentTestCase):
+    """
+    The async read views must answer exactly like the DRF views they stand in for.
+    """
+
+    def async_get(self, view, path, user, **kwargs):
+        request = AsyncRequestFactory().get(path, headers={"Authorization": f"Bearer test:{user.username}"})
+        return view(request, **kwargs)
+
+    async def test_list_and_detail_match_sync_views(self):
+        appointments = await sync_to_async(self.create_appointments)(3)
+        path = "/api/appointments/?page_size=2&ordering=-appointment_date"
+
+        response = await self.async_get(appointment_list_async, path, self.client_user)
+        self.assertEqual(response.status_code, 200)
+        self.authenticate(self.client_user)
+        expected = await sync_to_async(self.api.get)(path)
+        self.assertEqual(json.loads(response.content), json.loads(expected.content))
+
+        response = await self.async_get(
+            appointment_detail_async, f"/api/appointments/{appointments[0].pk}/", self.client_user, pk=appointments[0].pk
+        )
+        self.assertEqual(json.loads(response.content)["id"], appointments[0].pk)
+
+    async def test_errors_are_rendered_like_drf(self):
+        appointment = (await sync_to_async(self.create_appointments)(1, user=self.admin_user))[0]
+        response = await self.async_get(
+            appointment_detail_async, f"/api/appointments/{appointment.pk}/", self.client_user, pk=appointment.pk
+        )
+        self.assertEqual(response.status_code, 404)
+
+        request = AsyncRequestFactory().get("/api/appointments/")
+        self.assertEqual((await appointment_list_async(request)).status_code, 403)
+        response = await self.async_get(appointment_list_async, "/api/appointments/?ordering=title", self.client_user)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("ordering", json.loads(response.content))
+
+
+class RequestMetricsTests(AppointmentTestCase):
+    def setUp(self):
+        super().setUp()
+        registry.clear()
+
+    @override_settings(METRICS_SERVER_TIMING=True)
+    def test_server_timing_reports_queries_and_components(self):
+        self.create_appointments(3)
+        self.authenticate(self.client_user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.api.get("/api/appointments/")
+        self.assertEqual(response.status_code, 200)
+        timing = response["Server-Timing"]
+        self.assertIn(f'desc="{len(queries)} queries"', timing)
+        self.assertIn("firebase;dur=", timing)  # Token cache miss
+        self.assertIn("serializer;dur=", timing)
+
+    def test_server_timing_is_off_by_default(self):
+        self.authenticate(self.client_user)
+        self.assertNotIn("Server-Timing", self.api.get("/api/appointments/"))
+
+    @override_settings(METRICS_TOKEN="scrape-secret")
+    def test_metrics_endpoint_exposes_per_view_histograms(self):
+        self.authenticate(self.client_user)
+        self.api.get("/api/appointments/")
+        self.api.get("/api/appointments/")
+
+        body = self.client.get("/metrics", headers={"Authorization": "Bearer scrape-secret"}).content.decode()
+        labels = 'view="api/appointments/",method="GET"'
+        self.assertIn(f'http_request_duration_seconds_count{{{labels},status="200"}} 2', body)
+        self.assertIn(f'http_request_db_queries_count{{{labels}}} 2', body)
+        self.assertIn(f'http_request_firebase_seconds_bucket{{{labels},le="+Inf"}} 2', body)
+
+    @override_settings(METRICS_TOKEN="scrape-secret")
+    def test_metrics_endpoint_requires_configured_token(self):
+        self.assertEqual(self.client.get("/metrics").status_code, 403)
+        with override_settings(METRICS_TOKEN=""):
+            self.assertEqual(self.client.get("/metrics").status_code, 404)
+        response = self.client.get("/metrics", headers={"Authorization": "Bearer scrape-secret"})
+        self.assertEqual(response.status_code, 200)
+
+
+class ConditionalGetTests(AppointmentTestCase):
+    """
+    Polling clients get a 304, decided from version counters alone, until
+    something they can see changes.
+    """
+
+    def get(self, path, etag=None):
+        headers = {"If-None-Match": etag} if etag else {}
+        return self.api.get(path, headers=headers)
+
+    def test_unchanged_list_is_not_modified_without_queries(self):
+        self.create_appointments(2)
+        self.authenticate(self.client_user)
+        etag = self.get("/api/appointments/")["ETag"]
+
+        with self.assertNumQueries(0):
+            response = self.get("/api/appointments/", etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+        self.assertNotEqual(self.get("/api/appointments/?page_size=1", etag).status_code, 304)
+
+    def test_writes_change_the_etags_of_affected_lists(self):
+        appointment = self.create_appointments(1)[0]
+        other_staff = self.create_user("staff-2", "staff")
+        etags = {}
+        for user in (self.client_user, self.staff_user, other_staff, self.admin_user):
+            self.authenticate(user)
+            etags[user.username] = self.get("/api/appointments/")["ETag"]
+
+        appointment = Appointment.objects.get(pk=appointment.pk)
+        appointment.staff = other_staff
+        appointment.save()
+
+        for user in (self.client_user, self.staff_user, other_staff, self.admin_user):
+            self.authenticate(user)
+            self.assertEqual(self.get("/api/appointments/", etags[user.username]).status_code, 200, user.username)
+
+    def test_bulk_writes_change_the_list_etag(self):
+        self.authenticate(self.client_user)
+        etag = self.get("/api/appointments/")["ETag"]
+        start = timezone.now() + timedelta(days=3)
+        self.api.post("/api/appointments/bulk/", {"operations": [{"op": "create", "data": {
+            "title": "Bulk", "appointment_date": start.date().isoformat(), "time": "10:00",
+        }}]}, format="json")
+        self.assertEqual(self.get("/api/appointments/", etag).status_code, 200)
+
+    def test_role_and_profile_change_when_the_profile_does(self):
+        self.authenticate(self.client_user)
+        role_etag = self.get("/api/auth/role/")["ETag"]
+        profile_etag = self.get("/api/users/profile/")["ETag"]
+        self.assertEqual(self.get("/api/auth/role/", role_etag).status_code, 304)
+        self.assertEqual(self.get("/api/users/profile/", profile_etag).status_code, 304)
+
+        profile = Profile.objects.get(user=self.client_user)
+        profile.first_name = "Renamed"
+        profile.save()
+        self.assertEqual(self.get("/api/auth/role/", role_etag).status_code, 200)
+        self.assertEqual(self.get("/api/users/profile/", profile_etag).status_code, 200)
+
+    async def test_async_list_shares_the_etag(self):
+        await sync_to_async(self.authenticate)(self.client_user)
+        etag = (await sync_to_async(self.get)("/api/appointments/"))["ETag"]
+        request = AsyncRequestFactory().get(
+            "/api/appointments/", headers={"Authorization": "Bearer test:client-1", "If-None-Match": etag}
+        )
+        response = await appointment_list_async(request)
+        self.assertEqual(response.status_code, 304)
+
+
+@override_settings(CHANGE_FEED_LAG=0)
+class AppointmentChangeFeedTests(AppointmentTestCase):
+    """
+    The change feed returns what changed in a caller's list since their
+    watermark, including appointments that were deleted or reassigned away.
+    """
+
+    def sync(self, user, since=None, **params):
+        self.authenticate(user)
+        if since is not None:
+            params["since"] = since
+        response = self.api.get("/api/appointments/changes/", params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def changed_ids(self, data):
+        return [row["id"] for row in data["changed"]]
+
+    def test_full_sync_then_only_changes(self):
+        first, second = self.create_appointments(2)
+        self.create_appointments(1, user=self.create_user("client-2", "client"))
+
+        data = self.sync(self.client_user)
+        self.assertEqual(self.changed_ids(data), [first.pk, second.pk])
+        self.assertFalse(data["has_more"])
+        self.assertEqual(self.changed_ids(self.sync(self.client_user, data["watermark"])), [])
+
+        appointment = Appointment.objects.get(pk=second.pk)
+        appointment.title = "Moved"
+        appointment.save()
+        Appointment.objects.get(pk=first.pk).delete()
+        changes = self.sync(self.client_user, data["watermark"])
+        self.assertEqual(self.changed_ids(changes), [second.pk])
+        self.assertEqual(changes["deleted"], [first.pk])
+
+    def test_reassignment_reaches_old_and_new_staff(self):
+        appointment = self.create_appointments(1)[0]
+        other_staff = self.create_user("staff-2", "staff")
+        watermarks = {user.pk: self.sync(user)["watermark"] for user in (self.staff_user, other_staff, self.admin_user)}
+
+        appointment = Appointment.objects.get(pk=appointment.pk)
+        appointment.staff = other_staff
+        appointment.save()
+
+        old = self.sync(self.staff_user, watermarks[self.staff_user.pk])
+        self.assertEqual((self.changed_ids(old), old["deleted"]), ([], [appointment.pk]))
+        new = self.sync(other_staff, watermarks[other_staff.pk])
+        self.assertEqual((self.changed_ids(new), new["deleted"]), ([appointment.pk], []))
+        admin = self.sync(self.admin_user, watermarks[self.admin_user.pk])
+        self.assertEqual((self.changed_ids(admin), admin["deleted"]), ([appointment.pk], []))
+
+    def test_bulk_reassignment_records_tombstones(self):
+        appointment = self.create_appointments(1)[0]
+        other_staff = self.create_user("staff-2", "staff")
+        watermark = self.sync(self.staff_user)["watermark"]
+
+        self.authenticate(self.admin_user)
+        response = self.api.post("/api/appointments/bulk/", {"operations": [
+            {"op": "update", "id": appointment.pk, "data": {"staff": other_staff.pk}},
+        ]}, format="json")
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(self.sync(self.staff_user, watermark)["deleted"], [appointment.pk])
+
+    def test_pages_end_on_whole_timestamps(self):
+        appointments = self.create_appointments(5)
+        stamp = timezone.now() - timedelta(minutes=1)
+        Appointment.objects.filter(pk__in=[a.pk for a in appointments[1:3]]).update(updated_at=stamp)
+
+        seen, since, pages = [], None, 0
+        while True:
+            data = self.sync(self.client_user, since, page_size=1)
+            seen += self.changed_ids(data)
+            since, pages = data["watermark"], pages + 1
+            if not data["has_more"]:
+                break
+        self.assertEqual(sorted(seen), sorted(a.pk for a in appointments))
+        self.assertEqual(len(seen), 5)
+        self.assertEqual(pages, 4)  # The two rows sharing a timestamp come together
+
+    @override_settings(CHANGE_FEED_LAG=60)
+    def test_watermark_trails_recent_writes(self):
+        self.create_appointments(1)
+        data = self.sync(self.client_user)
+        self.assertEqual(data["changed"], [])
+        self.assertLess(datetime.fromisoformat(data["watermark"]), timezone.now() - timedelta(seconds=59))
+
+    def test_rejects_unknown_and_expired_watermarks(self):
+        self.authenticate(self.client_user)
+        response = self.api.get("/api/appointments/changes/", {"since": "yesterday"})
+        self.assertEqual(response.status_code, 400)
+        expired = (timezone.now() - timedelta(days=365)).isoformat()
+        response = self.api.get("/api/appointments/changes/", {"since": expired})
+        self.assertEqual(response.status_code, 410)
+
+    def test_prune_tombstones_keeps_recent_ones(self):
+        old, recent = self.create_appointments(2)
+        old.delete()
+        AppointmentTombstone.objects.update(removed_at=timezone.now() - timedelta(days=90))
+        recent_id = recent.pk
+        recent.delete()
+        call_command("prune_tombstones", stdout=StringIO())
+        self.assertEqual(list(AppointmentTombstone.objects.values_list("appointment_id", flat=True)), [recent_id])
+
+
+class AppointmentSummaryTests(AppointmentTestCase):
+    """
+    The daily summary follows every write path and the summary endpoint
+    reads only the summary.
+    """
+
+    def counts(self):
+        return {
+            (row.day, row.staff_id, row.status): row.count
+            for row in AppointmentDailySummary.objects.exclude(count=0)
+        }
+
+    def book(self, days, staff=None, status="pending", hour=10):
+        day = timezone.localdate() + timedelta(days=days)
+        start = timezone.make_aware(datetime(day.year, day.month, day.day, hour))
+        appointment = Appointment(
+            title="Visit", appointment_date=start, time=start.time(), user=self.client_user, staff=staff, status=status,
+        )
+        appointment.save()
+        return appointment
+
+    def test_saves_and_deletes_move_counts(self):
+        appointment = self.book(2, staff=self.staff_user)
+        day = timezone.localdate(appointment.starts_at)
+        self.assertEqual(self.counts(), {(day, self.staff_user.pk, "pending"): 1})
+
+        appointment = Appointment.objects.get(pk=appointment.pk)
+        appointment.status = "confirmed"
+        appointment.staff = None
+        appointment.save()
+        self.assertEqual(self.counts(), {(day, UNASSIGNED_STAFF, "confirmed"): 1})
+
+        Appointment.objects.get(pk=appointment.pk).delete()
+        self.assertEqual(self.counts(), {})
+
+    def test_repeated_saves_start_from_the_previous_save(self):
+        appointment = self.book(2, staff=self.staff_user)
+        other_staff = self.create_user("staff-2", "staff")
+        appointment.staff = other_staff
+        appointment.save()
+        appointment.status = "confirmed"
+        appointment.save()
+
+        day = timezone.localdate(appointment.starts_at)
+        self.assertEqual(self.counts(), {(day, other_staff.pk, "confirmed"): 1})
+        self.assertEqual(
+            list(AppointmentTombstone.objects.values_list("appointment_id", "user_id", "staff_id")),
+            [(appointment.pk, None, self.staff_user.pk)],
+        )
+
+    def test_bulk_writes_update_counts(self):
+        existing = self.book(2, staff=self.staff_user)
+        self.authenticate(self.client_user)
+        operations = [
+            {"op": "create", "data": {
+                "title": f"Import {i}",
+                "appointment_date": (timezone.localdate() + timedelta(days=3 + i)).isoformat(),
+                "time": "09:30",
+            }}
+            for i in range(3)
+        ] + [{"op": "cancel", "id": existing.pk}]
+        response = self.api.post("/api/appointments/bulk/", {"operations": operations}, format="json")
+        self.assertEqual(response.status_code, 200, response.data)
+
+        expected = {(timezone.localdate() + timedelta(days=3 + i), UNASSIGNED_STAFF, "pending"): 1 for i in range(3)}
+        expected[(timezone.localdate(existing.starts_at), self.staff_user.pk, "cancelled")] = 1
+        self.assertEqual(self.counts(), expected)
+
+    def test_reconcile_repairs_drift(self):
+        self.create_appointments(3)  # bulk_create bypasses the write paths
+        stale = self.book(2)
+        Appointment.objects.filter(pk=stale.pk).update(status="confirmed")
+
+        call_command("reconcile_appointment_summary", stdout=StringIO())
+        today = timezone.localdate()
+        self.assertEqual(self.counts(), actual_counts(today, today + timedelta(days=30)))
+        self.assertEqual(sum(self.counts().values()), 4)
+        self.assertEqual(reconcile_summaries(), 0)
+
+    def test_reconcile_rejects_empty_chunks(self):
+        with self.assertRaises(CommandError):
+            call_command("reconcile_appointment_summary", "--chunk-days", "0", stdout=StringIO())
+        with self.assertRaises(ValueError):
+            reconcile_summaries(chunk_days=-1)
+
+    def test_summary_endpoint_reads_only_the_summary(self):
+        first = self.book(2, staff=self.staff_user)
+        self.book(2, staff=self.staff_user, status="confirmed", hour=11)
+        self.book(3)
+        start = timezone.localdate(first.starts_at)
+        params = {"from": start.isoformat(), "to": (start + timedelta(days=1)).isoformat()}
+
+        self.authenticate(self.admin_user)
+        self.api.get("/api/appointments/summary/", params)  # Warm the profile cache
+        with self.assertNumQueries(1):
+            response = self.api.get("/api/appointments/summary/", {**params, "group_by": "status"})
+        self.assertEqual(response.data["results"], [
+            {"status": "confirmed", "count": 1}, {"status": "pending", "count": 2},
+        ])
+        response = self.api.get("/api/appointments/summary/", {**params, "staff": "none", "group_by": "day,staff"})
+        self.assertEqual(response.data["results"], [
+            {"date": (start + timedelta(days=1)).isoformat(), "staff": None, "count": 1},
+        ])
+
+        self.authenticate(self.staff_user)
+        response = self.api.get("/api/appointments/summary/", {**params, "group_by": "staff"})
+        self.assertEqual(response.data["results"], [{"staff": self.staff_user.pk, "count": 2}])
+        self.authenticate(self.client_user)
+        self.assertEqual(self.api.get("/api/appointments/summary/", params).status_code, 403)
+
+
+class AppointmentExportTests(AppointmentTestCase):
+    """
+    Exports stream every matching appointment, chunk by chunk.
+    """
+
+    def export(self, path, **params):
+        self.authenticate(self.admin_user)
+        response = self.api.get(path, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b"".join(response.streaming_content).decode()
+
+    @override_settings(EXPORT_CHUNK_SIZE=2)
+    def test_csv_and_ndjson(self):
+        appointments = self.create_appointments(5)
+        self.create_appointments(1, staff=None)
+
+        rows = list(csv.DictReader(StringIO(self.export("/api/appointments/export.csv"))))
+        self.assertEqual([int(row["id"]) for row in rows], sorted(a.pk for a in Appointment.objects.all()))
+        self.assertEqual(rows[0]["user"], "client-1")
+        self.assertEqual(rows[0]["staff"], "staff-1")
+
+        lines = self.export("/api/appointments/export.ndjson", staff="none").splitlines()
+        self.assertEqual(len(lines), 1)
+        record = json.loads(lines[0])
+        self.assertIsNone(record["staff"])
+        self.assertNotIn(record["id"], [a.pk for a in appointments])
+
+    def test_admins_only_and_known_formats(self):
+        self.authenticate(self.staff_user)
+        self.assertEqual(self.api.get("/api/appointments/export.csv").status_code, 403)
+        self.authenticate(self.admin_user)
+        self.assertEqual(self.api.get("/api/appointments/export.xlsx").status_code, 404)
+
+    def test_parquet_row_groups_per_chunk(self):
+        self.create_appointments(5)
+        self.authenticate(self.admin_user)
+        with override_settings(EXPORT_CHUNK_SIZE=2):
+            response = self.api.get("/api/appointments/export.parquet")
+        parquet = pyarrow.parquet.ParquetFile(BytesIO(b"".join(response.streaming_content)))
+        self.assertEqual(parquet.metadata.num_rows, 5)
+        self.assertEqual(parquet.metadata.num_row_groups, 3)
+
+    def test_export_command_writes_a_file(self):
+        self.create_appointments(3)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "appointments.ndjson")
+            call_command("export_appointments", format="ndjson", output=path, chunk_size=2)
+            with open(path) as export:
+                self.assertEqual(len(export.read().splitlines()), 3)
+
+    def test_rejects_empty_chunks(self):
+        with self.assertRaises(CommandError):
+            call_command("export_appointments", chunk_size=0, stdout=StringIO())
+        self.authenticate(self.admin_user)
+        with override_settings(EXPORT_CHUNK_SIZE=0), self.assertRaises(ImproperlyConfigured):
+            self.api.get("/api/appointments/export.csv")
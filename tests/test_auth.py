@@ -0,0 +1,365 @@
+import hashlib
+import time
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from unittest import mock
+
+import jwt
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.x509.oid import NameOID
+from django.test import SimpleTestCase, override_settings
+from firebase_admin import auth
+
+from firebase.revocation import (
+    ID_TOKEN_LIFETIME,
+    RevocationRegistry,
+    revocation_registry,
+    revoke_refresh_tokens,
+    set_user_disabled,
+)
+from firebase.token_cache import VerifiedTokenCache, token_cache, verify_id_token
+from firebase.verifier import (
+    ISSUER_PREFIX,
+    CertificateStore,
+    LocalTokenVerifier,
+    certificate_store,
+    preload_certificates,
+)
+
+
+class Clock:
+    def __init__(self, now=1000):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class VerifiedTokenCacheTests(SimpleTestCase):
+    """
+    Cached claims expire before the token does and never outlive its
+    revocation requirements.
+    """
+
+    def setUp(self):
+        self.clock = Clock()
+        self.cache = VerifiedTokenCache(maxsize=2, margin=60, timer=self.clock)
+
+    def claims(self, uid="u1", lifetime=3600):
+        return {"uid": uid, "exp": self.clock.now + lifetime}
+
+    def test_entries_expire_margin_seconds_before_the_token(self):
+        self.cache.set("token", self.claims())
+        self.clock.now += 3600 - 60 - 1
+        self.assertEqual(self.cache.get("token")["uid"], "u1")
+        self.clock.now += 1
+        self.assertIsNone(self.cache.get("token"))
+
+    def test_tokens_about_to_expire_are_not_cached(self):
+        self.cache.set("token", self.claims(lifetime=60))
+        self.assertIsNone(self.cache.get("token"))
+        self.assertEqual(self.cache.stats()["size"], 0)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        for token in ("a", "b"):
+            self.cache.set(token, self.claims(uid=token))
+        self.cache.get("a")
+        self.cache.set("c", self.claims(uid="c"))
+        self.assertIsNone(self.cache.get("b"))
+        self.assertEqual(self.cache.get("a")["uid"], "a")
+        self.assertEqual(self.cache.get("c")["uid"], "c")
+
+    def test_keys_are_token_digests(self):
+        self.cache.set("raw-token", self.claims())
+        self.assertEqual(list(self.cache._cache), [hashlib.sha256(b"raw-token").hexdigest()])
+
+    def test_counts_hits_and_misses(self):
+        self.cache.get("token")
+        self.cache.set("token", self.claims())
+        self.cache.get("token")
+        self.cache.get("token")
+        self.assertEqual(self.cache.stats(), {"hits": 2, "misses": 1, "size": 1, "maxsize": 2})
+
+    def test_entry_without_revocation_check_does_not_satisfy_one(self):
+        self.cache.set("token", self.claims())
+        self.assertIsNone(self.cache.get("token", check_revoked=True))
+        self.cache.set("token", self.claims(), check_revoked=True)
+        self.assertIsNotNone(self.cache.get("token", check_revoked=True))
+        self.assertIsNotNone(self.cache.get("token"))
+
+    def test_returns_copies(self):
+        self.cache.set("token", self.claims())
+        self.cache.get("token")["uid"] = "changed"
+        self.assertEqual(self.cache.get("token")["uid"], "u1")
+
+
+class FakeAdminClient:
+    """
+    Serves ``list_users()`` like firebase_admin.auth, from a list of users.
+    """
+
+    def __init__(self, *users):
+        self.users = list(users)
+
+    def list_users(self):
+        return SimpleNamespace(iterate_all=lambda: iter(self.users))
+
+
+def firebase_user(uid, valid_after=0, disabled=False):
+    return SimpleNamespace(uid=uid, tokens_valid_after_timestamp=valid_after * 1000, disabled=disabled)
+
+
+class RevocationRegistryTests(SimpleTestCase):
+    """
+    The registry answers revocation checks from its replicated sets.
+    """
+
+    def setUp(self):
+        self.clock = Clock(now=100_000)
+        self.client = FakeAdminClient()
+        self.registry = RevocationRegistry(client=self.client, interval=300, clock=self.clock)
+
+    def check(self, uid, iat):
+        self.registry.check({"uid": uid, "iat": iat})
+
+    def test_refresh_replicates_revoked_and_disabled_users(self):
+        now = self.clock.now
+        self.client.users = [
+            firebase_user("revoked", valid_after=now - 10),
+            firebase_user("long-ago", valid_after=now - ID_TOKEN_LIFETIME - 10),
+            firebase_user("disabled", disabled=True),
+            firebase_user("fine"),
+        ]
+        self.assertFalse(self.registry.ready)
+        self.registry.refresh()
+        self.assertTrue(self.registry.ready)
+
+        with self.assertRaises(auth.RevokedIdTokenError):
+            self.check("revoked", now - 20)
+        self.check("revoked", now - 5)
+        self.check("long-ago", now - 100)
+        with self.assertRaises(auth.UserDisabledError):
+            self.check("disabled", now)
+        self.check("fine", now - 100)
+
+    def test_registry_goes_stale_without_refreshes(self):
+        self.registry.refresh()
+        self.clock.now += 900
+        self.assertTrue(self.registry.ready)
+        self.clock.now += 1
+        self.assertFalse(self.registry.ready)
+
+    def test_mark_revoked_and_disabled_apply_immediately(self):
+        now = self.clock.now
+        self.registry.mark_revoked("u1")
+        with self.assertRaises(auth.RevokedIdTokenError):
+            self.check("u1", now - 1)
+        self.check("u1", now)
+
+        self.registry.mark_disabled("u2")
+        with self.assertRaises(auth.UserDisabledError):
+            self.check("u2", now)
+        self.registry.mark_disabled("u2", disabled=False)
+        self.check("u2", now)
+
+    def test_local_invalidations_survive_a_refresh(self):
+        now = self.clock.now
+        self.client.users = [firebase_user("u1", valid_after=now - 100)]
+        self.registry.refresh()
+        self.registry.mark_revoked("u1", valid_after=now - 10)
+        self.registry.mark_revoked("u2", valid_after=now - 10)
+        self.registry.refresh()  # Firebase has not caught up yet
+        for uid in ("u1", "u2"):
+            with self.assertRaises(auth.RevokedIdTokenError):
+                self.check(uid, now - 20)
+
+        self.clock.now += ID_TOKEN_LIFETIME
+        self.registry.refresh()
+        self.assertEqual(self.registry._valid_after, {})
+
+    def test_start_skips_the_lock_once_running(self):
+        self.registry._thread = mock.Mock(**{"is_alive.return_value": True})
+        self.registry._lock = mock.MagicMock()
+        self.registry.start()
+        self.registry._lock.__enter__.assert_not_called()
+
+
+@override_settings(FIREBASE_REVOCATION_MODE="local")
+class LocalRevocationModeTests(SimpleTestCase):
+    """
+    verify_id_token checks revocation locally only while the registry is
+    fresh.
+    """
+
+    def setUp(self):
+        token_cache.clear()
+        self.addCleanup(token_cache.clear)
+        self.verify = mock.Mock(return_value={"uid": "u1", "iat": 1, "exp": 2**40})
+        for patcher in (
+            mock.patch("firebase_admin.auth.verify_id_token", self.verify),
+            mock.patch.object(revocation_registry, "start"),
+            mock.patch.object(revocation_registry, "last_refreshed", None),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_stale_registry_falls_back_to_remote_check(self):
+        revocation_registry.last_refreshed = revocation_registry.clock() - revocation_registry.max_staleness - 1
+        verify_id_token("token", check_revoked=True)
+        self.verify.assert_called_once_with("token", check_revoked=True)
+
+    def test_fresh_registry_answers_the_revocation_check(self):
+        revocation_registry.last_refreshed = revocation_registry.clock()
+        verify_id_token("token", check_revoked=True)
+        self.verify.assert_called_once_with("token", check_revoked=False)
+
+    def test_revoking_or_disabling_rejects_the_next_verification(self):
+        revocation_registry.last_refreshed = revocation_registry.clock()
+        self.addCleanup(setattr, revocation_registry, "_valid_after", revocation_registry._valid_after)
+        self.addCleanup(setattr, revocation_registry, "_disabled", revocation_registry._disabled)
+        verify_id_token("token", check_revoked=True)
+
+        with mock.patch("firebase_admin.auth.revoke_refresh_tokens") as revoke:
+            revoke_refresh_tokens("u1")
+        revoke.assert_called_once_with("u1")
+        with self.assertRaises(auth.RevokedIdTokenError):
+            verify_id_token("token", check_revoked=True)
+
+        with mock.patch("firebase_admin.auth.update_user") as update_user:
+            set_user_disabled("u2")
+        update_user.assert_called_once_with("u2", disabled=True)
+        self.verify.return_value = {"uid": "u2", "iat": 2**31, "exp": 2**40}
+        with self.assertRaises(auth.UserDisabledError):
+            verify_id_token("other-token", check_revoked=True)
+
+
+def signing_key():
+    """
+    A generated RSA key and a self-signed certificate PEM for it, standing
+    in for one of Google's token-signing certificates.
+    """
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "securetoken.test")])
+    now = datetime.now(timezone.utc)
+    certificate = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - timedelta(days=1))
+        .not_valid_after(now + timedelta(days=1))
+        .sign(key, hashes.SHA256())
+    )
+    return key, certificate.public_bytes(serialization.Encoding.PEM).decode()
+
+
+class LocalTokenVerifierTests(SimpleTestCase):
+    """
+    Offline verification against certificates served by a fake fetch.
+    """
+
+    project_id = "test-project"
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.keys = {kid: signing_key() for kid in ("key-1", "key-2")}
+
+    def setUp(self):
+        self.published = ["key-1"]
+        self.fetches = 0
+        self.clock = Clock(now=time.time())
+        self.store = CertificateStore(fetch=self.fetch, retry_interval=30, clock=self.clock)
+        self.addCleanup(self.store.stop)
+        self.verifier = LocalTokenVerifier(self.project_id, self.store)
+
+    def fetch(self):
+        self.fetches += 1
+        return {kid: self.keys[kid][1] for kid in self.published}, 3600
+
+    def token(self, kid="key-1", **claims):
+        now = int(time.time())
+        payload = {
+            "iss": ISSUER_PREFIX + self.project_id,
+            "aud": self.project_id,
+            "sub": "user-1",
+            "iat": now,
+            "exp": now + 3600,
+            "auth_time": now,
+            **claims,
+        }
+        return jwt.encode(payload, self.keys[kid][0], algorithm="RS256", headers={"kid": kid})
+
+    def assertInvalid(self, token, error=auth.InvalidIdTokenError):
+        with self.assertRaises(error):
+            self.verifier.verify(token)
+
+    def test_valid_token(self):
+        claims = self.verifier.verify(self.token())
+        self.assertEqual((claims["uid"], claims["sub"]), ("user-1", "user-1"))
+        self.assertEqual(self.fetches, 1)
+
+    def test_expired_token(self):
+        now = int(time.time())
+        self.assertInvalid(self.token(iat=now - 7200, exp=now - 3600), auth.ExpiredIdTokenError)
+
+    def test_wrong_audience_or_issuer(self):
+        self.assertInvalid(self.token(aud="other-project"))
+        self.assertInvalid(self.token(iss=ISSUER_PREFIX + "other-project"))
+
+    def test_issued_in_the_future(self):
+        self.assertInvalid(self.token(iat=int(time.time()) + 600))
+
+    def test_empty_subject(self):
+        self.assertInvalid(self.token(sub=""))
+
+    def test_wrong_signing_key(self):
+        token = jwt.encode(
+            jwt.decode(self.token(), options={"verify_signature": False}),
+            self.keys["key-2"][0], algorithm="RS256", headers={"kid": "key-1"},
+        )
+        self.assertInvalid(token)
+
+    def test_unknown_key_id_reloads_certificates(self):
+        self.verifier.verify(self.token())
+        self.clock.now += 60
+        self.published.append("key-2")
+        self.assertEqual(self.verifier.verify(self.token(kid="key-2"))["uid"], "user-1")
+        self.assertEqual(self.fetches, 2)
+
+    def test_reloads_are_rate_limited(self):
+        self.verifier.verify(self.token())
+        for _ in range(3):
+            self.assertInvalid(self.token(kid="key-2"))
+        self.assertEqual(self.fetches, 1)  # Loaded less than retry_interval ago
+
+        self.clock.now += 30
+        self.assertInvalid(self.token(kid="key-2"))
+        self.assertInvalid(self.token(kid="key-2"))
+        self.assertEqual(self.fetches, 2)
+
+    def test_background_refresh_starts_on_first_lookup(self):
+        self.assertIsNone(self.store._timer)
+        self.verifier.verify(self.token())
+        self.assertIsNotNone(self.store._timer)
+        # Scheduled shortly before the loaded certificates expire
+        self.assertAlmostEqual(self.store._timer.interval, 3600 - self.store.refresh_margin, delta=1)
+
+    def test_preload_loads_keys_before_the_first_verification(self):
+        self.store.preload()
+        self.assertEqual(self.fetches, 1)
+        self.assertIsNotNone(self.store._timer)
+        self.verifier.verify(self.token())
+        self.assertEqual(self.fetches, 1)
+
+    def test_preload_only_with_local_verification(self):
+        with mock.patch.object(certificate_store, "preload") as preload:
+            with override_settings(FIREBASE_LOCAL_VERIFICATION=False):
+                preload_certificates()
+            preload.assert_not_called()
+            with override_settings(FIREBASE_LOCAL_VERIFICATION=True):
+                preload_certificates()
+            preload.assert_called_once_with()
@@ -0,0 +1,39 @@
+from django.core.cache import cache
+from django.test import TestCase
+
+from benchmarks.fake_firebase import FakeFirebase
+from benchmarks.runner import compare, run_scenario
+from benchmarks.scenarios import SCENARIOS, BenchData
+from firebase.token_cache import token_cache
+from src.healthcare.models import Appointment
+from src.healthcare.seeding import create_bench_users, seed_appointments
+
+
+class BenchmarkScenarioTests(TestCase):
+    """
+    Every scenario runs cleanly against seeded data.
+    """
+
+    def setUp(self):
+        token_cache.clear()
+        cache.clear()
+        clients, staff = create_bench_users(5, 2)
+        list(seed_appointments(200, clients, staff, days=60))
+
+    def test_seeded_staff_are_never_double_booked(self):
+        booked = Appointment.objects.exclude(staff=None).exclude(status="cancelled")
+        windows = sorted(booked.values_list("staff_id", "starts_at", "ends_at"))
+        for (staff, _, ends_at), (next_staff, next_starts_at, _) in zip(windows, windows[1:]):
+            if staff == next_staff:
+                self.assertLessEqual(ends_at, next_starts_at)
+
+    def test_scenarios_run_without_errors(self):
+        with FakeFirebase().installed():
+            data = BenchData()
+            results = {"scenarios": {name: run_scenario(scenario, data, 5) for name, scenario in SCENARIOS.items()}}
+        for name, result in results["scenarios"].items():
+            self.assertEqual(result["errors"], 0, name)
+        self.assertGreater(results["scenarios"]["create"]["queries"]["mean"], 0)
+
+        baseline = {"revision": "base", "recorded_at": "-", "scenarios": results["scenarios"]}
+        self.assertNotIn("REGRESSION", "\n".join(compare(results, baseline)))
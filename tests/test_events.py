@@ -0,0 +1,97 @@
+import asyncio
+import threading
+
+from asgiref.sync import sync_to_async
+from django.test import AsyncRequestFactory, SimpleTestCase, override_settings
+
+from src.core.events import RESYNC, Hub, TooManySubscriptions, _load_hub
+from src.healthcare.models import Appointment
+from src.healthcare.views import appointment_events_async
+from tests.test_appointments import AppointmentTestCase
+
+
+class HubTests(SimpleTestCase):
+    """
+    The hub delivers events published on any thread to the subscribers of
+    a channel, with bounded queues and a per-user limit.
+    """
+
+    async def test_delivers_events_published_from_other_threads(self):
+        hub = Hub()
+        subscription = hub.subscribe(1, ["a", "b"])
+        other = hub.subscribe(2, ["c"])
+        thread = threading.Thread(target=hub.publish, args=("b", {"type": "updated", "id": 7}))
+        thread.start()
+        thread.join()
+        self.assertEqual(await subscription.get(1), {"type": "updated", "id": 7})
+        self.assertTrue(other.queue.empty())
+
+    async def test_slow_subscribers_are_told_to_resync(self):
+        hub = Hub(queue_size=2)
+        subscription = hub.subscribe(1, ["a"])
+        for i in range(3):
+            hub.publish("a", {"id": i})
+        await asyncio.sleep(0)  # Let the loop run the queued puts
+        self.assertIs(await subscription.get(1), RESYNC)
+        self.assertTrue(subscription.queue.empty())
+
+    async def test_limits_subscriptions_per_user(self):
+        hub = Hub(max_per_user=1)
+        subscription = hub.subscribe(1, ["a"])
+        with self.assertRaises(TooManySubscriptions):
+            hub.subscribe(1, ["a"])
+        hub.subscribe(2, ["a"])
+        subscription.close()
+        subscription.close()
+        hub.subscribe(1, ["a"])
+        self.assertEqual(hub.subscriber_count(), 2)
+
+
+class AppointmentEventStreamTests(AppointmentTestCase):
+    def setUp(self):
+        super().setUp()
+        _load_hub.cache_clear()
+        self.addCleanup(_load_hub.cache_clear)
+        self.factory = AsyncRequestFactory()
+
+    async def open_stream(self, user):
+        request = self.factory.get("/api/appointments/events/", headers={"Authorization": f"Bearer test:{user.username}"})
+        return await appointment_events_async(request)
+
+    def save(self, appointment, **changes):
+        with self.captureOnCommitCallbacks(execute=True):
+            appointment = Appointment.objects.get(pk=appointment.pk)
+            for field, value in changes.items():
+                setattr(appointment, field, value)
+            appointment.save()
+
+    async def test_streams_changes_to_the_lists_they_affect(self):
+        (appointment,) = await sync_to_async(self.create_appointments)(1)
+        other_staff = await sync_to_async(self.create_user)("staff-2", "staff")
+        responses, streams = [], {}
+        for user in (self.client_user, self.staff_user, other_staff):
+            response = await self.open_stream(user)
+            self.assertEqual(response["Content-Type"], "text/event-stream")
+            responses.append(response)
+            streams[user.username] = aiter(response.streaming_content)
+            self.assertTrue((await anext(streams[user.username])).startswith(b"retry:"))
+
+        await sync_to_async(self.save)(appointment, staff=other_staff, status="confirmed")
+
+        async def next_event(name):
+            return (await asyncio.wait_for(anext(streams[name]), 1)).decode()
+
+        self.assertTrue((await next_event("client-1")).startswith("event: updated\n"))
+        self.assertIn('"status":"confirmed"', await next_event("staff-2"))
+        self.assertEqual(await next_event("staff-1"), f'event: deleted\ndata: {{"type":"deleted","id":{appointment.pk}}}\n\n')
+        for response in responses:
+            response.close()
+
+    @override_settings(EVENTS_MAX_CONNECTIONS_PER_USER=1)
+    async def test_rejects_connections_over_the_limit(self):
+        response = await self.open_stream(self.client_user)
+        stream = aiter(response.streaming_content)
+        await anext(stream)
+        self.assertEqual((await self.open_stream(self.client_user)).status_code, 429)
+        response.close()  # As the ASGI handler does when the client disconnects
+        self.assertEqual((await self.open_stream(self.client_user)).status_code, 200)
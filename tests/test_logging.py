@@ -0,0 +1,44 @@
+import json
+import logging
+from unittest import mock
+
+from django.test import SimpleTestCase
+from django.test.client import RequestFactory
+
+from src.core.log import JsonFormatter, RequestIdFilter, SamplingFilter, request_id_var
+from src.middleware.request_id import RequestIdMiddleware
+
+
+class RequestIdTests(SimpleTestCase):
+    """
+    Log records carry the id of the request that produced them.
+    """
+
+    def handle(self, **headers):
+        seen = {}
+
+        def view(request):
+            record = logging.makeLogRecord({"msg": "hello %s", "args": ("world",), "uid": "u1"})
+            RequestIdFilter().filter(record)
+            seen["entry"] = json.loads(JsonFormatter().format(record))
+            return mock.MagicMock()
+
+        response = RequestIdMiddleware(view)(RequestFactory().get("/", headers=headers))
+        return response, seen["entry"]
+
+    def test_incoming_request_id_is_reused(self):
+        response, entry = self.handle(**{"X-Request-ID": "abc-123"})
+        self.assertEqual(entry["request_id"], "abc-123")
+        self.assertEqual(entry["message"], "hello world")
+        self.assertEqual(entry["uid"], "u1")
+        response.__setitem__.assert_called_once_with("X-Request-ID", "abc-123")
+        self.assertEqual(request_id_var.get(), "-")
+
+    def test_malformed_request_id_is_replaced(self):
+        _, entry = self.handle(**{"X-Request-ID": "bad id\n" * 20})
+        self.assertRegex(entry["request_id"], r"^[0-9a-f]{32}$")
+
+    def test_sampling_only_drops_low_levels(self):
+        sampler = SamplingFilter(rate=0.0)
+        self.assertFalse(sampler.filter(logging.makeLogRecord({"levelno": logging.DEBUG})))
+        self.assertTrue(sampler.filter(logging.makeLogRecord({"levelno": logging.INFO})))
@@ -0,0 +1,72 @@
+import tempfile
+import threading
+from io import StringIO
+
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from src.core.profiling import PROFILE_ID_HEADER, get_profile_store, make_profile_token
+from src.middleware.profiling import ProfilingMiddleware
+
+
+class ProfilingMiddlewareTests(SimpleTestCase):
+    """
+    Profiles land in a bounded directory and are only taken on request.
+    """
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.profiling = override_settings(
+            PROFILING_ENABLED=True,
+            PROFILING_DIR=directory.name,
+            PROFILING_MAX_FILES=2,
+            PROFILING_SECRET="profiling-secret",
+        )
+        self.profiling.enable()
+        self.addCleanup(self.profiling.disable)
+
+    def test_sampled_profiles_are_kept_in_a_ring_buffer(self):
+        with override_settings(PROFILING_SAMPLE_RATE=1.0):
+            for _ in range(3):
+                self.client.get("/")
+        self.assertEqual(len(get_profile_store().paths()), 2)
+
+        out = StringIO()
+        call_command("profiles", "--limit", "5", stdout=out)
+        self.assertIn("2 profile(s)", out.getvalue())
+
+    def test_signed_header_forces_a_profile(self):
+        response = self.client.get("/", headers={"X-Profile": make_profile_token()})
+        self.assertEqual([path.name for path in get_profile_store().paths()], [response[PROFILE_ID_HEADER]])
+
+        response = self.client.get("/", headers={"X-Profile": "profile:forged:signature"})
+        self.assertNotIn(PROFILE_ID_HEADER, response)
+        self.assertEqual(len(get_profile_store().paths()), 1)
+
+    @override_settings(PROFILING_ENABLED=False, PROFILING_SAMPLE_RATE=1.0)
+    def test_disabled_profiler_is_not_in_the_chain(self):
+        self.client.get("/")
+        self.assertEqual(get_profile_store().paths(), [])
+
+    @override_settings(PROFILING_SAMPLE_RATE=1.0, PROFILING_SLOW_MS=0)
+    def test_overlapping_requests_are_profiled_one_at_a_time(self):
+        entered, release = threading.Event(), threading.Event()
+
+        def get_response(request):
+            if request.path == "/slow/":
+                entered.set()
+                release.wait(5)
+            return HttpResponse()
+
+        middleware = ProfilingMiddleware(get_response)
+        slow = threading.Thread(target=middleware, args=(RequestFactory().get("/slow/"),))
+        slow.start()
+        self.assertTrue(entered.wait(5))
+        try:
+            self.assertEqual(middleware(RequestFactory().get("/fast/")).status_code, 200)
+        finally:
+            release.set()
+            slow.join(5)
+        self.assertEqual(len(get_profile_store().paths()), 1)
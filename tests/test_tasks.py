@@ -0,0 +1,87 @@
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from src.tasks.brokers import DatabaseBroker
+from src.tasks.models import Task
+from src.tasks.registry import task
+from src.tasks.worker import Worker
+
+calls = []
+
+
+@task(name="tests.record")
+def record(value):
+    calls.append(value)
+
+
+@task(name="tests.record_once", unique=True)
+def record_once(value):
+    calls.append(value)
+
+
+@task(name="tests.flaky", max_attempts=2)
+def flaky():
+    raise RuntimeError("boom")
+
+
+@override_settings(TASKS_BROKER="src.tasks.brokers.DatabaseBroker", TASKS_RETRY_DELAY=10)
+class TaskQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+        self.worker = Worker(broker=DatabaseBroker(), concurrency=4, worker_id="test-worker")
+
+    def test_enqueue_waits_for_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            record.enqueue("a")
+            self.assertFalse(Task.objects.exists())
+        for callback in callbacks:
+            callback()
+        self.assertEqual(list(Task.objects.values_list("name", "args")), [("tests.record", ["a"])])
+
+    def test_worker_runs_due_tasks_and_removes_them(self):
+        broker = DatabaseBroker()
+        for value in ("a", "b"):
+            broker.push("tests.record", [value], {})
+        later = broker.push("tests.record", ["later"], {})
+        Task.objects.filter(pk=later.pk).update(run_after=timezone.now() + timedelta(minutes=5))
+
+        self.assertEqual(self.worker.run_once(), 2)
+        self.assertEqual(sorted(calls), ["a", "b"])
+        self.assertEqual(list(Task.objects.values_list("pk", flat=True)), [later.pk])
+        self.assertEqual(self.worker.run_once(), 0)
+
+    def test_failed_task_is_retried_with_backoff_then_marked_failed(self):
+        pushed = DatabaseBroker().push("tests.flaky", [], {}, max_attempts=2)
+
+        self.worker.run_once()
+        pushed.refresh_from_db()
+        self.assertEqual((pushed.status, pushed.attempts), (Task.QUEUED, 1))
+        self.assertIn("RuntimeError: boom", pushed.last_error)
+        self.assertGreater(pushed.run_after, timezone.now() + timedelta(seconds=5))
+
+        Task.objects.filter(pk=pushed.pk).update(run_after=timezone.now())
+        self.worker.run_once()
+        pushed.refresh_from_db()
+        self.assertEqual((pushed.status, pushed.attempts), (Task.FAILED, 2))
+
+    def test_stale_running_task_is_reclaimed(self):
+        pushed = DatabaseBroker().push("tests.record", ["stale"], {})
+        Task.objects.filter(pk=pushed.pk).update(
+            status=Task.RUNNING, locked_by="dead-worker", locked_at=timezone.now() - timedelta(hours=1)
+        )
+        self.assertEqual(self.worker.run_once(), 1)
+        self.assertEqual(calls, ["stale"])
+
+    def test_unique_task_is_queued_once_per_arguments(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for value in ("a", "a", "b"):
+                record_once.enqueue(value)
+        self.assertEqual(sorted(Task.objects.values_list("args", flat=True)), [["a"], ["b"]])
+
+        # A running task may have read stale data, so it does not count
+        Task.objects.filter(args=["a"]).update(status=Task.RUNNING, locked_by="w", locked_at=timezone.now())
+        with self.captureOnCommitCallbacks(execute=True):
+            record_once.enqueue("a")
+        self.assertEqual(Task.objects.filter(args=["a"]).count(), 2)
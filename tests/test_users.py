@@ -1 +1,180 @@
+import json
+from unittest import mock
 
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from asgiref.sync import sync_to_async
+from django.test import AsyncRequestFactory, TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from firebase.token_cache import token_cache
+from src.authentication.views import get_user_profile_async, role_async
+from src.users.cache import cache_profile, get_profile_by_uid, get_profile_by_user_id
+from src.users.email_sync import sync_email
+from src.users.models import Profile
+from src.users.tasks import sync_firebase_email
+from tests.test_appointments import fake_get_user, fake_verify_id_token
+
+
+class UserEmailSyncTests(TestCase):
+    """
+    Saving a User must not call Firebase on the request path.
+    """
+
+    def setUp(self):
+        patcher = mock.patch("firebase_admin.auth.verify_id_token", fake_verify_id_token)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.get_user = mock.Mock(side_effect=fake_get_user)
+        patcher = mock.patch("firebase_admin.auth.get_user", self.get_user)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(sync_firebase_email, "enqueue")
+        self.schedule_email_sync = patcher.start()
+        self.addCleanup(patcher.stop)
+        token_cache.clear()
+        cache.clear()
+
+    def test_login_creates_profile_from_token_claims(self):
+        api = APIClient()
+        api.credentials(HTTP_AUTHORIZATION="Bearer test:new-user")
+        response = api.get("/api/appointments/")
+        self.assertEqual(response.status_code, 403)  # Only LoginView creates accounts
+        self.assertFalse(User.objects.filter(username="new-user").exists())
+
+        self.assertEqual(api.post("/api/auth/login/").status_code, 200)
+        self.assertEqual(Profile.objects.get(firebase_uid="new-user").email, "new-user@example.com")
+        self.assertEqual(api.get("/api/appointments/").status_code, 200)
+        self.get_user.assert_not_called()
+        self.schedule_email_sync.assert_not_called()
+
+    def test_save_without_claims_defers_sync(self):
+        user = User.objects.create(username="no-claims")
+        self.assertEqual(user.profile.email, "no-claims@users.invalid")
+        self.get_user.assert_not_called()
+        self.schedule_email_sync.assert_called_once_with("no-claims")
+
+        sync_email("no-claims")
+        user.refresh_from_db()
+        self.assertEqual(user.email, "no-claims@example.com")
+        self.assertEqual(Profile.objects.get(user=user).email, "no-claims@example.com")
+
+    def test_saves_after_the_email_is_known_do_not_sync(self):
+        user = User.objects.create(username="known")
+        sync_email("known")
+        self.schedule_email_sync.reset_mock()
+        user = User.objects.get(pk=user.pk)
+        user.last_login = timezone.now()
+        user.save()
+        self.schedule_email_sync.assert_not_called()
+
+        Profile.objects.filter(user=user).update(email="known@users.invalid")
+        User.objects.get(pk=user.pk).save()
+        self.schedule_email_sync.assert_called_once_with("known")
+
+
+class FirebaseAuthenticationTests(TestCase):
+    """
+    Authentication resolves the UID from the caches and never creates users.
+    """
+
+    def setUp(self):
+        patcher = mock.patch("firebase_admin.auth.verify_id_token", fake_verify_id_token)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        token_cache.clear()
+        cache.clear()
+        self.user = User.objects.create(username="cached-user", email="cached-user@example.com")
+        self.api = APIClient()
+        self.api.credentials(HTTP_AUTHORIZATION="Bearer test:cached-user")
+
+    def test_warm_request_does_not_query_the_database(self):
+        self.assertEqual(self.api.get("/api/auth/role/").status_code, 200)
+        with self.assertNumQueries(0):
+            response = self.api.get("/api/auth/role/")
+        self.assertEqual(response.json(), {"role": "client"})
+
+    def test_inactive_user_is_rejected(self):
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertEqual(self.api.get("/api/auth/role/").status_code, 403)
+
+    def test_logout_revokes_the_users_sessions(self):
+        with mock.patch("src.authentication.views.revoke_refresh_tokens") as revoke:
+            self.assertEqual(self.api.post("/api/auth/logout/").status_code, 204)
+        revoke.assert_called_once_with("cached-user")
+
+    async def test_async_views_authenticate_like_the_sync_views(self):
+        inactive = await User.objects.acreate(username="inactive-user", is_active=False)
+        for path, async_view in (("/api/auth/role/", role_async), ("/api/auth/profile/detail/", get_user_profile_async)):
+            for token in ("test:cached-user", "test:unregistered", f"test:{inactive.username}", None):
+                with self.subTest(path=path, token=token):
+                    headers = {"Authorization": f"Bearer {token}"} if token else {}
+                    await sync_to_async(cache.clear)()
+                    response = await async_view(AsyncRequestFactory().get(path, headers=headers))
+                    self.api.credentials(**({"HTTP_AUTHORIZATION": f"Bearer {token}"} if token else {}))
+                    expected = await sync_to_async(self.api.get)(path)
+                    self.assertEqual(response.status_code, expected.status_code)
+                    self.assertEqual(json.loads(response.content), expected.json())
+
+
+class ProfileCacheTests(TestCase):
+    """
+    Profiles are served from the cache and dropped from it whenever the
+    profile or its user is written.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username="cached-user", email="cached-user@example.com")
+
+    def test_lookups_hit_the_database_once(self):
+        with self.assertNumQueries(1):
+            get_profile_by_uid("cached-user")
+        with self.assertNumQueries(0):
+            self.assertEqual(get_profile_by_uid("cached-user").user, self.user)
+            self.assertEqual(get_profile_by_user_id(self.user.pk).firebase_uid, "cached-user")
+
+    def test_unknown_uid_is_not_cached(self):
+        self.assertIsNone(get_profile_by_uid("nobody"))
+        User.objects.create(username="nobody")
+        self.assertIsNotNone(get_profile_by_uid("nobody"))
+
+    def test_profile_save_and_delete_invalidate(self):
+        get_profile_by_uid("cached-user")
+        profile = Profile.objects.get(user=self.user)
+        profile.role = "staff"
+        profile.save()
+        self.assertEqual(get_profile_by_uid("cached-user").role, "staff")
+        self.assertEqual(get_profile_by_user_id(self.user.pk).role, "staff")
+
+        profile.delete()
+        self.assertIsNone(get_profile_by_uid("cached-user"))
+        self.assertIsNone(get_profile_by_user_id(self.user.pk))
+
+    def test_uid_change_invalidates_the_old_uid(self):
+        get_profile_by_uid("cached-user")
+        profile = Profile.objects.get(user=self.user)
+        profile.firebase_uid = "renamed-user"
+        profile.save()
+        self.assertIsNone(get_profile_by_uid("cached-user"))
+        self.assertEqual(get_profile_by_uid("renamed-user").pk, profile.pk)
+
+        get_profile_by_uid("renamed-user")
+        profile.firebase_uid = "cached-user"
+        profile.save()  # The same instance again: the UID it was last saved with is dropped
+        self.assertIsNone(get_profile_by_uid("renamed-user"))
+
+    def test_user_save_invalidates(self):
+        get_profile_by_user_id(self.user.pk)
+        self.user.first_name = "Ada"
+        self.user.save()
+        self.assertEqual(get_profile_by_user_id(self.user.pk).user.first_name, "Ada")
+
+    def test_entries_cached_before_commit_are_dropped_on_commit(self):
+        stale = get_profile_by_uid("cached-user")
+        with self.captureOnCommitCallbacks(execute=True):
+            Profile.objects.filter(pk=stale.pk).update(role="admin")
+            Profile.objects.get(pk=stale.pk).save()
+            cache_profile(stale)  # A concurrent reader that saw the pre-commit row
+        self.assertEqual(get_profile_by_uid("cached-user").role, "admin")